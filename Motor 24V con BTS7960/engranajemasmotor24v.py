@@ -1,3 +1,4 @@
+import os
 import sys
 import time
 import cv2
@@ -10,6 +11,17 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtGui import QImage, QPixmap
 from PyQt5.QtCore import Qt, QTimer
 
+# espera del arranque del Arduino (gateway/boot.py), junto a este script o
+# en ../gateway; copiado solo sin boot.py: la espera fija de 2 s de antes
+_here = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [_here, os.path.join(_here, "..", "gateway")]
+try:
+    from boot import wait_ready  # noqa: E402
+except ImportError:
+    def wait_ready(ser, timeout=2.0):
+        time.sleep(timeout)
+        return None
+
 # =========================
 # CONFIGURACIÓN
 # =========================
@@ -139,7 +151,7 @@ class MotorVideoUI(QWidget):
 
         self.stop_btn = QPushButton("Parar (0)")
         self.stop_btn.setMinimumHeight(50)
-        self.stop_btn.clicked.connect(lambda: self.speed_slider.setValue(0))
+        self.stop_btn.clicked.connect(self._stop_motor)
 
         row_top.addWidget(self.estop_btn)
         row_top.addWidget(self.reset_btn)
@@ -265,8 +277,9 @@ class MotorVideoUI(QWidget):
             return
         try:
             self.ser = serial.Serial(dev, BAUD_RATE, timeout=1)
-            time.sleep(2)  # reinicio Arduino
-            self._set_status(f"Conectado a {dev}", error=False)
+            secs = wait_ready(self.ser)  # reinicio Arduino: hasta el banner, no 2 s fijos
+            listo = f" (listo en {secs:.1f} s)" if secs is not None else ""
+            self._set_status(f"Conectado a {dev}{listo}", error=False)
             self.connect_btn.setEnabled(False)
             self.disconnect_btn.setEnabled(True)
             self._send_speed_now(0)  # limpieza inicial
@@ -395,6 +408,28 @@ class MotorVideoUI(QWidget):
                 self._set_status("Error enviando datos. ¿Se desconectó el puerto?", error=True)
                 self._disconnect_serial()
 
+    def _send_stop_now(self):
+        """
+        Prioridad: el 0 no espera detrás de nada. Se descarta la velocidad
+        pendiente del timer y lo que quede en el buffer de salida del SO, y
+        se manda el 0 esperando a que salga.
+        """
+        self.pending_speed = None
+        self.send_timer.stop()
+        if self.ser and self.ser.is_open:
+            try:
+                self.ser.reset_output_buffer()
+                self.ser.write(b"0\n")
+                self.ser.flush()
+                self.last_sent_speed = 0
+            except Exception:
+                self._set_status("Error enviando datos. ¿Se desconectó el puerto?", error=True)
+                self._disconnect_serial()
+
+    def _stop_motor(self):
+        self.speed_slider.setValue(0)
+        self._send_stop_now()
+
     # ---------- Paro de emergencia ----------
     def _trigger_estop(self):
         self.estop = True
@@ -403,7 +438,7 @@ class MotorVideoUI(QWidget):
         self.invert_chk.setEnabled(False)
         self.speed_slider.setValue(0)  # visual
         self.speed_big.setText("0")
-        self._send_speed_now(0)
+        self._send_stop_now()
         self._set_status("EMERGENCIA ACTIVADA", error=True)
 
     def _reset_estop(self):
@@ -0,0 +1,152 @@
+"""
+Correlación de respuestas del Arduino con los comandos que las causaron.
+
+- Binario: el ACK trae canal y SEQ, se empareja exacto.
+- Texto: "OK 2 135" -> canal 2, "OK P 90 45 10" -> pose, "OK:LED_ON" /
+  "ERR:CMD" -> LED, "135" -> servo único, "Nuevo target FIJADO en: v" ->
+  motor; se empareja con el comando más viejo pendiente de ese canal.
+  "Dato invalido..." no dice el canal: se le asigna al más viejo de todos.
+Cada comando puede tener un future (request()) que se resuelve con el texto
+de la respuesta; a todos se les mide la latencia comando -> ACK (las
+últimas en `latencies_ms` y todas en el histograma `hist`, ver metrics.py).
+on_ack(canal, valor), si se asigna, se llama con cada valor confirmado
+(así se llena la tabla de estado, ver state.py); on_done((canal, seq), ok)
+con cada comando que termina, con ACK (ok=True) o sin él (tracing.py).
+"""
+import time
+from collections import OrderedDict, deque
+
+from frames import CH_LED, CH_MOTOR, CH_POSE, CH_SERVO, reply_text
+from metrics import ACK_BUCKETS_MS, Histogram
+
+ANY = object()   # respuesta de error sin canal
+
+def text_reply_channel(line):
+    """Canal al que corresponde una línea de texto; None si no es respuesta."""
+    if line in ("OK:LED_ON", "OK:LED_OFF", "ERR:CMD"):
+        return CH_LED
+    if line.startswith("Dato invalido"):
+        return ANY
+    if line.startswith("Nuevo target FIJADO en:"):
+        return CH_MOTOR   # puentehBTS7960direccionPWM
+    parts = line.split()
+    if len(parts) >= 3 and parts[0] == "OK" and parts[1] == "P":
+        return CH_POSE
+    if len(parts) == 3 and parts[0] == "OK" and parts[1].isdigit():
+        return int(parts[1])
+    if line.isdigit():
+        return CH_SERVO   # slider_servo.ino responde el ángulo solo
+    return None
+
+class Pending:
+    __slots__ = ("t0", "fut", "value", "tag")
+
+    def __init__(self, t0, fut, value=None, tag=None):
+        self.t0 = t0
+        self.fut = fut
+        self.value = value
+        self.tag = tag
+
+class AckTracker:
+    def __init__(self, max_per_channel=32, keep=1024):
+        self.outstanding = {}            # canal -> OrderedDict(seq -> Pending)
+        self.max_per_channel = max_per_channel
+        self.latencies_ms = deque(maxlen=keep)
+        self.hist = Histogram(ACK_BUCKETS_MS)
+        self.acked = 0
+        self.lost = 0                    # sin ACK (descartados o sin respuesta)
+        self.unmatched = 0               # respuestas que nadie esperaba
+        self.on_ack = None
+        self.on_done = None
+
+    def __len__(self):
+        return sum(len(q) for q in self.outstanding.values())
+
+    def track(self, channel, seq, fut=None, value=None):
+        q = self.outstanding.setdefault(channel, OrderedDict())
+        q[seq] = Pending(time.monotonic(), fut, value, (channel, seq))
+        while len(q) > self.max_per_channel:
+            _, p = q.popitem(last=False)
+            self._lose(p)
+
+    def waiting(self, channel, seq):
+        q = self.outstanding.get(channel)
+        return q is not None and seq in q
+
+    def drop(self, channel, seq):
+        """El comando no va a tener ACK (reemplazado por uno más nuevo, timeout)."""
+        q = self.outstanding.get(channel)
+        if q is None or seq not in q:
+            return
+        self._lose(q.pop(seq))
+
+    def _lose(self, p):
+        self.lost += 1
+        if self.on_done is not None:
+            self.on_done(p.tag, False)
+        if p.fut is not None and not p.fut.done():
+            p.fut.set_result(None)
+
+    def _resolve(self, channel, p, text, value=None, ok=True):
+        self.acked += 1
+        ms = (time.monotonic() - p.t0) * 1000.0
+        self.latencies_ms.append(ms)
+        self.hist.observe(ms)
+        if value is None:
+            value = p.value
+        if ok and self.on_ack is not None and value is not None:
+            self.on_ack(channel, value)
+        if self.on_done is not None:
+            self.on_done(p.tag, True)
+        if p.fut is not None and not p.fut.done():
+            p.fut.set_result(text)
+
+    def on_frame(self, frame):
+        q = self.outstanding.get(frame.channel)
+        if not q or frame.seq not in q:
+            self.unmatched += 1
+            return
+        # el Arduino procesa en orden: lo anterior a este SEQ ya no va a llegar
+        while True:
+            seq, p = q.popitem(last=False)
+            if seq == frame.seq:
+                self._resolve(frame.channel, p, reply_text(frame), frame.value)
+                return
+            self._lose(p)
+
+    def on_text(self, line):
+        ch = text_reply_channel(line)
+        if ch is None:
+            return False
+        ok = ch is not ANY and not line.startswith("ERR")
+        if ch is ANY:
+            oldest = None
+            for c, q in self.outstanding.items():
+                if q:
+                    p = next(iter(q.values()))
+                    if oldest is None or p.t0 < oldest[1].t0:
+                        oldest = (c, p)
+            if oldest is None:
+                self.unmatched += 1
+                return True
+            ch = oldest[0]
+        q = self.outstanding.get(ch)
+        if not q:
+            self.unmatched += 1
+            return True
+        _, p = q.popitem(last=False)
+        self._resolve(ch, p, line, ok=ok)
+        return True
+
+    def stats(self):
+        lat = sorted(self.latencies_ms)
+        def pct(p):
+            return lat[min(len(lat) - 1, int(p / 100.0 * len(lat)))] if lat else 0.0
+        return {
+            "acked": self.acked,
+            "lost": self.lost,
+            "unmatched": self.unmatched,
+            "outstanding": len(self),
+            "ack_ms_p50": round(pct(50), 2),
+            "ack_ms_p95": round(pct(95), 2),
+        }
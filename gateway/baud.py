@@ -0,0 +1,102 @@
+"""
+Negociación de velocidad del puerto serie.
+
+Todo arranca a 9600 (lo que el sketch abre en setup()). Luego:
+  Pi  -> "BAUD 115200\\n"              (a 9600)
+  Ard -> "OK BAUD 115200"              (a 9600) y cambia de velocidad
+  Pi  -> "PING\\n"                     (ya a 115200)
+  Ard -> "PONG 115200"
+Si el PONG no llega (cable largo, ruido, USB-serial que no aguanta), los
+dos vuelven a 9600: el Arduino solo espera el PING 1 s. Se ofrecen las
+velocidades de mayor a menor y se queda la primera que funciona.
+"""
+import time
+
+from boot import is_banner
+
+BAUD_INICIAL = 9600
+BAUD_OFFERS = (250000, 115200, 57600)
+FW_REVERT_S = 1.0   # lo que espera el sketch el PING antes de volver a 9600
+
+def _readline(ser):
+    return ser.readline().decode("utf-8", errors="ignore").strip()
+
+def _offer(ser, rate, timeout, boot_deadline, lines):
+    """
+    Ofrece `rate`. Devuelve True (aceptada), False (rechazada) o None (el
+    Arduino todavía no contesta nada: sigue en el bootloader).
+    """
+    alive = False
+    started = False
+    while True:
+        ser.write(f"BAUD {rate}\n".encode("utf-8"))
+        ser.flush()
+        t_end = time.monotonic() + timeout
+        resend = False
+        while time.monotonic() < t_end:
+            line = _readline(ser)
+            if not line:
+                continue
+            if lines is not None:
+                lines.append((time.monotonic(), line))
+            if line == f"OK BAUD {rate}":
+                return True
+            if line.startswith("ERR BAUD"):
+                return False
+            if is_banner(line) and not started:
+                # el sketch recién arrancó: la oferta anterior se perdió en
+                # el bootloader, se manda de nuevo
+                started = resend = True
+                break
+            alive = True   # otra respuesta: el sketch ya corre
+        if resend:
+            continue
+        if alive or started:
+            return False   # sketch viejo: no entiende BAUD
+        if time.monotonic() > boot_deadline:
+            return None
+
+def _confirm(ser, rate, timeout):
+    ser.baudrate = rate
+    time.sleep(0.02)
+    ser.reset_input_buffer()
+    ser.write(b"PING\n")
+    ser.flush()
+    t_end = time.monotonic() + timeout
+    while time.monotonic() < t_end:
+        if _readline(ser) == f"PONG {rate}":
+            return True
+    return False
+
+def negotiate_baud(ser, offers=BAUD_OFFERS, timeout=0.4, boot_wait=2.5, lines=None):
+    """
+    Corre el handshake sobre un serial.Serial ya abierto a BAUD_INICIAL
+    (bloqueante, llamarlo antes de arrancar lectores/escritores).
+    Devuelve el baudrate con el que quedó el enlace. En `lines` (una lista)
+    quedan (time.monotonic(), línea) de lo que contestó el sketch, banner
+    incluido (ver boot.py).
+    """
+    old_timeout = ser.timeout
+    ser.timeout = 0.05
+    boot_deadline = time.monotonic() + boot_wait
+    try:
+        for rate in offers:
+            ok = _offer(ser, rate, timeout, boot_deadline, lines)
+            if ok is None:
+                print("[WARN] El Arduino no contesta: se queda en "
+                      f"{BAUD_INICIAL} baudios")
+                break
+            if not ok:
+                continue
+            if _confirm(ser, rate, timeout):
+                print(f"[INFO] Enlace serie negociado a {rate} baudios")
+                return rate
+            # el Arduino vuelve solo a 9600 si no vio el PING
+            print(f"[WARN] {rate} baudios falló la prueba, se vuelve a {BAUD_INICIAL}")
+            ser.baudrate = BAUD_INICIAL
+            time.sleep(FW_REVERT_S + 0.1)
+            ser.reset_input_buffer()
+        ser.baudrate = BAUD_INICIAL
+        return BAUD_INICIAL
+    finally:
+        ser.timeout = old_timeout
@@ -0,0 +1,62 @@
+"""
+Comandos por segundo a cada velocidad, contra un Arduino simulado (pty).
+
+    python3 bench_baud.py                 # texto, 2 s por velocidad
+    python3 bench_baud.py --proto bin -t 3
+
+Para cada velocidad el gateway abre a 9600, negocia (baud.py) y después
+manda poses de 3 servos tan rápido como el enlace las saca; se cuenta
+cuántos comandos aplicó el Arduino. La última fila simula un enlace que
+falla a 250000 para mostrar el respaldo.
+"""
+import argparse
+import asyncio
+import time
+
+from baud import BAUD_INICIAL
+from fake_arduino import FakeArduino
+from serial_link import SerialLink
+
+async def run_rate(rate, proto, seconds, garbled_above=None):
+    dev = FakeArduino("servo3", binary=(proto == "bin"), garbled_above=garbled_above).start()
+    offers = () if rate == BAUD_INICIAL else (rate,)
+    t0 = time.perf_counter()
+    link = SerialLink(dev.port, BAUD_INICIAL, proto=proto, offers=offers)
+    await link.start()
+    t_neg = time.perf_counter() - t0
+    await link.ready.wait()
+
+    n0 = len(dev.applied)
+    t_end = time.perf_counter() + seconds
+    i = 0
+    while time.perf_counter() < t_end:
+        # el Coalescer se queda con el último valor por servo: se mide lo
+        # que el enlace realmente alcanza a entregar
+        for sid in (1, 2, 3):
+            link.send(sid, (i + 30 * sid) % 181)
+        i += 1
+        await asyncio.sleep(0.0005)
+    await asyncio.sleep(0.1)
+    applied = len(dev.applied) - n0
+
+    final = link.baudrate
+    await link.close()
+    dev.stop()
+    return final, applied / seconds, t_neg
+
+async def main(args):
+    rows = []
+    for rate in (9600, 57600, 115200, 250000):
+        rows.append((rate,) + await run_rate(rate, args.proto, args.t))
+    rows.append((250000,) + await run_rate(250000, args.proto, args.t, garbled_above=115200))
+
+    print(f"\nProtocolo {args.proto}, {args.t:.0f} s por velocidad (Arduino simulado)")
+    print(f"{'pedido':>8} {'final':>8} {'cmd/s':>9} {'poses/s':>9} {'negociar s':>11}")
+    for rate, final, cps, t_neg in rows:
+        print(f"{rate:8d} {final:8d} {cps:9.0f} {cps / 3:9.0f} {t_neg:11.2f}")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--proto", choices=("text", "bin"), default="text")
+    ap.add_argument("-t", type=float, default=2.0)
+    asyncio.run(main(ap.parse_args()))
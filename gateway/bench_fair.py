@@ -0,0 +1,126 @@
+"""
+Latencia de un operador mientras otro cliente satura el enlace (pty).
+
+    python3 bench_fair.py               # 40 movimientos a 9600
+    python3 bench_fair.py -n 100 --baud 115200 --hog-hz 2000
+
+"hog" manda sin parar ángulos a los servos 4..15 (canales distintos: el
+Coalescer no los puede fundir) mucho más rápido de lo que sale por el
+cable. "operador" mueve el servo 1 cada 100 ms y se mide hasta que el
+Arduino lo aplica. Sin reparto el operador espera detrás de la fila del
+hog; con fairness.py cada uno tiene su mitad del enlace y la cola los
+atiende por turnos.
+
+Al final se verifica que un STOP descarte lo que el reparto tenía guardado:
+si no, el motor volvía a arrancar con el último valor después del paro.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from devices import Registry
+from fairness import FairShare
+from fake_arduino import FakeArduino
+from frames import CH_MOTOR
+from serial_link import SerialLink
+
+def pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(p / 100.0 * len(xs)))]
+
+async def hog(reg, hz, done):
+    i = 0
+    while not done.is_set():
+        for _ in range(max(1, int(hz / 100))):
+            i += 1
+            reg.send(f"arm.{4 + i % 12}", i % 181, "hog")
+        await asyncio.sleep(0.01)
+
+async def wait_applied(dev, value, t0, timeout=5.0):
+    while time.monotonic() - t0 < timeout:
+        for i in range(len(dev.applied) - 1, -1, -1):
+            if dev.applied_t[i] < t0:
+                break
+            if dev.applied[i] == (1, value):
+                return (dev.applied_t[i] - t0) * 1000.0
+        await asyncio.sleep(0.001)
+    return None
+
+async def run_one(fair, n, baud, hz):
+    dev = FakeArduino("servo3", baudrate=baud, binary=False, servos=15).start()
+    link = SerialLink(dev.port, baud)
+    reg = Registry()
+    reg.add("arm", link)
+    if fair:
+        reg.fair = FairShare()
+        link.sched.weights = reg.fair.weights
+    await reg.start()
+    await link.ready.wait()   # que arranque el sketch (banner)
+
+    done = asyncio.Event()
+    gen = asyncio.create_task(hog(reg, hz, done))
+    await asyncio.sleep(0.5)
+    lat = []
+    applied0, t_start = len(dev.applied), time.monotonic()
+    for k in range(n):
+        await asyncio.sleep(0.1)
+        value = 10 + k % 160
+        t0 = time.monotonic()
+        reg.send("arm.1", value, "operador")
+        ms = await wait_applied(dev, value, t0)
+        if ms is not None:
+            lat.append(ms)
+    rate = (len(dev.applied) - applied0) / (time.monotonic() - t_start)
+    done.set()
+    await gen
+    await reg.close()
+    dev.stop()
+    return lat, rate
+
+async def stop_check(baud):
+    """Un cliente pasado de su parte y después STOP: el motor queda en 0."""
+    dev = FakeArduino("motor", baudrate=baud, binary=False).start()
+    link = SerialLink(dev.port, baud)
+    reg = Registry()
+    reg.add("motor", link)
+    reg.fair = FairShare()
+    reg.stop_hooks.append(reg.fair.on_stop)
+    await reg.start()
+    await link.ready.wait()
+    for v in range(1, 120):
+        reg.send("motor.0", v, "hog")
+        await asyncio.sleep(0.001)
+    held = sum(len(h) for h in reg.fair.held.values())
+    reg.stop("motor.0", 0)
+    await asyncio.sleep(1.0)   # más que lo que tardaba el _flush pendiente
+    motor = [v for ch, v in dev.applied if ch == CH_MOTOR]
+    await reg.close()
+    dev.stop()
+    return held, motor[-1] if motor else None
+
+async def main(args):
+    print(f"\n{args.n} movimientos del operador con un hog a {args.hog_hz} cmd/s, "
+          f"{args.baud} baudios (Arduino simulado)")
+    results = {}
+    for name, fair in (("sin reparto", False), ("reparto", True)):
+        results[name] = await run_one(fair, args.n, args.baud, args.hog_hz)
+    print(f"\n{'modo':12} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'perdidos':>9} {'aplicados/s':>12}")
+    for name, (lat, rate) in results.items():
+        if not lat:
+            print(f"{name:12} {'-':>8} {'-':>8} {'-':>8} {args.n:9d} {rate:12.0f}")
+            continue
+        print(f"{name:12} {statistics.median(lat):8.1f} {pct(lat, 95):8.1f} {max(lat):8.1f} "
+              f"{args.n - len(lat):9d} {rate:12.0f}")
+    held, last = await stop_check(args.baud)
+    print(f"\nSTOP con {held} valores guardados: motor quedó en {last} "
+          f"({'ok' if last == 0 else 'MAL: siguió después del paro'})")
+    if last != 0:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-n", type=int, default=40)
+    ap.add_argument("--baud", type=int, default=9600)
+    ap.add_argument("--hog-hz", type=int, default=1000)
+    asyncio.run(main(ap.parse_args()))
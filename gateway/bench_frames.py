@@ -0,0 +1,89 @@
+"""
+Ida y vuelta texto vs tramas binarias contra un Arduino simulado (pty).
+
+    python3 bench_frames.py            # 200 comandos por protocolo a 9600
+    python3 bench_frames.py -n 500 --baud 115200
+    python3 bench_frames.py --window 4   # hasta 4 comandos en vuelo a la vez
+
+Para cada protocolo manda comandos "servo id ángulo", espera el OK/ACK de
+cada uno y reporta bytes por comando (ida y vuelta) y latencia p50/p95.
+Al final prueba el modo "auto" contra un sketch de solo texto (respaldo).
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from fake_arduino import FakeArduino
+from serial_link import SerialLink
+
+def pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(p / 100.0 * len(xs)))]
+
+async def run_one(proto, n, baud, window=1):
+    dev = FakeArduino("servo3", baudrate=baud, binary=(proto == "bin")).start()
+    link = SerialLink(dev.port, baud, proto=proto)
+    await link.start()
+    await link.ready.wait()   # que arranque el sketch (banner)
+
+    bytes_in0, bytes_out0 = dev.bytes_in, dev.bytes_out
+    lat = []
+    fails = 0
+    sem = asyncio.Semaphore(window)
+
+    async def one(i):
+        nonlocal fails
+        async with sem:
+            t0 = time.perf_counter()
+            r = await link.request(1 + i % 3, (i * 7) % 181)
+            if r is None or not r.startswith("OK"):
+                fails += 1
+                return
+            lat.append((time.perf_counter() - t0) * 1000.0)
+
+    t_start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n)))
+    rate = n / (time.perf_counter() - t_start)
+
+    tx = (dev.bytes_in - bytes_in0) / n
+    rx = (dev.bytes_out - bytes_out0) / n
+    await link.close()
+    dev.stop()
+    return tx, rx, lat, fails, rate
+
+async def check_fallback(baud):
+    dev = FakeArduino("servo3", baudrate=baud, binary=False).start()
+    link = SerialLink(dev.port, baud, proto="auto")
+    await link.start()
+    r = await link.request(2, 135)
+    await link.close()
+    dev.stop()
+    return link.codec.binary, r
+
+async def main(args):
+    results = {}
+    for proto in ("text", "bin"):
+        results[proto] = await run_one(proto, args.n, args.baud, args.window)
+
+    print(f"\n{args.n} comandos a {args.baud} baudios, {args.window} en vuelo (Arduino simulado)")
+    print(f"{'proto':6} {'tx B/cmd':>9} {'rx B/cmd':>9} {'p50 ms':>8} {'p95 ms':>8} {'cmd/s':>7} {'fallos':>7}")
+    for proto, (tx, rx, lat, fails, rate) in results.items():
+        p50 = statistics.median(lat) if lat else float("nan")
+        p95 = pct(lat, 95) if lat else float("nan")
+        print(f"{proto:6} {tx:9.2f} {rx:9.2f} {p50:8.2f} {p95:8.2f} {rate:7.0f} {fails:7d}")
+
+    t, b = results["text"], results["bin"]
+    if t[2] and b[2]:
+        print(f"\nAhorro: {100 * (1 - (b[0] + b[1]) / (t[0] + t[1])):.0f}% bytes, "
+              f"{100 * (1 - statistics.median(b[2]) / statistics.median(t[2])):.0f}% latencia p50")
+
+    binary, r = await check_fallback(args.baud)
+    print(f"Respaldo auto -> {'binario' if binary else 'texto'} con sketch de texto, respuesta: {r!r}")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-n", type=int, default=200)
+    ap.add_argument("--baud", type=int, default=9600)
+    ap.add_argument("--window", type=int, default=1)
+    asyncio.run(main(ap.parse_args()))
@@ -0,0 +1,71 @@
+"""
+Tres líneas sueltas vs una pose, contra un Arduino simulado (pty).
+
+    python3 bench_pose.py              # 100 poses de 3 servos a 9600
+    python3 bench_pose.py -n 200 --baud 115200 --servos 15
+
+Mueve todos los servos a la vez, una y otra vez: "sueltos" manda un
+"sid ang" por servo (como hacía _send_all) y "pose" una sola orden
+("P a1 a2 a3" o la trama 0xA6). Reporta bytes por movimiento, el desfase
+entre el primer y el último servo en aplicarse y el tiempo hasta que se
+aplica el último. Hasta 15 servos: como valor suelto el id 16 es el canal
+del LED (ver frames.py); en una pose no hay ese límite.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from fake_arduino import FakeArduino
+from serial_link import SerialLink
+
+def pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(p / 100.0 * len(xs)))]
+
+async def run_one(proto, mode, n, baud, servos):
+    dev = FakeArduino("servo3", baudrate=baud, binary=(proto == "bin"), servos=servos).start()
+    link = SerialLink(dev.port, baud, proto=proto)
+    await link.start()
+    await link.ready.wait()   # que arranque el sketch (banner)
+
+    bytes_in0 = dev.bytes_in
+    skew, done = [], []
+    for i in range(n):
+        angles = [(i * 7 + k * 11) % 181 for k in range(servos)]
+        n0 = len(dev.applied)
+        t0 = time.monotonic()
+        if mode == "pose":
+            link.send_pose(angles)
+        else:
+            for sid, ang in enumerate(angles, start=1):
+                link.send(sid, ang)
+        while len(dev.applied) - n0 < servos:
+            await asyncio.sleep(0.0005)
+        ts = dev.applied_t[n0:n0 + servos]
+        skew.append((max(ts) - min(ts)) * 1000.0)
+        done.append((max(ts) - t0) * 1000.0)
+    tx = (dev.bytes_in - bytes_in0) / n
+    await link.close()
+    dev.stop()
+    return tx, skew, done
+
+async def main(args):
+    results = {}
+    for proto in ("text", "bin"):
+        for mode in ("sueltos", "pose"):
+            results[(proto, mode)] = await run_one(proto, mode, args.n, args.baud, args.servos)
+
+    print(f"\n{args.n} movimientos de {args.servos} servos a {args.baud} baudios (Arduino simulado)")
+    print(f"{'proto':6} {'modo':8} {'tx B/mov':>9} {'desfase p50':>12} {'desfase max':>12} "
+          f"{'último p50':>11}")
+    for (proto, mode), (tx, skew, done) in results.items():
+        print(f"{proto:6} {mode:8} {tx:9.1f} {statistics.median(skew):10.2f}ms "
+              f"{max(skew):10.2f}ms {statistics.median(done):9.2f}ms")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-n", type=int, default=100)
+    ap.add_argument("--baud", type=int, default=9600)
+    ap.add_argument("--servos", type=int, default=3)
+    asyncio.run(main(ap.parse_args()))
@@ -0,0 +1,98 @@
+"""
+Latencia de un stop con el enlace saturado (Arduino simulado, sketch motor).
+
+    python3 bench_stop.py                # 20 stops a 9600
+    python3 bench_stop.py -n 50 --baud 115200 --window 30
+
+Un generador mantiene `window` comandos del motor en vuelo (request(), que
+van en FIFO y no se reemplazan), así la cola de escritura nunca está vacía.
+En medio se manda un 0 y se mide hasta que el Arduino lo aplica:
+  - normal   : send(), por el mismo camino que los sliders
+  - prioridad: stop(), carril urgente (vacía la cola de la placa)
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from fake_arduino import FakeArduino
+from frames import CH_MOTOR
+from serial_link import SerialLink
+
+def pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(p / 100.0 * len(xs)))]
+
+async def flood(link, window, done):
+    sem = asyncio.Semaphore(window)
+
+    async def one(v):
+        try:
+            await link.request(CH_MOTOR, v, timeout=5.0)
+        finally:
+            sem.release()
+
+    tasks = set()
+    while not done.is_set():
+        await sem.acquire()
+        t = asyncio.create_task(one(random.randint(1, 255)))   # nunca 0
+        tasks.add(t)
+        t.add_done_callback(tasks.discard)
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+async def wait_applied(dev, t0, timeout=5.0):
+    start = len(dev.applied)
+    while time.monotonic() - t0 < timeout:
+        for i in range(start, len(dev.applied)):
+            if dev.applied[i] == (CH_MOTOR, 0) and dev.applied_t[i] >= t0:
+                return (dev.applied_t[i] - t0) * 1000.0
+        await asyncio.sleep(0.001)
+    return None
+
+async def run_one(mode, n, baud, window):
+    dev = FakeArduino("motor", baudrate=baud, binary=False).start()
+    link = SerialLink(dev.port, baud)
+    await link.start()
+    await link.ready.wait()   # que arranque el sketch (banner)
+
+    done = asyncio.Event()
+    gen = asyncio.create_task(flood(link, window, done))
+    lat = []
+    for _ in range(n):
+        await asyncio.sleep(0.2 + random.random() * 0.1)   # que la cola se llene
+        t0 = time.monotonic()
+        if mode == "prioridad":
+            link.stop(CH_MOTOR, 0)
+        else:
+            link.send(CH_MOTOR, 0)
+        ms = await wait_applied(dev, t0)
+        if ms is not None:
+            lat.append(ms)
+    done.set()
+    await gen
+    await link.close()
+    dev.stop()
+    return lat
+
+async def main(args):
+    print(f"\n{args.n} stops a {args.baud} baudios, {args.window} comandos en vuelo (Arduino simulado)")
+    results = {}
+    for mode in ("normal", "prioridad"):
+        results[mode] = await run_one(mode, args.n, args.baud, args.window)
+    print(f"\n{'modo':10} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'perdidos':>9}")
+    for mode, lat in results.items():
+        if not lat:
+            print(f"{mode:10} {'-':>8} {'-':>8} {'-':>8} {args.n:9d}")
+            continue
+        print(f"{mode:10} {statistics.median(lat):8.1f} {pct(lat, 95):8.1f} "
+              f"{max(lat):8.1f} {args.n - len(lat):9d}")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-n", type=int, default=20)
+    ap.add_argument("--baud", type=int, default=9600)
+    ap.add_argument("--window", type=int, default=24)
+    asyncio.run(main(ap.parse_args()))
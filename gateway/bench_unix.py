@@ -0,0 +1,95 @@
+"""
+Latencia por pedido Flask -> servidor del mismo Pi: TCP loopback vs socket Unix.
+
+    python3 bench_unix.py            # 2000 pedidos por transporte
+    python3 bench_unix.py -n 10000
+
+Levanta gateway.py en seco (--serial none) en otro proceso y hace lo mismo
+que send_cmd() de led_webonoff/app.py: conectar, mandar una línea, leer la
+respuesta y cerrar. La línea es STATE, que se contesta desde memoria, así
+que lo que se mide es solo el transporte (y el gateway).
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from mux import unlink_stale
+
+PORT = 5992
+UNIX = "/tmp/arduino_bench_{port}.sock"
+
+def pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(p / 100.0 * len(xs)))]
+
+def one(connect):
+    t0 = time.perf_counter()
+    with connect() as s:
+        s.sendall(b"STATE\n")
+        buf = b""
+        while not buf.endswith(b"\n"):
+            chunk = s.recv(4096)
+            if not chunk:
+                break
+            buf += chunk
+    return (time.perf_counter() - t0) * 1e6
+
+def tcp():
+    return socket.create_connection(("127.0.0.1", PORT), timeout=3)
+
+def unix():
+    s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    s.settimeout(3)
+    s.connect(UNIX.format(port=PORT))
+    return s
+
+def wait_listening(connect, timeout=10.0):
+    """Hasta que el gateway atiende (el archivo del socket no alcanza)."""
+    t_end = time.monotonic() + timeout
+    while True:
+        try:
+            connect().close()
+            return
+        except OSError:
+            if time.monotonic() > t_end:
+                raise
+            time.sleep(0.05)
+
+def main(args):
+    here = os.path.dirname(os.path.abspath(__file__))
+    off = [f"--{name}-port=0" for name in ("pwm", "multi", "servo", "motor")]
+    unlink_stale(UNIX.format(port=PORT))   # el de una corrida anterior
+    gw = subprocess.Popen(
+        [sys.executable, os.path.join(here, "gateway.py"), "--serial", "none",
+         "--offer-baud", "", "--mux", "", "--state-file", "", "--udp-port", "0",
+         "--metrics-port", "0", "--health-s", "0", "--deadman", "",
+         "--led-port", str(PORT), "--unix", UNIX, *off],
+        stdout=subprocess.DEVNULL)
+    try:
+        wait_listening(tcp)
+        wait_listening(unix)
+        results = {}
+        for name, connect in (("tcp", tcp), ("unix", unix)):
+            for _ in range(100):   # calentar
+                one(connect)
+            results[name] = [one(connect) for _ in range(args.n)]
+    finally:
+        gw.terminate()
+        gw.wait()
+
+    print(f"\n{args.n} pedidos (conectar + STATE + respuesta + cerrar)")
+    print(f"{'transporte':10} {'p50 us':>8} {'p95 us':>8} {'media us':>9}")
+    for name, lat in results.items():
+        print(f"{name:10} {statistics.median(lat):8.0f} {pct(lat, 95):8.0f} "
+              f"{statistics.mean(lat):9.0f}")
+    t, u = statistics.median(results["tcp"]), statistics.median(results["unix"])
+    print(f"\nSocket Unix: {100 * (1 - u / t):.0f}% menos latencia p50")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-n", type=int, default=2000)
+    main(ap.parse_args())
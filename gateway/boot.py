@@ -0,0 +1,41 @@
+"""
+Arranque del Arduino: esperar a que el sketch esté listo.
+
+Abrir /dev/ttyACM0 reinicia el UNO: mientras corre el bootloader (1.5-2 s)
+todo lo que llega por el puerto se pierde. Los sketches avisan que ya
+corren con su banner de setup() ("Listo...", "Arduino listo..."), así que
+se espera eso en vez de un sleep fijo. slider_servo.ino no imprime nada:
+ahí se espera READY_TIMEOUT y se sigue igual.
+
+SerialLink (serial_link.py) no bloquea: encola y funde en el Coalescer lo
+que llega mientras tanto y lo suelta con el banner. Los servidores viejos
+(servo_tcp_server*.py, tcp.py, ...) llaman a wait_ready() después de abrir
+el puerto y antes de atender clientes.
+"""
+import time
+
+READY_BANNERS = ("Listo", "Arduino listo")   # comienzo del banner de cada sketch
+READY_TIMEOUT = 2.5   # seg: un sketch sin banner ya corre seguro después de esto
+
+def is_banner(line):
+    return line.startswith(READY_BANNERS)
+
+def wait_ready(ser, timeout=READY_TIMEOUT):
+    """
+    Lee líneas de un serial.Serial recién abierto hasta ver el banner
+    (bloqueante). Devuelve los segundos que tardó o None si no llegó.
+    """
+    t0 = time.monotonic()
+    old_timeout = ser.timeout
+    ser.timeout = 0.05
+    try:
+        while time.monotonic() - t0 < timeout:
+            line = ser.readline().decode("utf-8", errors="ignore").strip()
+            if line and is_banner(line):
+                secs = time.monotonic() - t0
+                print(f"[INFO] Arduino listo en {secs:.2f} s")
+                return secs
+        print(f"[WARN] Sin banner del Arduino en {timeout:g} s: se sigue igual")
+        return None
+    finally:
+        ser.timeout = old_timeout
@@ -0,0 +1,63 @@
+"""
+Reloj de paso fijo para lo que el Pi reproduce solo (trayectorias,
+formas de onda del LED).
+
+El siguiente tick es el anterior + período, no "ahora + período", así que
+no acumula deriva; se muestrea en el instante ideal del tick y no cuando
+despertó el loop. Si el loop se atrasa más de un período se saltan ticks
+(no se corre para alcanzar). Sin nada activo el reloj duerme.
+"""
+import asyncio
+import math
+
+class FixedRateLoop:
+    """Subclases: active() -> bool, tick(now), idle() opcional."""
+    def __init__(self, hz):
+        if not (hz > 0 and math.isfinite(hz)):
+            raise ValueError(f"frecuencia no válida: {hz} (tiene que ser > 0)")
+        self.period = 1.0 / hz
+        self.wake = asyncio.Event()
+        self.task = None
+        self.ticks = 0
+        self.skipped = 0
+
+    def active(self):
+        raise NotImplementedError
+
+    def tick(self, now):
+        raise NotImplementedError
+
+    def idle(self):
+        pass
+
+    def now(self):
+        return asyncio.get_running_loop().time()
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        nxt = loop.time()
+        while True:
+            if not self.active():
+                self.wake.clear()
+                self.idle()
+                await self.wake.wait()
+                nxt = loop.time()
+            nxt += self.period
+            delay = nxt - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif -delay > self.period:
+                lost = int(-delay / self.period)
+                self.skipped += lost
+                nxt += lost * self.period
+            if not self.active():
+                continue   # se canceló mientras dormía
+            self.ticks += 1
+            self.tick(nxt)
@@ -0,0 +1,131 @@
+import asyncio
+
+class Coalescer:
+    """
+    Cola de escritura "gana el último valor" por canal.
+    - put(data, canal): si ese canal ya tenía un valor pendiente se reemplaza
+      (y se cuenta en `superseded`); si no, se agrega al final.
+    - put(data) sin canal: va en orden FIFO y nunca se descarta.
+    - put(..., to_end=True): el valor nuevo pasa al final de la fila (para
+      que salga después de una pose que ya esperaba, ver frames.py).
+    - discard(canal): saca el valor pendiente de ese canal (lo reemplaza
+      una pose).
+    - put_urgent(data): carril de prioridad (stop / paro de emergencia):
+      sale antes que todo lo normal que esté esperando.
+    - flush(): descarta todo lo normal pendiente (lo usa el stop).
+    - take(max_bytes, max_items): espera a que haya algo y devuelve
+      (bloque, tags): lo pendiente en un solo bloque de bytes, listo para un
+      único ser.write(). Primero lo urgente; de lo normal, como mucho
+      max_bytes / max_items (siempre al menos una entrada), para que un stop
+      nunca espere más que un bloque corto.
+    Así a 9600 baudios nunca se acumula una fila de ángulos viejos.
+    Cada entrada puede llevar un `tag` (canal, SEQ): put() devuelve el tag
+    del valor reemplazado y flush() los de los descartados, para que
+    SerialLink deje de esperar sus ACK.
+    put(..., owner=cliente): con entradas de varios clientes, take() las
+    saca por turnos (round-robin ponderado por `weights`, el que hace más
+    que no sale va primero); las de un mismo cliente, en su orden.
+    """
+    def __init__(self):
+        self.pending = {}          # clave -> (data, tag)
+        self.urgent = []           # (data, tag)
+        self.event = asyncio.Event()
+        self.submitted = 0
+        self.superseded = 0
+        self.flushed = 0
+        self._fifo_seq = 0
+        self.owners = {}           # clave -> cliente (solo las que tienen)
+        self.weights = {}          # cliente -> entradas por turno (1 si no está)
+        self._served = {}          # cliente -> n.º de la última vez que salió algo suyo
+        self._turn = 0
+
+    def __len__(self):
+        return len(self.pending) + len(self.urgent)
+
+    def put(self, data: bytes, channel=None, tag=None, to_end=False, owner=None):
+        """Encola; devuelve el tag del valor pendiente que reemplazó (o None)."""
+        self.submitted += 1
+        replaced = None
+        if channel is None:
+            self._fifo_seq += 1
+            channel = ("fifo", self._fifo_seq)
+        elif channel in self.pending:
+            # conserva su lugar en la fila, pero con el valor nuevo
+            self.superseded += 1
+            replaced = self.pending[channel][1]
+            if to_end:
+                del self.pending[channel]
+        self.pending[channel] = (data, tag)
+        if owner is not None:
+            self.owners[channel] = owner
+        else:
+            self.owners.pop(channel, None)
+        self.event.set()
+        return replaced
+
+    def discard(self, channel):
+        """Saca lo pendiente de ese canal; devuelve su tag (o None)."""
+        entry = self.pending.pop(channel, None)
+        if entry is None:
+            return None
+        self.owners.pop(channel, None)
+        self.superseded += 1
+        return entry[1]
+
+    def put_urgent(self, data: bytes, tag=None):
+        self.submitted += 1
+        self.urgent.append((data, tag))
+        self.event.set()
+
+    def flush(self):
+        """Descarta lo normal pendiente; devuelve sus tags."""
+        tags = [tag for _, tag in self.pending.values() if tag is not None]
+        self.flushed += len(self.pending)
+        self.pending.clear()
+        self.owners.clear()
+        return tags
+
+    def _order(self):
+        """Claves pendientes en el orden en que van a salir."""
+        if not self.owners:
+            return list(self.pending)
+        queues = {}
+        for key in self.pending:
+            queues.setdefault(self.owners.get(key), []).append(key)
+        if len(queues) == 1:
+            return list(self.pending)
+        turn = sorted(queues, key=lambda o: self._served.get(o, 0))
+        order = []
+        while turn:
+            for owner in list(turn):
+                q = queues[owner]
+                n = max(1, self.weights.get(owner, 1))
+                order += q[:n]
+                del q[:n]
+                if not q:
+                    turn.remove(owner)
+        return order
+
+    async def take(self, max_bytes=None, max_items=None):
+        while not self.pending and not self.urgent:
+            self.event.clear()
+            await self.event.wait()
+        out = b"".join(data for data, _ in self.urgent)
+        tags = [tag for _, tag in self.urgent]
+        self.urgent.clear()
+        n = 0
+        for key in self._order():
+            if max_items is not None and n >= max_items and out:
+                break
+            data, tag = self.pending[key]
+            if out and max_bytes is not None and len(out) + len(data) > max_bytes:
+                break
+            out += data
+            tags.append(tag)
+            del self.pending[key]
+            owner = self.owners.pop(key, None)
+            if owner is not None:
+                self._turn += 1
+                self._served[owner] = self._turn
+            n += 1
+        return out, tags
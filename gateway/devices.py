@@ -0,0 +1,314 @@
+"""
+Registro de placas: varios Arduinos, cada uno en su puerto USB.
+
+Los protocolos hablan con canales lógicos ("arm.1", "led.pwm", "motor.0")
+y el registro los traduce a (enlace serie, canal físico). Cada placa tiene
+su propio SerialLink con sus hilos de E/S: el brazo no espera al motor.
+
+Las placas se reconocen por el banner que imprimen en setup():
+    "Listo. Envia: id ang ..."           -> arm   (slider_servo3_ino)
+    "Arduino listo (LED)"                -> led   (led_onoff_bin_ino)
+    "Listo LED PWM"                      -> pwm   (slider_led_ino)
+    "Arduino listo. Esperando comandos"  -> motor (puentehBTS7960direccionPWM)
+slider_servo.ino no imprime nada: solo se usa si se asigna a mano
+(--device servo=/dev/ttyACM1).
+"""
+import asyncio
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+import serial
+import serial.tools.list_ports
+
+from baud import BAUD_INICIAL, BAUD_OFFERS
+from frames import CH_LED, CH_MOTOR, CH_POSE, CH_PWM, CH_SERVO, MAX_POSE
+from serial_link import SerialLink
+from state import StateTable
+import tracing
+
+DeviceSpec = namedtuple("DeviceSpec", "banner baud offers channels")
+
+DEVICES = {
+    "arm":   DeviceSpec("Listo. Envia: id ang", BAUD_INICIAL, BAUD_OFFERS,
+                        {f"arm.{i}": i for i in range(1, 16)}),
+    "led":   DeviceSpec("Arduino listo (LED)", BAUD_INICIAL, BAUD_OFFERS,
+                        {"led.onoff": CH_LED}),
+    "pwm":   DeviceSpec("Listo LED PWM", BAUD_INICIAL, BAUD_OFFERS,
+                        {"led.pwm": CH_PWM}),
+    "servo": DeviceSpec(None, BAUD_INICIAL, BAUD_OFFERS,
+                        {"servo.0": CH_SERVO}),
+    # el sketch del motor abre a 115200 y no negocia
+    "motor": DeviceSpec("Arduino listo. Esperando comandos", 115200, (),
+                        {"motor.0": CH_MOTOR}),
+}
+
+# valor seguro de cada canal para el paro de emergencia; los servos no
+# tienen: se descarta lo pendiente y se quedan donde están
+STOP_VALUES = {"motor.0": 0, "led.pwm": 0, "led.onoff": 0}
+
+DETECT_WAIT = 3.0   # seg: el UNO se reinicia al abrir el puerto
+
+def match_banner(line):
+    for name, spec in DEVICES.items():
+        if spec.banner and line.startswith(spec.banner):
+            return name
+    return None
+
+def candidate_ports():
+    return [p.device for p in serial.tools.list_ports.comports()
+            if "ttyACM" in p.device or "ttyUSB" in p.device or p.device.startswith("COM")]
+
+def probe_port(port, wait=DETECT_WAIT):
+    """
+    Abre `port` a cada baudrate conocido y espera un banner.
+    Devuelve (nombre, serial abierto, segundos hasta el banner) o None. El
+    puerto queda abierto para que SerialLink no vuelva a reiniciar la placa.
+    """
+    for baud in sorted({spec.baud for spec in DEVICES.values()}):
+        t_open = time.monotonic()
+        try:
+            ser = serial.Serial(port, baud, timeout=0.1)
+        except serial.SerialException as e:
+            print(f"[WARN] No pude abrir {port}: {e}")
+            return None
+        t_end = time.monotonic() + wait
+        while time.monotonic() < t_end:
+            line = ser.readline().decode("utf-8", errors="ignore").strip()
+            name = match_banner(line) if line else None
+            if name is not None:
+                # a un baudrate equivocado el banner llega como basura, así
+                # que si se leyó bien ya es el correcto (salvo en un pty)
+                ser.baudrate = DEVICES[name].baud
+                return name, ser, time.monotonic() - t_open
+        ser.close()
+    return None
+
+def detect(ports=None):
+    """Prueba todos los puertos a la vez. Devuelve {nombre: (puerto, serial, s hasta listo)}."""
+    ports = candidate_ports() if ports is None else ports
+    found = {}
+    if not ports:
+        return found
+    with ThreadPoolExecutor(max_workers=len(ports)) as pool:
+        for port, res in zip(ports, pool.map(probe_port, ports)):
+            if res is None:
+                print(f"[INFO] {port}: sin banner conocido")
+                continue
+            name, ser, ready_s = res
+            if name in found:
+                print(f"[WARN] {port}: otra placa '{name}', se ignora")
+                ser.close()
+                continue
+            print(f"[INFO] {port}: detectado '{name}', listo en {ready_s:.2f} s")
+            found[name] = (port, ser, ready_s)
+    return found
+
+class Registry:
+    """
+    Canal lógico -> (SerialLink, canal físico).
+    Lleva además la tabla de estado (ver state.py): lo que se mandó por
+    cada canal lógico y lo que cada placa confirmó.
+    """
+    def __init__(self, state=None):
+        self.links = {}
+        self.routes = {}
+        self.boards = {}          # SerialLink -> DeviceSpec (None = un solo Arduino)
+        self.state = state if state is not None else StateTable()
+        self.player = None        # trayectorias (trajectory.py), lo pone gateway.py
+        self.waves = None         # patrones del LED PWM (waveform.py), ídem
+        self.guard = None         # límites del brazo (limits.py), ídem
+        self.fair = None          # parte de cada cliente (fairness.py), ídem
+        self.stop_hooks = []      # f(link, logical) en cada stop; None = todas / toda la placa
+        self._warned = set()
+
+    def add(self, name, link, spec=None):
+        """Con spec=None el enlace atiende TODOS los canales (un solo Arduino)."""
+        self.links[name] = link
+        self.boards[link] = spec
+        specs = [spec] if spec is not None else DEVICES.values()
+        logical_of = {}
+        for sp in specs:
+            for logical, ch in sp.channels.items():
+                self.routes[logical] = (link, ch)
+                logical_of[ch] = logical
+
+        def on_ack(ch, value):
+            if ch == CH_POSE:
+                for i, v in enumerate(value):
+                    if v is not None and i + 1 in logical_of:
+                        on_ack(i + 1, v)
+                return
+            logical = logical_of.get(ch)
+            if logical is not None:
+                self.state.acked(logical, value)
+        link.acks.on_ack = on_ack
+
+    def owned(self, link):
+        """
+        {canal lógico: canal físico} de la placa que está en `link`. Con un
+        solo Arduino (spec=None) todos los canales van a ese enlace pero la
+        placa es una sola: se reconoce por su banner; sin banner, ninguno.
+        """
+        spec = self.boards.get(link)
+        if spec is None:
+            spec = DEVICES.get(match_banner(link.banner or ""))
+        return spec.channels if spec is not None else {}
+
+    def route(self, logical):
+        r = self.routes.get(logical)
+        if r is None and logical not in self._warned:
+            self._warned.add(logical)
+            print(f"[WARN] Ninguna placa atiende '{logical}'")
+        return r
+
+    def allowed(self, values, client=None):
+        """¿La pose que resulta de {canal lógico: valor} pasa los límites?"""
+        if self.guard is None:
+            return True
+        arm = {int(l[4:]): v for l, v in values.items() if l.startswith("arm.")}
+        if not arm:
+            return True
+        return self.guard.check(arm, lambda sid: self.state.target(f"arm.{sid}"), client)
+
+    def send(self, logical, value, client=None):
+        """False si ninguna placa atiende el canal o la pose está prohibida."""
+        r = self.route(logical)
+        if r is None or not self.allowed({logical: value}, client):
+            return False
+        self._admit(r[0], {logical: value}, client)
+        return True
+
+    def pose(self, values, client=None):
+        """
+        {"arm.1": 90, "arm.3": 45, ...} en una sola orden por placa (trama
+        de pose, ver frames.py): los servos de una placa se mueven juntos.
+        Si la pose está prohibida (limits.py) no sale nada.
+        """
+        if not self.allowed(values, client):
+            return False
+        by_link = {}
+        ok = True
+        for logical, value in values.items():
+            r = self.route(logical)
+            if r is None:
+                ok = False
+                continue
+            by_link.setdefault(r[0], {})[logical] = value
+        for link, chans in by_link.items():
+            self._admit(link, chans, client)
+        return ok
+
+    def _admit(self, link, values, client):
+        # lo que pasa de la parte del cliente sale después (fairness.py)
+        if (self.fair is None or client is None
+                or self.fair.admit(link, client, values, self._deliver)):
+            self._deliver(link, values, client)
+            return
+        trace = tracing.current.get()
+        if trace is not None:
+            trace.out = "held"
+
+    def _deliver(self, link, values, client=None):
+        """{canal lógico: valor} de una placa: los servos del brazo juntos."""
+        arm = {}
+        for logical, value in values.items():
+            ch = self.routes[logical][1]
+            if logical.startswith("arm.") and 1 <= ch <= MAX_POSE:
+                arm[ch] = value
+            else:
+                link.send(ch, value, client)   # no es un servo del brazo: va suelto
+            self.state.commanded(logical, value)
+        if len(arm) > 1:
+            link.send_pose([arm.get(i) for i in range(1, max(arm) + 1)], client)
+        elif arm:
+            ch, value = arm.popitem()
+            link.send(ch, value, client)
+
+    def stop(self, logical, value=0, only=False):
+        """
+        Prioridad: vacía la cola de esa placa y manda value primero (None =
+        solo vaciar). only=True (watchdog): solo ese canal; lo de los demás
+        clientes en la misma placa sigue.
+        """
+        r = self.route(logical)
+        if r is None:
+            return False
+        link, ch = r
+        link.stop(ch if value is not None else None, value, only)
+        for hook in self.stop_hooks:
+            hook(link, logical if only else None)
+        if value is not None:
+            self.state.commanded(logical, value)
+        return True
+
+    def estop(self):
+        """
+        Paro de emergencia: todas las placas, cada canal a su valor seguro.
+        Solo los canales que la placa tiene de verdad (owned): con un solo
+        Arduino el "0" del motor le llegaría al servo y lo llevaría a 0°.
+        """
+        for link in self.links.values():
+            link.stop()
+        for hook in self.stop_hooks:
+            hook(None)
+        for link in self.links.values():
+            for logical, ch in self.owned(link).items():
+                if logical in STOP_VALUES:
+                    link.stop(ch, STOP_VALUES[logical])
+                    self.state.commanded(logical, STOP_VALUES[logical])
+
+    async def request(self, logical, value, timeout=1.0, client=None):
+        r = self.route(logical)
+        if r is None:
+            return None
+        if not self.allowed({logical: value}, client):
+            return "ERR:LIMIT"
+        link, ch = r
+        if self.fair is not None and client is not None and not self.fair.admit(link, client):
+            return "ERR:BUSY"
+        self.state.commanded(logical, value)
+        return await link.request(ch, value, timeout, client)
+
+    async def start(self):
+        await asyncio.gather(*(link.start() for link in self.links.values()))
+
+    async def close(self):
+        await asyncio.gather(*(link.close() for link in self.links.values()),
+                             return_exceptions=True)
+
+async def build_registry(serial_port, baud, proto, offers, assigned=(), state=None):
+    """
+    - state: tabla de estado ya cargada del disco (ver state.py).
+    - assigned = ["arm=/dev/ttyACM0", ...]: placas asignadas a mano.
+    - offers = () desactiva la negociación de velocidad en todas las placas.
+    - serial_port = "auto": detectar por banner los puertos que quedan.
+    - serial_port = "none": sin Arduino (en seco).
+    - otro valor: un solo Arduino en ese puerto con todos los canales
+      (como los servidores viejos).
+    """
+    reg = Registry(state)
+    for item in assigned:
+        name, _, port = item.partition("=")
+        spec = DEVICES[name]
+        reg.add(name, SerialLink(port, spec.baud, proto=proto,
+                                 offers=spec.offers if offers else (), name=name), spec)
+
+    if serial_port == "auto":
+        used = {link.port for link in reg.links.values()}
+        ports = [p for p in candidate_ports() if p not in used]
+        loop = asyncio.get_running_loop()
+        found = await loop.run_in_executor(None, detect, ports)
+        for name, (port, ser, ready_s) in found.items():
+            if name in reg.links:
+                ser.close()
+                continue
+            spec = DEVICES[name]
+            link = SerialLink(port, spec.baud, proto=proto, offers=spec.offers if offers else (),
+                              ser=ser, name=name)
+            link.ready_s = ready_s
+            reg.add(name, link, spec)
+    elif not assigned:
+        port = None if serial_port.lower() == "none" else serial_port
+        reg.add("default", SerialLink(port, baud, proto=proto, offers=offers, name="default"))
+    return reg
@@ -0,0 +1,160 @@
+"""
+Reparto del puerto serie entre clientes (token bucket por cliente).
+
+Un cliente que manda más rápido de lo que el enlace saca (a 9600 baudios,
+unos 100 comandos/s) no debe dejar sin lugar a los demás. Cada cliente
+(protocolo + IP, como en limits.py) tiene por placa un balde de fichas
+que se llena a su parte de la capacidad medida del enlace:
+
+    parte = capacidad * peso / suma de pesos de los clientes activos
+
+(capacidad medida por SerialLink.capacity(); activo = mandó algo en los
+últimos ACTIVE_S). Con un solo cliente su parte es todo el
+enlace y no cambia nada. Lo que pasa de la parte:
+  - valores sueltos y poses: se guarda el último por canal y sale cuando
+    hay ficha (mismo criterio que el Coalescer: gana el más nuevo)
+  - REQ / LED_ON...: se contesta "ERR:BUSY" en el momento
+Lo que ya entró lo ordena el Coalescer de cada placa por round-robin
+ponderado entre clientes (coalesce.py), con los mismos pesos.
+Lo que genera el gateway (patrones del LED, watchdog, STOP) no pasa por acá.
+Un STOP / ESTOP descarta lo guardado de esa placa y el watchdog solo lo
+de su canal (on_stop, en Registry.stop_hooks): si no, salía después del paro.
+"""
+import asyncio
+import time
+from collections import Counter
+
+FAIR_BURST_S = 0.25   # ráfaga: este tiempo de la parte de cada uno, de una vez
+ACTIVE_S = 2.0        # un cliente callado más que esto deja su parte a los demás
+RATES_S = 0.5         # cada cuánto se recalculan las partes
+
+POSE = object()       # clave de la pose guardada de un cliente
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "t")
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.t = now
+
+    def take(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.t) * self.rate)
+        self.t = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+    def wait(self):
+        """Segundos hasta la próxima ficha."""
+        return max(0.0, (1.0 - self.tokens) / self.rate)
+
+class FairShare:
+    def __init__(self, weights=None, burst_s=FAIR_BURST_S):
+        self.weights = dict(weights or {})   # cliente -> peso (1 si no está)
+        self.burst_s = burst_s
+        self.buckets = {}                    # (link, cliente) -> TokenBucket
+        self.seen = {}                       # (link, cliente) -> último comando
+        self.held = {}                       # (link, cliente) -> {canal lógico: valor}
+        self._timers = {}                    # (link, cliente) -> call_later de _flush
+        self.deferred = Counter()            # cliente -> comandos demorados/fundidos
+        self.busy = Counter()                # cliente -> ERR:BUSY
+        self._t_rates = 0.0
+
+    def weight(self, client):
+        return max(1, self.weights.get(client, 1))
+
+    def _rates(self, now):
+        """Parte de cada cliente activo, por placa."""
+        self._t_rates = now
+        active = {}
+        for key, t in list(self.seen.items()):
+            if now - t > ACTIVE_S and key not in self.held:
+                del self.seen[key]
+                self.buckets.pop(key, None)
+                continue
+            active.setdefault(key[0], []).append(key)
+        for link, keys in active.items():
+            cap = link.capacity()
+            total = sum(self.weight(k[1]) for k in keys)
+            for key in keys:
+                rate = cap * self.weight(key[1]) / total
+                b = self.buckets.get(key)
+                if b is None:
+                    self.buckets[key] = TokenBucket(rate, max(1.0, rate * self.burst_s), now)
+                else:
+                    b.rate, b.burst = rate, max(1.0, rate * self.burst_s)
+
+    def admit(self, link, client, values=None, deliver=None):
+        """
+        True = puede salir ya. Si no: con `values` se guardan y
+        deliver(link, values, client) los manda de a una orden por ficha;
+        sin `values` (un REQ) el que llama contesta ERR:BUSY.
+        Guardado: un valor suelto pisa al anterior de ese canal; una pose
+        se funde con la pose guardada y deja viejos los sueltos que trae.
+        """
+        now = time.monotonic()
+        key = (link, client)
+        new = key not in self.seen
+        self.seen[key] = now
+        if new or now - self._t_rates > RATES_S:
+            self._rates(now)
+        held = self.held.get(key)
+        if held is None and self.buckets[key].take(now):
+            return True
+        if values is None:
+            self.busy[client] += 1
+            return False
+        self.deferred[client] += 1
+        if held is None:
+            held = self.held[key] = {}
+            self._timers[key] = asyncio.get_running_loop().call_later(
+                self.buckets[key].wait(), self._flush, key, deliver)
+        if len(values) > 1:
+            for logical in values:
+                held.pop(logical, None)
+            pose = held.pop(POSE, {})
+            pose.update(values)
+            held[POSE] = pose
+        else:
+            logical, value = next(iter(values.items()))
+            held.pop(logical, None)   # al final: sale después de una pose guardada
+            held[logical] = {logical: value}
+        return False
+
+    def _flush(self, key, deliver):
+        b = self.buckets.get(key)
+        held = self.held[key]
+        if b is None or b.take(time.monotonic()):
+            unit = next(iter(held))
+            deliver(key[0], held.pop(unit), key[1])
+        if not held:
+            del self.held[key]
+            del self._timers[key]
+            return
+        self._timers[key] = asyncio.get_running_loop().call_later(
+            b.wait() if b is not None else 0.0, self._flush, key, deliver)
+
+    def on_stop(self, link, logical=None):
+        """
+        Registry.stop/estop: lo guardado para esa placa (None = todas) no
+        sale. Con `logical` (watchdog) solo lo de ese canal, de cualquier cliente.
+        """
+        for key in [k for k in self.held if link is None or k[0] is link]:
+            held = self.held[key]
+            if logical is not None:
+                held.pop(logical, None)
+                pose = held.get(POSE)
+                if pose is not None:
+                    pose.pop(logical, None)
+                    if not pose:
+                        del held[POSE]
+                if held:
+                    continue
+            del self.held[key]
+            self._timers.pop(key).cancel()
+
+    def stats(self):
+        return {"deferred": dict(self.deferred), "busy": dict(self.busy)}
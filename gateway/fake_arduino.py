@@ -0,0 +1,223 @@
+"""
+Arduino simulado sobre un pty, para probar el gateway sin placa.
+
+    dev = FakeArduino("servo3", binary=True).start()
+    link = SerialLink(dev.port, ...)
+
+Imita el tiempo de línea (10 bits por byte al baudrate elegido) y un costo
+de parseo por comando: el de texto (readStringUntil/parseInt + toInt) es
+bastante más caro en un UNO que leer 5 bytes de una trama.
+
+También entiende el handshake de baud.py: `rates` son las velocidades que
+acepta y por encima de `garbled_above` el enlace "se rompe" (acepta el
+cambio pero el PING nunca llega y vuelve a 9600, como el sketch real).
+
+Arranca como el UNO al abrir el puerto: durante boot_delay (bootloader)
+lo que llega se pierde y recién después imprime el banner del sketch.
+
+"servo3" entiende además la pose ("P a1 a2 ..." o la trama 0xA6, ver
+frames.py) con `servos` canales: valida todo y aplica todos los servos en
+el mismo instante (mismo applied_t).
+"""
+import os
+import pty
+import select
+import threading
+import time
+import tty
+
+from baud import BAUD_INICIAL, FW_REVERT_S
+from frames import (CH_LED, CH_MOTOR, CH_PING, CH_POSE, CH_PWM, CH_SERVO, Decoder, Frame,
+                    encode_frame)
+
+BOOT_S = 0.2            # bootloader simulado (uno real tarda 1.5-2 s)
+TEXT_PARSE_S = 0.0006   # costo aprox. de parsear una línea de texto en un UNO
+BIN_PARSE_S  = 0.00005  # costo aprox. de validar una trama (CRC8 de 3 bytes)
+
+BANNERS = {
+    "servo3": "Listo. Envia: id ang  (ej: 2 135) o id,ang (ej: 2,135)",
+    "servo":  "",
+    "pwm":    "Listo LED PWM",
+    "motor":  "Arduino listo. Esperando comandos... (Versión corregida)",
+    "led":    "Arduino listo (LED)",
+}
+
+class FakeArduino:
+    def __init__(self, sketch="servo3", baudrate=BAUD_INICIAL, binary=True, boot_delay=BOOT_S,
+                 rates=(57600, 115200, 250000), garbled_above=None, servos=3):
+        self.sketch = sketch
+        self.servos = servos
+        self.baudrate = baudrate
+        self.binary = binary
+        self.boot_delay = boot_delay
+        self.rates = set(rates)
+        self.garbled_above = garbled_above
+        self._ping_deadline = None   # esperando PING tras cambiar de velocidad
+        self.master, self.slave = pty.openpty()
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)
+        self.applied = []          # (canal, valor) en el orden en que se aplicaron
+        self.applied_t = []        # time.monotonic() de cada uno
+        self.state = {}
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._decoder = Decoder()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        # esperar al hilo antes de cerrar: si no, el número de fd se reusa
+        # en el siguiente pty y este hilo le robaría los datos
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        for fd in (self.master, self.slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def _wire(self, nbytes):
+        time.sleep(nbytes * 10.0 / self.baudrate)
+
+    def _reply(self, data):
+        self._wire(len(data))
+        self.bytes_out += len(data)
+        os.write(self.master, data)
+
+    def _println(self, text):
+        self._reply((text + "\r\n").encode("utf-8"))
+
+    def _run(self):
+        if self.boot_delay:
+            # bootloader: lo que llegue mientras tanto se pierde
+            if self._stop.wait(self.boot_delay):
+                return
+            try:
+                while select.select([self.master], [], [], 0)[0]:
+                    os.read(self.master, 65536)
+            except OSError:
+                return
+        if BANNERS.get(self.sketch):
+            self._println(BANNERS[self.sketch])
+        while not self._stop.is_set():
+            if self._ping_deadline and time.monotonic() > self._ping_deadline:
+                self._ping_deadline = None
+                self.baudrate = BAUD_INICIAL   # no llegó el PING: volver a 9600
+            try:
+                ready, _, _ = select.select([self.master], [], [], 0.05)
+                if not ready:
+                    continue
+                # de a pocos bytes (~5 ms de línea) para que el tiempo de
+                # cable se reparta entre comandos y no por bloques de 4 KB
+                data = os.read(self.master, max(1, self.baudrate // 2000))
+            except (OSError, ValueError):
+                return
+            if not data:
+                return
+            if self._ping_deadline and self.garbled_above and self.baudrate > self.garbled_above:
+                continue   # a esta velocidad el enlace no sirve: todo llega roto
+            self.bytes_in += len(data)
+            self._wire(len(data))
+            for item in self._decoder.feed(data):
+                if isinstance(item, Frame):
+                    if self.binary:
+                        self._on_frame(item)
+                else:
+                    self._on_line(item)
+
+    # ---------- binario ----------
+    def _on_frame(self, f):
+        time.sleep(BIN_PARSE_S)
+        if f.channel == CH_POSE:
+            if self.sketch != "servo3" or not self._pose_ok(f.value):
+                return
+            self._apply_pose(f.value)
+        elif f.channel != CH_PING:
+            self._apply(f.channel, f.value)
+        self._reply(encode_frame(f.channel, f.value, f.seq))
+
+    # ---------- texto (igual que los sketches originales) ----------
+    def _on_line(self, line):
+        time.sleep(TEXT_PARSE_S)
+        if line.startswith("BAUD "):
+            self._on_baud(line)
+        elif line == "PING" and self._ping_deadline:
+            self._ping_deadline = None
+            self._println(f"PONG {self.baudrate}")
+        elif self.sketch == "servo3":
+            parts = line.replace(",", " ").split()
+            if parts and parts[0] == "P":
+                try:
+                    pose = [None if v == "-" else int(v) for v in parts[1:]]
+                except ValueError:
+                    pose = []
+                if self._pose_ok(pose):
+                    self._apply_pose(pose)
+                    self._println("OK P " + " ".join(str(self.state.get(i, 90))
+                                                     for i in range(1, len(pose) + 1)))
+                else:
+                    self._println(f"Dato invalido. id 1-{self.servos}, ang 0-180")
+                return
+            try:
+                sid, ang = int(parts[0]), int(parts[1])
+            except (ValueError, IndexError):
+                return
+            if 1 <= sid <= self.servos and 0 <= ang <= 180:
+                self._apply(sid, ang)
+                self._println(f"OK {sid} {ang}")
+            else:
+                self._println(f"Dato invalido. id 1-{self.servos}, ang 0-180")
+        elif self.sketch == "led":
+            if line in ("LED_ON", "LED_OFF"):
+                self._apply(CH_LED, 1 if line == "LED_ON" else 0)
+                self._println("OK:" + line)
+            else:
+                self._println("ERR:CMD")
+        elif self.sketch in ("servo", "pwm", "motor"):
+            try:
+                v = int(line)
+            except ValueError:
+                return
+            if self.sketch == "servo" and 0 <= v <= 180:
+                self._apply(CH_SERVO, v)
+                self._println(str(v))
+            elif self.sketch == "pwm" and 0 <= v <= 255:
+                self._apply(CH_PWM, v)
+            elif self.sketch == "motor":
+                self._apply(CH_MOTOR, v)
+                self._println(f"Nuevo target FIJADO en: {v}")
+
+    def _on_baud(self, line):
+        try:
+            rate = int(line.split()[1])
+        except (ValueError, IndexError):
+            rate = 0
+        if rate not in self.rates:
+            self._println("ERR BAUD")
+            return
+        self._println(f"OK BAUD {rate}")
+        self.baudrate = rate
+        self._ping_deadline = time.monotonic() + FW_REVERT_S
+
+    def _pose_ok(self, values):
+        return (1 <= len(values) <= self.servos
+                and all(v is None or 0 <= v <= 180 for v in values))
+
+    def _apply_pose(self, values):
+        t = time.monotonic()
+        for sid, v in enumerate(values, start=1):
+            if v is not None:
+                self.state[sid] = v
+                self.applied.append((sid, v))
+                self.applied_t.append(t)
+
+    def _apply(self, channel, value):
+        self.state[channel] = value
+        self.applied.append((channel, value))
+        self.applied_t.append(time.monotonic())
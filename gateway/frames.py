@@ -0,0 +1,159 @@
+"""
+Formato de trama binaria Pi <-> Arduino (opcional) y su respaldo en texto.
+
+Trama (5 bytes):
+    0xA5 | CH | VAL | SEQ | CRC8
+  - CH  : bits 0–6 = canal; bit 7 = signo de VAL (1 = negativo)
+  - VAL : magnitud 0–255
+  - SEQ : contador 0–255 (el Arduino lo devuelve en su ACK)
+  - CRC8: polinomio 0x07 sobre CH, VAL, SEQ
+El Arduino confirma reenviando la misma trama (ACK = eco).
+
+Trama de pose (todos los servos de una vez, se aplican juntos):
+    0xA6 | N | V1 .. VN | SEQ | CRC8
+  - N   : cantidad de canales (1..MAX_POSE); Vi va al servo i
+  - Vi  : ángulo 0–180; 0xFF = ese servo no se toca
+  - CRC8: sobre N, V1..VN, SEQ
+  texto: "P v1 v2 ... vN\n" ("-" = no se toca) -> "OK P a1 a2 ... aN"
+Internamente la pose viaja como canal CH_POSE con una tupla de valores
+(None = no se toca).
+
+Canales:
+    1..15  servo con id (slider_servo3_ino)   texto: "sid ang\\n"
+    0      servo único (slider_servo.ino)      texto: "ang\\n"
+    0x10   LED on/off (VAL 1/0)                texto: "LED_ON\\n" / "LED_OFF\\n"
+    0x11   LED PWM 0–255                       texto: "v\\n"
+    0x20   motor BTS7960 -255..255             texto: "v\\n"
+    0x7E   pose de servos (ver arriba)         texto: "P v1 v2 ...\\n"
+    0x7F   PING (para detectar si el sketch entiende binario)
+"""
+from collections import namedtuple
+
+START = 0xA5
+FRAME_LEN = 5
+POSE_START = 0xA6
+POSE_KEEP = 0xFF
+MAX_POSE = 32     # canales por pose (un PCA9685 tiene 16)
+
+CH_SERVO = 0
+CH_LED   = 0x10
+CH_PWM   = 0x11
+CH_MOTOR = 0x20
+CH_POSE  = 0x7E
+CH_PING  = 0x7F
+
+Frame = namedtuple("Frame", "channel value seq")
+
+def crc8(data, crc=0):
+    for b in data:
+        crc ^= b
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+    return crc
+
+def encode_pose_frame(values, seq):
+    body = bytes((len(values),)) + bytes(
+        POSE_KEEP if v is None else max(0, min(180, int(v))) for v in values) + bytes((seq & 0xFF,))
+    return bytes((POSE_START,)) + body + bytes((crc8(body),))
+
+def encode_pose_text(values):
+    return ("P " + " ".join("-" if v is None else str(v) for v in values) + "\n").encode("utf-8")
+
+def encode_frame(channel, value, seq):
+    if channel == CH_POSE:
+        return encode_pose_frame(value, seq)
+    ch = channel & 0x7F
+    if value < 0:
+        ch |= 0x80
+    body = bytes((ch, min(abs(int(value)), 255), seq & 0xFF))
+    return bytes((START,)) + body + bytes((crc8(body),))
+
+def encode_text(channel, value):
+    if channel == CH_POSE:
+        return encode_pose_text(value)
+    if channel == CH_LED:
+        return b"LED_ON\n" if value else b"LED_OFF\n"
+    if channel in (CH_PWM, CH_SERVO, CH_MOTOR):
+        return f"{value}\n".encode("utf-8")
+    return f"{channel} {value}\n".encode("utf-8")
+
+def reply_text(frame):
+    """ACK binario -> la misma respuesta que daría el sketch de texto."""
+    if frame.channel == CH_LED:
+        return "OK:LED_ON" if frame.value else "OK:LED_OFF"
+    if frame.channel == CH_POSE:
+        return "OK P " + " ".join("-" if v is None else str(v) for v in frame.value)
+    if frame.channel in (CH_PWM, CH_SERVO, CH_MOTOR):
+        return f"OK {frame.value}"
+    return f"OK {frame.channel} {frame.value}"
+
+def text_acks(channel):
+    """¿El sketch de texto contesta algo a este canal? (slider_led_ino no)."""
+    return channel != CH_PWM
+
+class Decoder:
+    """
+    Separa lo que llega del Arduino en tramas y líneas de texto (el banner
+    "Listo..." y los sketches viejos siguen hablando texto).
+    feed(bytes) -> lista de Frame o str, en el orden en que llegaron.
+    """
+    def __init__(self, max_line=256):
+        self.buf = bytearray()
+        self.text = bytearray()
+        self.max_line = max_line
+        self.bad_crc = 0
+
+    def feed(self, data):
+        self.buf += data
+        out = []
+        i = 0
+        n = len(self.buf)
+        while i < n:
+            b = self.buf[i]
+            if b == POSE_START and n - i >= 2 and 1 <= self.buf[i + 1] <= MAX_POSE:
+                end = i + self.buf[i + 1] + 4
+                if n < end:
+                    break   # pose incompleta: esperar más bytes
+                body = self.buf[i + 1:end - 1]
+                if crc8(body) == self.buf[end - 1]:
+                    values = tuple(None if v == POSE_KEEP else v for v in body[1:-1])
+                    out.append(Frame(CH_POSE, values, body[-1]))
+                    i = end
+                    continue
+                self.bad_crc += 1
+            elif b == POSE_START and n - i < 2:
+                break
+            if b == START:
+                if n - i < FRAME_LEN:
+                    break   # trama incompleta: esperar más bytes
+                ch, val, seq, crc = self.buf[i + 1:i + FRAME_LEN]
+                if crc8((ch, val, seq)) == crc:
+                    value = -val if ch & 0x80 else val
+                    out.append(Frame(ch & 0x7F, value, seq))
+                    i += FRAME_LEN
+                    continue
+                self.bad_crc += 1
+            if b == 0x0A:
+                line = self.text.decode("utf-8", errors="ignore").strip()
+                if line:
+                    out.append(line)
+                self.text.clear()
+            elif b != START and len(self.text) < self.max_line:
+                self.text.append(b)
+            i += 1
+        del self.buf[:i]
+        return out
+
+class TextCodec:
+    binary = False
+
+    def encode(self, channel, value, seq):
+        return encode_text(channel, value)
+
+class BinaryCodec:
+    binary = True
+
+    def encode(self, channel, value, seq):
+        return encode_frame(channel, value, seq)
+
+CODECS = {"text": TextCodec, "bin": BinaryCodec}
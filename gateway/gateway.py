@@ -0,0 +1,505 @@
+"""
+Gateway único (asyncio) que reemplaza a los cuatro servidores bloqueantes:
+  - led   : LED_ON / LED_OFF con respuesta OK:... (como led_webonoff/tcp.py)
+  - pwm   : un entero 0–255 por línea (como slider_led/slider_led_server)
+  - servo : un ángulo 0–180 por línea (como slider_servo/servo_tcp_server.py)
+  - multi : líneas "sid ang" (como slider_servo/servo_tcp_server_vds.py),
+            o "P a1 a2 a3" = pose: todos los servos juntos ("-" = no se toca)
+  - motor : velocidad -255..255 por línea (BTS7960, como engranajemasmotor24v.py)
+
+Cada cliente es una corrutina: muchos a la vez, y uno lento no frena al resto.
+El puerto serie lo maneja SerialLink con una tarea escritora; por canal
+(servo id, LED, PWM) solo se manda el valor más nuevo. Con varias placas
+cada una tiene su enlace y los protocolos usan canales lógicos ("arm.2",
+"led.pwm", "motor.0") que resuelve devices.Registry.
+Otros programas del mismo Pi (la app Flask) comparten las placas por el
+socket Unix de mux.py en vez de abrir el puerto serie.
+En cualquier puerto, la línea "STATE" devuelve en JSON lo último mandado y
+confirmado por canal (ver state.py), sin tocar el puerto serie, y
+"SUBSCRIBE" deja la conexión recibiendo cada cambio (de cualquier cliente).
+Una línea "@id t1 t2 t3 <comando>" es un comando trazado: con --trace se
+registra cuánto tardó en cada tramo hasta el ACK (tracing.py,
+trace_report.py).
+"STATS" devuelve en JSON las métricas (comandos, bytes, colas, ACKs...) que
+también se sirven a Prometheus en http://127.0.0.1:9101/metrics (metrics.py).
+"HEALTH [n]" devuelve las últimas n muestras de CPU, memoria, swap,
+temperatura y frecuencia del Pi junto a la latencia de los ACK de cada
+momento (health.py; también en http://127.0.0.1:9101/health).
+"STOP" (la placa de ese protocolo) y "ESTOP" (todas) van por el carril de
+prioridad: vacían lo pendiente y salen antes que cualquier otro comando.
+"HB" arma el hombre muerto de esa sesión (ver watchdog.py): si deja de
+mandar líneas, sus canales van a su valor seguro.
+Cada cliente tiene su parte del puerto serie (fairness.py): lo que manda de
+más se funde y sale después (o "ERR:BUSY" si esperaba respuesta), y la
+cola de cada placa atiende a los clientes por turnos.
+Toda pose del brazo pasa antes por la tabla de limits.py (mesa, choque
+consigo mismo, límites por articulación): si está prohibida no se manda y
+se le cuenta al cliente.
+Para arrastres continuos de servos hay además un puerto UDP con setpoints
+numerados (ver udp.py): se descarta lo viejo en vez de reintentarlo. O se
+manda la trayectoria entera (TRAJ, ver trajectory.py) y la recorre el Pi.
+En el puerto pwm, FADE / GFADE / BREATHE / BLINK arrancan un patrón que el
+Pi genera solo (ver waveform.py); cualquier valor suelto lo corta.
+
+Uso:
+  python3 gateway.py --serial /dev/ttyACM0 --multi-port 5001 --pwm-port 0
+  python3 gateway.py --serial auto          # detectar placas por su banner
+  python3 gateway.py --device arm=/dev/ttyACM0 --device motor=/dev/ttyACM1
+  (puerto 0 = protocolo desactivado; --serial none = sin Arduino)
+"""
+import argparse
+import asyncio
+import math
+import os
+import time
+
+from baud import BAUD_OFFERS
+from devices import build_registry
+from fairness import FairShare
+from health import HEALTH_S, Health
+from limits import PoseGuard
+from metrics import METRICS_HOST, METRICS_PORT, Metrics, ProtoStats, start_metrics
+from ringlog import LEVELS, RingLog, parse_sample
+from mux import MUX_SOCKET, start_mux, unlink_stale
+from state import StateTable, serve_subscriber
+import tracing
+from tracing import Tracer, split_line
+from trajectory import TrajectoryPlayer
+from udp import UDP_PORT, start_udp
+from watchdog import Watchdog
+from waveform import WAVE_HZ, WaveformEngine
+
+# --- CONFIGURACIÓN ---
+SERIAL_PORT = "/dev/ttyACM0"   # "auto" = detectar placas, "none" = sin Arduino
+BAUDRATE    = 9600
+SERIAL_PROTO = "text"   # "text" | "bin" | "auto" (ver frames.py)
+OFFER_BAUD   = BAUD_OFFERS   # velocidades a negociar (ver baud.py); () = 9600 fijo
+
+HOST = "0.0.0.0"
+PORTS = {            # 0 = desactivado
+    "pwm":   5000,   # slider_led_inter.py
+    "multi": 5001,   # slider_servo_inter*.py
+    "led":   5002,   # led_webonoff/app.py (TCP_PORT, el mismo que tcp.py)
+    "servo": 5003,
+    "motor": 5004,
+}
+# cada protocolo también escucha en un socket Unix, para clientes del mismo
+# Pi (la app Flask): mismo protocolo, sin pasar por la pila TCP
+UNIX_PATH = "/tmp/arduino_tcp_{port}.sock"   # "" = desactivado
+UDP_SETPOINTS = UDP_PORT   # setpoints "sesión seq sid ang" (0 = desactivado)
+MUX_PATH = MUX_SOCKET   # socket Unix para la app Flask ("" = desactivado)
+STATE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          "gateway_state.json")   # "" = no guardar
+
+# hombre muerto (solo sesiones que mandan "HB"): canal -> (seg sin latidos, valor seguro)
+DEADMAN = {
+    "motor.0":   (0.2, 0),
+    "led.pwm":   (1.0, 0),
+    "led.onoff": (1.0, 0),
+}
+
+IDLE_TIMEOUT  = 60.0   # seg sin datos antes de cerrar un cliente
+WRITE_TIMEOUT = 2.0    # seg máximos para mandarle una respuesta a un cliente
+MAX_LINE      = 256
+
+# parte del puerto serie de cada cliente (fairness.py): peso por cliente
+# ("protocolo IP", como en limits.py); sin peso = 1
+FAIR = True
+CLIENT_WEIGHTS = {}    # ej. {"multi 192.168.0.20": 2}
+
+# lo que pasa con los clientes va por ringlog.py (nunca frena al loop)
+LOG_LEVEL  = "INFO"     # "DEBUG" = además una línea por comando recibido ("cmd")
+LOG_SAMPLE = "cmd=10"   # de los "cmd", 1 de cada 10
+TRACE_FILE = ""         # trazas de los comandos con "@id" (tracing.py); "" = no
+# ----------------------
+
+log = RingLog(LOG_LEVEL, parse_sample(LOG_SAMPLE))
+
+VALID_LED_CMDS = {"LED_ON", "LED_OFF"}
+
+def clamp(x, lo, hi):
+    return max(lo, min(hi, x))
+
+def stop_cmd(reg, cmd, logical, value):
+    """STOP / ESTOP por el carril de prioridad. True si la línea era una de esas."""
+    if cmd == "ESTOP":
+        reg.estop()
+        return True
+    if cmd == "STOP":
+        reg.stop(logical, value)
+        return True
+    return False
+
+# ---------- Protocolos: línea del cliente -> canal/valor al Arduino (+ respuesta) ----------
+async def proto_led(reg, line, client=None):
+    cmd = line.upper()
+    if stop_cmd(reg, cmd, "led.onoff", 0):
+        return "OK:" + cmd
+    if cmd not in VALID_LED_CMDS:
+        return "ERR:CMD"
+    # Arduino responde: OK:LED_ON / OK:LED_OFF / ERR:CMD
+    resp = await reg.request("led.onoff", 1 if cmd == "LED_ON" else 0, client=client)
+    return resp or "ERR:TIMEOUT"
+
+async def proto_pwm(reg, line, client=None):
+    if stop_cmd(reg, line.upper(), "led.pwm", 0):
+        return None
+    if line[:1].isalpha():
+        if reg.waves is None or not reg.waves.handle(line.split()):
+            log.warn("bad", client=client, why="patrón no válido", line=line)
+        return None
+    try:
+        valor = int(line)
+    except ValueError:
+        log.warn("bad", client=client, why="datos no válidos", line=line)
+        return None
+    valor = clamp(valor, 0, 255)
+    if reg.waves is not None:
+        reg.waves.cancel()   # un valor suelto manda sobre el patrón
+    reg.send("led.pwm", valor, client)
+    return None
+
+async def proto_servo(reg, line, client=None):
+    # servo: STOP solo descarta lo pendiente (se queda en su ángulo)
+    if stop_cmd(reg, line.upper(), "servo.0", None):
+        return None
+    try:
+        angulo = int(line)
+    except ValueError:
+        log.warn("bad", client=client, why="datos no válidos", line=line)
+        return None
+    angulo = clamp(angulo, 0, 180)
+    reg.send("servo.0", angulo, client)
+    return None
+
+def parse_pose(values):
+    """["90", "-", "45"] -> {1: 90, 3: 45}; None si no es válida."""
+    if not 1 <= len(values) <= 15:
+        return None
+    pose = {}
+    for sid, v in enumerate(values, start=1):
+        if v == "-":
+            continue
+        try:
+            pose[sid] = clamp(int(v), 0, 180)
+        except ValueError:
+            return None
+    return pose or None
+
+async def proto_multi(reg, line, client=None):
+    if stop_cmd(reg, line.upper(), "arm.1", None):
+        return None
+    if line[:4].upper() == "TRAJ":
+        if reg.player is None or not reg.player.handle(line.split(), client):
+            log.warn("bad", client=client, why="trayectoria no válida", line=line)
+        return None
+    parts = line.replace(",", " ").split()
+    if parts and parts[0].upper() == "P":
+        pose = parse_pose(parts[1:])
+        if pose is None:
+            log.warn("bad", client=client, why="pose no válida", line=line)
+            return None
+        if reg.player is not None:
+            reg.player.cancel(list(pose))
+        reg.pose({f"arm.{sid}": ang for sid, ang in pose.items()}, client)
+        return None
+    if len(parts) != 2:
+        log.warn("bad", client=client, why="línea no válida", line=line)
+        return None
+    try:
+        sid = int(parts[0])
+        ang = int(parts[1])
+    except ValueError:
+        log.warn("bad", client=client, why="datos no válidos", line=line)
+        return None
+    if not 1 <= sid <= 15:
+        log.warn("bad", client=client, why="servo no válido", line=line)
+        return None
+    ang = clamp(ang, 0, 180)
+    if reg.player is not None:
+        reg.player.cancel([sid])   # un ángulo suelto manda sobre la trayectoria
+    reg.send(f"arm.{sid}", ang, client)
+    return None
+
+async def proto_motor(reg, line, client=None):
+    if stop_cmd(reg, line.upper(), "motor.0", 0):
+        return None
+    try:
+        vel = int(line)
+    except ValueError:
+        log.warn("bad", client=client, why="datos no válidos", line=line)
+        return None
+    vel = clamp(vel, -255, 255)
+    reg.send("motor.0", vel, client)
+    return None
+
+PROTOCOLS = {
+    "led":   proto_led,
+    "pwm":   proto_pwm,
+    "servo": proto_servo,
+    "multi": proto_multi,
+    "motor": proto_motor,
+}
+
+# canales que controla cada protocolo (los que cuida el hombre muerto)
+PROTO_CHANNELS = {
+    "led":   ["led.onoff"],
+    "pwm":   ["led.pwm"],
+    "servo": ["servo.0"],
+    "multi": [f"arm.{i}" for i in range(1, 16)],
+    "motor": ["motor.0"],
+}
+
+# ---------- Sesión TCP ----------
+async def serve_client(name, proto, reg, reader, writer, watchdog=None, metrics=None,
+                       tracer=None):
+    addr = writer.get_extra_info("peername")
+    client = f"{name} {addr[0]}" if isinstance(addr, tuple) else f"{name} unix"
+    stats = metrics.proto(name) if metrics is not None else ProtoStats()
+    stats.connections += 1
+    stats.active += 1
+    hb = None
+    try:
+        while True:
+            try:
+                raw = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+            except asyncio.TimeoutError:
+                stats.errors["idle"] += 1
+                break
+            except ConnectionError:
+                stats.errors["reset"] += 1
+                break
+            if not raw:
+                break
+            if len(raw) > MAX_LINE:
+                stats.errors["too_long"] += 1
+                log.warn("close", client=client, why="línea demasiado larga")
+                break
+            if hb is not None:
+                hb.touch()
+
+            line = raw.decode("utf-8", errors="ignore").strip()
+            trace = None
+            if line.startswith("@"):
+                # "@id t1 t2 t3 <comando>": comando trazado (ver tracing.py)
+                head, cmd = split_line(line)
+                if head is None:
+                    # prefijo roto: no se manda nada (ni lo que sobró de él)
+                    log.warn("bad", client=client, why="traza no válida", line=line)
+                    continue
+                line = cmd
+                if tracer is not None:
+                    trace = tracer.begin(head, line, client, time.time())
+            if not line:
+                continue
+            stats.commands += 1
+            log.debug("cmd", client=client, line=line)
+            cmd = line.upper()
+            if cmd == "HB":
+                if hb is None and watchdog is not None:
+                    hb = watchdog.session(PROTO_CHANNELS[name])
+                continue
+
+            if cmd == "SUBSCRIBE":
+                await serve_subscriber(reg.state, reader, writer)
+                break
+            if cmd == "STATE":
+                resp = reg.state.to_json()
+            elif cmd == "STATS" and metrics is not None:
+                resp = metrics.to_json()
+            elif cmd.split()[0] == "HEALTH" and metrics is not None and metrics.health is not None:
+                resp = metrics.health.command(cmd.split()[1:])
+            elif trace is not None:
+                token = tracing.current.set(trace)
+                try:
+                    resp = await proto(reg, line, client)
+                finally:
+                    tracing.current.reset(token)
+                    trace.idle()
+            else:
+                resp = await proto(reg, line, client)
+            if resp is not None:
+                writer.write((resp + "\n").encode("utf-8"))
+                try:
+                    await asyncio.wait_for(writer.drain(), WRITE_TIMEOUT)
+                except (asyncio.TimeoutError, ConnectionError):
+                    stats.errors["slow"] += 1
+                    log.warn("close", client=client, why="cliente lento")
+                    break
+    except ValueError:
+        # readline() sin '\n' más allá del límite del StreamReader
+        stats.errors["no_newline"] += 1
+        log.warn("close", client=client, why="datos sin salto de línea")
+    finally:
+        stats.active -= 1
+        if hb is not None:
+            watchdog.release(hb)
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+async def start_servers(reg, host, ports, watchdog=None, unix_path=UNIX_PATH, metrics=None,
+                        tracer=None):
+    servers = []
+    for name, port in ports.items():
+        if not port:
+            continue
+        proto = PROTOCOLS[name]
+        handler = (lambda r, w, n=name, p=proto:
+                   serve_client(n, p, reg, r, w, watchdog, metrics, tracer))
+        srv = await asyncio.start_server(handler, host, port, reuse_address=True,
+                                         limit=MAX_LINE * 4)
+        servers.append(srv)
+        print(f"Servidor {name.upper()} escuchando en {host}:{port}...")
+        if unix_path:
+            path = unix_path.format(port=port)
+            unlink_stale(path)
+            servers.append(await asyncio.start_unix_server(handler, path, limit=MAX_LINE * 4))
+            os.chmod(path, 0o666)   # la app Flask puede correr con otro usuario
+            print(f"Servidor {name.upper()} escuchando en {path}")
+    return servers
+
+async def run(args):
+    ports = {name: getattr(args, f"{name}_port") for name in PORTS}
+    log.level = LEVELS[args.log_level]
+    log.sample = args.log_sample
+    log.start()
+    state = StateTable(args.state_file or None)
+    state.load()
+    reg = await build_registry(args.serial, args.baud, args.proto, args.offer_baud,
+                               args.device, state)
+    if args.fair:
+        reg.fair = FairShare({**CLIENT_WEIGHTS, **dict(args.weight)})
+        reg.stop_hooks.append(reg.fair.on_stop)
+        for link in reg.links.values():
+            link.sched.weights = reg.fair.weights
+    if args.limits:
+        reg.guard = PoseGuard()
+        print(f"[limits] {reg.guard.forbidden()} de {len(reg.guard.arm)} poses (base, codo) prohibidas")
+    await reg.start()
+    saver = asyncio.create_task(state.autosave())
+    reg.player = TrajectoryPlayer(reg)
+    reg.stop_hooks.append(reg.player.on_stop)
+    reg.player.start()
+    reg.waves = WaveformEngine(reg, args.wave_hz)
+    reg.stop_hooks.append(reg.waves.on_stop)
+    reg.waves.start()
+    watchdog = Watchdog(reg, args.deadman) if args.deadman else None
+    if watchdog is not None:
+        watchdog.start()
+    metrics = Metrics(reg, log).start()
+    if args.health_s > 0:
+        metrics.health = Health(reg, args.health_s).start()
+    tracer = Tracer(args.trace).start() if args.trace else None
+    servers = await start_servers(reg, args.host, ports, watchdog, args.unix, metrics, tracer)
+    if args.mux:
+        servers.append(await start_mux(reg, args.mux, metrics))
+    udp = await start_udp(reg, args.host, args.udp_port) if args.udp_port else None
+    if udp is not None:
+        metrics.udp = udp[1]
+    if args.metrics_port:
+        servers.append(await start_metrics(metrics, METRICS_HOST, args.metrics_port))
+    try:
+        await asyncio.gather(*(s.serve_forever() for s in servers))
+    finally:
+        for s in servers:
+            s.close()
+        if udp is not None:
+            transport, proto = udp
+            transport.close()
+            print(f"UDP: {proto.accepted} setpoints, {proto.stale} viejos descartados, "
+                  f"{proto.bad} inválidos")
+        saver.cancel()
+        metrics.stop()
+        if metrics.health is not None:
+            metrics.health.stop()
+        if reg.fair is not None and (reg.fair.deferred or reg.fair.busy):
+            print(f"Reparto: {reg.fair.stats()}")
+        if reg.guard is not None and reg.guard.checked:
+            print(f"Límites: {reg.guard.stats()}")
+        reg.player.stop()
+        reg.waves.stop()
+        if watchdog is not None:
+            watchdog.stop()
+        await reg.close()
+        state.save()
+        if tracer is not None:
+            tracer.close()
+            print(f"Trazas: {tracer.traced} comandos en {tracer.path}")
+        log.close()
+        print(f"Log: {log.stats()}")
+
+def parse_rates(text):
+    return tuple(int(r) for r in text.split(",") if r.strip())
+
+def parse_hz(text):
+    hz = float(text)
+    if not (hz > 0 and math.isfinite(hz)):
+        raise argparse.ArgumentTypeError(f"tiene que ser > 0: {text}")
+    return hz
+
+def parse_weight(text):
+    """'multi 10.0.0.5=2' -> ("multi 10.0.0.5", 2)"""
+    client, _, w = text.rpartition("=")
+    return client.strip(), int(w)
+
+def parse_deadman(text):
+    """'motor.0=0.2:0,led.pwm=1:0' -> {"motor.0": (0.2, 0), ...}"""
+    out = {}
+    for item in text.split(","):
+        if not item.strip():
+            continue
+        logical, _, spec = item.strip().partition("=")
+        timeout, _, safe = spec.partition(":")
+        out[logical] = (float(timeout), int(safe or 0))
+    return out
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Gateway asyncio para LED / PWM / servos")
+    ap.add_argument("--serial", default=SERIAL_PORT, help="puerto serie, 'auto' o 'none'")
+    ap.add_argument("--device", action="append", default=[],
+                    help="placa asignada a mano, ej. arm=/dev/ttyACM0 (se puede repetir)")
+    ap.add_argument("--baud", type=int, default=BAUDRATE)
+    ap.add_argument("--proto", choices=("text", "bin", "auto"), default=SERIAL_PROTO)
+    ap.add_argument("--offer-baud", type=parse_rates, default=OFFER_BAUD,
+                    help="velocidades a negociar, ej. 250000,115200 ('' = no negociar)")
+    ap.add_argument("--host", default=HOST)
+    ap.add_argument("--unix", default=UNIX_PATH,
+                    help="socket Unix por protocolo, {port} = su puerto TCP ('' = no)")
+    ap.add_argument("--udp-port", type=int, default=UDP_SETPOINTS)
+    ap.add_argument("--mux", default=MUX_PATH, help="socket Unix del multiplexor ('' = no)")
+    ap.add_argument("--deadman", type=parse_deadman, default=DEADMAN,
+                    help="hombre muerto, ej. motor.0=0.2:0,arm.1=0.5:90 ('' = no)")
+    ap.add_argument("--no-fair", dest="fair", action="store_false", default=FAIR,
+                    help="sin reparto del puerto serie entre clientes (ver fairness.py)")
+    ap.add_argument("--weight", type=parse_weight, action="append", default=[],
+                    help="peso de un cliente en el reparto, ej. 'multi 10.0.0.5=2'")
+    ap.add_argument("--no-limits", dest="limits", action="store_false",
+                    help="no chequear las poses del brazo (ver limits.py)")
+    ap.add_argument("--log-level", choices=tuple(LEVELS), default=LOG_LEVEL)
+    ap.add_argument("--log-sample", type=parse_sample, default=parse_sample(LOG_SAMPLE),
+                    help="muestreo por tipo de registro, ej. cmd=100,bad=10")
+    ap.add_argument("--wave-hz", type=parse_hz, default=WAVE_HZ,
+                    help="pasos por segundo de los patrones del LED PWM")
+    ap.add_argument("--metrics-port", type=int, default=METRICS_PORT,
+                    help=f"HTTP local ({METRICS_HOST}) con /metrics de Prometheus (0 = no)")
+    ap.add_argument("--health-s", type=float, default=HEALTH_S,
+                    help="seg entre muestras de salud del Pi (0 = no, ver health.py)")
+    ap.add_argument("--trace", default=TRACE_FILE,
+                    help="archivo para las trazas de comandos con '@id' ('' = no, ver tracing.py)")
+    ap.add_argument("--state-file", default=STATE_FILE,
+                    help="JSON con el estado de los actuadores ('' = no guardar)")
+    for name, port in PORTS.items():
+        ap.add_argument(f"--{name}-port", type=int, default=port)
+    return ap.parse_args(argv)
+
+def main():
+    try:
+        asyncio.run(run(parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+Salud del Pi, muestreada junto con la latencia de los comandos.
+
+Cuando los servos se atrasan hay que saber si el Pi estaba caliente
+(baja la frecuencia), sin memoria (swap), o si otro proceso (el recargador
+de Flask en modo debug, por ejemplo) se comía la CPU. Cada HEALTH_S se lee
+/proc/stat, /proc/meminfo, /proc/loadavg, la zona térmica y la frecuencia
+de la CPU, y en la misma fila la latencia comando -> ACK de ese intervalo
+(acks.py), así se ven juntas. Las filas van a un anillo de arrays de
+floats de tamaño fijo (nada crece ni se aloca por muestra).
+
+    echo HEALTH | nc <pi> 5001          # últimas HEALTH_SHOW filas + resumen
+    echo "HEALTH 600" | nc <pi> 5001    # todo lo guardado
+    curl http://127.0.0.1:9101/health   # lo mismo por HTTP (metrics.py)
+
+También salen como gauges gateway_host_* en /metrics (la última muestra).
+El resumen compara las muestras lentas (ack_p95 en el 10 % más alto) con
+el resto y da la correlación de ack_p95 con cada medida del host.
+"""
+import asyncio
+import json
+import math
+import statistics
+import time
+from array import array
+from itertools import islice
+
+HEALTH_S = 1.0       # seg entre muestras (0 = sin muestreo)
+HEALTH_KEEP = 600    # filas guardadas (10 min a 1 Hz)
+HEALTH_SHOW = 60     # filas que devuelve HEALTH sin argumento
+
+PROC_STAT = "/proc/stat"
+MEMINFO = "/proc/meminfo"
+LOADAVG = "/proc/loadavg"
+THERMAL = "/sys/class/thermal/thermal_zone0/temp"                # m°C
+CPUFREQ = "/sys/devices/system/cpu/cpu0/cpufreq/scaling_cur_freq"  # kHz
+
+FIELDS = (
+    "t",             # time.time() de la muestra
+    "cpu",           # % de CPU ocupada, todo el Pi
+    "iowait",        # % esperando disco (swap, tarjeta SD)
+    "gw_cpu",        # % de un núcleo que usó el gateway
+    "load1",
+    "mem_avail_mb",
+    "swap_mb",       # swap en uso
+    "temp_c",
+    "freq_mhz",      # baja cuando el Pi se frena por temperatura
+    "cmd_s",         # comandos por segundo encolados al puerto serie
+    "acks",          # ACKs en el intervalo
+    "ack_p50",       # ms comando -> ACK en el intervalo
+    "ack_p95",
+    "ack_max",
+)
+HOST_FIELDS = ("cpu", "iowait", "gw_cpu", "load1", "mem_avail_mb", "swap_mb",
+               "temp_c", "freq_mhz", "cmd_s")
+NAN = float("nan")
+
+class Ring:
+    """Últimas `size` filas, una array('d') por columna."""
+    def __init__(self, fields, size):
+        self.fields = tuple(fields)
+        self.size = size
+        self.cols = [array("d", bytes(8 * size)) for _ in self.fields]
+        self.n = 0   # filas escritas desde el arranque
+
+    def __len__(self):
+        return min(self.n, self.size)
+
+    def append(self, row):
+        i = self.n % self.size
+        for col, v in zip(self.cols, row):
+            col[i] = v
+        self.n += 1
+
+    def rows(self, last=None):
+        """Las últimas `last` filas (todas si None), de la más vieja a la más nueva."""
+        k = len(self) if last is None else max(0, min(last, len(self)))
+        return [[col[i % self.size] for col in self.cols] for i in range(self.n - k, self.n)]
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read()
+    except OSError:
+        return None
+
+def read_cpu():
+    """(ocupada, iowait, total) en jiffies, línea "cpu" de /proc/stat."""
+    text = _read(PROC_STAT)
+    if text is None:
+        return None
+    v = [int(x) for x in text.split("\n", 1)[0].split()[1:]]
+    total = sum(v[:8])   # user..steal; guest ya está sumado en user
+    iowait = v[4] if len(v) > 4 else 0
+    return total - v[3] - iowait, iowait, total
+
+def read_meminfo():
+    """(MB disponibles, MB de swap en uso)."""
+    text = _read(MEMINFO)
+    if text is None:
+        return NAN, NAN
+    kb = {}
+    for line in text.splitlines():
+        key, _, rest = line.partition(":")
+        if key in ("MemAvailable", "SwapTotal", "SwapFree"):
+            kb[key] = int(rest.split()[0])
+    avail = kb["MemAvailable"] / 1024.0 if "MemAvailable" in kb else NAN
+    return avail, (kb.get("SwapTotal", 0) - kb.get("SwapFree", 0)) / 1024.0
+
+def read_number(path, scale=1.0):
+    text = _read(path)
+    try:
+        return float(text.split()[0]) * scale
+    except (AttributeError, IndexError, ValueError):
+        return NAN
+
+def pearson(pairs):
+    """
+    r de Pearson de [(x, y), ...]; None con menos de 2 pares o una medida
+    constante. A mano: statistics.correlation recién está en Python 3.10.
+    """
+    if len(pairs) < 2:
+        return None
+    mx = statistics.fmean(x for x, _ in pairs)
+    my = statistics.fmean(y for _, y in pairs)
+    sxy = sum((x - mx) * (y - my) for x, y in pairs)
+    sxx = sum((x - mx) ** 2 for x, _ in pairs)
+    syy = sum((y - my) ** 2 for _, y in pairs)
+    if sxx == 0 or syy == 0:
+        return None
+    return sxy / math.sqrt(sxx * syy)
+
+def _clean(v):
+    return None if math.isnan(v) else round(v, 3)
+
+class Health:
+    def __init__(self, reg, period=HEALTH_S, keep=HEALTH_KEEP):
+        self.reg = reg
+        self.period = period
+        self.ring = Ring(FIELDS, keep)
+        self._cpu = read_cpu()
+        self._proc = time.process_time()
+        self._t = time.monotonic()
+        self._acked = {}       # link -> acks.acked en la muestra anterior
+        self._submitted = sum(l.sched.submitted for l in reg.links.values())
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._loop())
+        return self
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.period)
+            self.sample()
+
+    def _latencies(self):
+        """ms de los ACK llegados desde la muestra anterior, de todas las placas."""
+        out = []
+        for link in self.reg.links.values():
+            acks = link.acks
+            new = acks.acked - self._acked.get(link, 0)
+            self._acked[link] = acks.acked
+            out.extend(islice(reversed(acks.latencies_ms), new))
+        return sorted(out)
+
+    def sample(self):
+        now, proc = time.monotonic(), time.process_time()
+        dt = max(1e-6, now - self._t)
+        cpu = read_cpu()
+        if cpu is not None and self._cpu is not None and cpu[2] > self._cpu[2]:
+            total = cpu[2] - self._cpu[2]
+            busy = 100.0 * (cpu[0] - self._cpu[0]) / total
+            iowait = 100.0 * (cpu[1] - self._cpu[1]) / total
+        else:
+            busy = iowait = NAN
+        avail, swap = read_meminfo()
+        submitted = sum(l.sched.submitted for l in self.reg.links.values())
+        lat = self._latencies()
+        if lat:
+            p50, p95, worst = lat[len(lat) // 2], lat[min(len(lat) - 1, int(0.95 * len(lat)))], lat[-1]
+        else:
+            p50 = p95 = worst = NAN
+        self.ring.append((
+            time.time(), busy, iowait, 100.0 * (proc - self._proc) / dt,
+            read_number(LOADAVG), avail, swap,
+            read_number(THERMAL, 0.001), read_number(CPUFREQ, 0.001),
+            (submitted - self._submitted) / dt, len(lat), p50, p95, worst,
+        ))
+        self._cpu, self._proc, self._t, self._submitted = cpu, proc, now, submitted
+
+    def latest(self):
+        rows = self.ring.rows(1)
+        return dict(zip(FIELDS, rows[0])) if rows else {}
+
+    def summary(self, rows):
+        """Muestras lentas contra el resto y correlación de ack_p95 con el host."""
+        idx = {f: i for i, f in enumerate(FIELDS)}
+        with_acks = [r for r in rows if not math.isnan(r[idx["ack_p95"]])]
+        if len(with_acks) < 3:
+            return {}
+        p95s = sorted(r[idx["ack_p95"]] for r in with_acks)
+        cut = p95s[int(0.9 * (len(p95s) - 1))]
+        if cut == p95s[-1]:
+            cut -= 1e-9   # el 10 % más alto son todas iguales: entran igual
+        slow = [r for r in with_acks if r[idx["ack_p95"]] > cut]
+        normal = [r for r in with_acks if r[idx["ack_p95"]] <= cut]
+
+        def means(group):
+            out = {"n": len(group)}
+            for f in ("ack_p95",) + HOST_FIELDS:
+                xs = [r[idx[f]] for r in group if not math.isnan(r[idx[f]])]
+                out[f] = round(statistics.fmean(xs), 3) if xs else None
+            return out
+
+        corr = {}
+        for f in HOST_FIELDS:
+            pairs = [(r[idx[f]], r[idx["ack_p95"]]) for r in with_acks if not math.isnan(r[idx[f]])]
+            r = pearson(pairs)
+            corr[f] = round(r, 3) if r is not None else None
+        return {"slow": means(slow), "normal": means(normal), "corr_ack_p95": corr}
+
+    def command(self, args):
+        """Comando "HEALTH [n]" (args = lo que sigue a HEALTH)."""
+        if not args:
+            return self.to_json()
+        if len(args) == 1 and args[0].isdigit():
+            return self.to_json(int(args[0]))
+        return "ERR:CMD"
+
+    def to_json(self, last=HEALTH_SHOW):
+        """
+        Una línea JSON: columnas, las últimas `last` filas (la más nueva al
+        final) y el resumen de todo lo guardado.
+        """
+        return json.dumps({
+            "period_s": self.period,
+            "fields": FIELDS,
+            "rows": [[_clean(v) for v in r] for r in self.ring.rows(last)],
+            "summary": self.summary(self.ring.rows()),
+        }, separators=(",", ":"))
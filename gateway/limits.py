@@ -0,0 +1,118 @@
+"""
+Límites del brazo (slider_servo3_ino), chequeados antes del puerto serie.
+
+Con la cinemática de Robot3D.fk_points (slider_servo_inter_videos.py) se
+precalcula al arrancar una tabla de poses prohibidas, una entrada por
+cada (base, codo) en grados enteros:
+  - efector o dedos del gripper por debajo de la mesa (+ margen)
+  - choque consigo mismo: el eslabón 2 o los dedos dentro de la columna
+    pedestal + eslabón 1, o sobre el disco de la base
+  - límites blandos por articulación (SOFT_LIMITS; el gripper 65–125)
+El gripper no cambia la geometría: tiene su propia tabla de 181.
+Chequear una pose son dos índices en un bytearray, sin trigonometría.
+
+Servos: 1 = base (yaw), 3 = codo, 2 = gripper (como App._send_all).
+Si cambia el robot, cambiar las medidas acá y en Robot3D.
+"""
+import math
+from collections import Counter
+
+L1 = 140.0        # primer eslabón (base -> codo), mm
+L2 = 120.0        # segundo eslabón (codo -> efector)
+H = 40.0          # altura del pedestal
+FINGER_LEN = 35.0 # dedos del gripper desde el efector
+BASE_R = 60.0     # disco de la base (z = 0)
+LINK_R = 20.0     # radio de la columna pedestal + eslabón 1
+TABLE_Z = 0.0     # la mesa: el brazo está apoyado en ella
+MARGIN = 10.0     # mm de aire que se exige a la mesa y a la columna
+
+BASE, GRIP, ELBOW = 1, 2, 3
+SOFT_LIMITS = {BASE: (0, 180), ELBOW: (0, 180), GRIP: (65, 125)}
+NEUTRAL = 90      # ángulo de un servo que nunca se mandó (el sketch arranca en 90)
+
+OK, SOFT, TABLE, SELF = 0, 1, 2, 3
+REASONS = {SOFT: "límite", TABLE: "mesa", SELF: "choque"}
+
+def fk(base, elbow):
+    """Codo, efector y dirección del eslabón 2 (igual que Robot3D.fk_points)."""
+    yaw = math.radians(base - 90)
+    alpha = math.radians(90.0 - elbow)
+    p1 = (0.0, 0.0, H + L1)
+    vx_local = L2 * math.sin(alpha)
+    vx, vy, vz = vx_local * math.cos(yaw), vx_local * math.sin(yaw), L2 * math.cos(alpha)
+    p2 = (p1[0] + vx, p1[1] + vy, p1[2] + vz)
+    return p1, p2, (vx / L2, vy / L2, vz / L2)
+
+def classify(elbow):
+    """Motivo por el que el codo en `elbow` está prohibido (OK = no lo está)."""
+    p1, p2, u = fk(90, elbow)
+    tip = tuple(p2[k] + u[k] * FINGER_LEN for k in range(3))
+    # puntos del eslabón 2 lejos del codo (cerca del codo siempre "toca")
+    points = [tuple(p1[k] + (p2[k] - p1[k]) * f for k in range(3)) for f in (0.5, 0.75)]
+    points += [p2, tip]
+    for x, y, z in points:
+        if z < TABLE_Z + MARGIN:
+            return TABLE
+        r = math.hypot(x, y)
+        if z <= H + L1 and r < LINK_R + MARGIN:
+            return SELF
+        if z <= MARGIN and r < BASE_R + MARGIN:
+            return SELF
+    return OK
+
+def build_tables():
+    # la base solo gira todo alrededor de Z: altura y distancia al eje
+    # dependen del codo, así que la geometría se calcula 181 veces y no 181²
+    lo, hi = SOFT_LIMITS[ELBOW]
+    by_elbow = [classify(e) if lo <= e <= hi else SOFT for e in range(181)]
+    lo, hi = SOFT_LIMITS[BASE]
+    arm = bytearray()
+    for base in range(181):
+        arm += bytes(by_elbow) if lo <= base <= hi else bytes([SOFT]) * 181
+    lo, hi = SOFT_LIMITS[GRIP]
+    grip = bytearray(OK if lo <= g <= hi else SOFT for g in range(181))
+    return arm, grip
+
+class PoseGuard:
+    """
+    check(pose, current, client): pose = {sid: ang} con lo que cambia;
+    current(sid) = último ángulo mandado (None si nunca). Lo que no está
+    en la pose se completa con current. False = prohibida (no se manda).
+    """
+    def __init__(self):
+        self.arm, self.grip = build_tables()
+        self.checked = 0
+        self.rejected = Counter()    # cliente -> poses rechazadas
+        self.reasons = Counter()     # motivo -> poses rechazadas
+
+    def forbidden(self):
+        return sum(1 for r in self.arm if r != OK)
+
+    def check(self, pose, current, client=None):
+        if not any(sid in pose for sid in (BASE, GRIP, ELBOW)):
+            return True
+        self.checked += 1
+        def ang(sid):
+            v = pose.get(sid)
+            if v is None:
+                v = current(sid)
+            return NEUTRAL if v is None else max(0, min(180, int(v)))
+        # solo lo que esta pose mueve: un gripper ya fuera de rango no
+        # bloquea la base
+        reason = OK
+        if BASE in pose or ELBOW in pose:
+            reason = self.arm[ang(BASE) * 181 + ang(ELBOW)]
+        if not reason and GRIP in pose:
+            reason = self.grip[ang(GRIP)]
+        if reason == OK:
+            return True
+        if not self.rejected[client]:
+            print(f"[limits] {client or '?'}: pose rechazada ({REASONS[reason]}), "
+                  f"base={ang(BASE)} codo={ang(ELBOW)} gripper={ang(GRIP)}")
+        self.rejected[client] += 1
+        self.reasons[REASONS[reason]] += 1
+        return False
+
+    def stats(self):
+        return {"checked": self.checked, "rejected": dict(self.rejected),
+                "reasons": dict(self.reasons)}
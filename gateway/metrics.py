@@ -0,0 +1,300 @@
+"""
+Métricas del gateway: contadores e histogramas, en texto de Prometheus.
+
+En el camino de cada comando solo se suma 1 a un atributo (o se busca el
+balde de un histograma con bisect sobre una tupla fija): nada de locks,
+diccionarios con etiquetas ni formato. Lo que ya cuentan otros módulos
+(bytes escritos y valores pisados en SerialLink/Coalescer, ACKs, UDP,
+límites, ringlog) se lee recién al pedir las métricas.
+
+    curl http://127.0.0.1:9101/metrics     # formato de texto de Prometheus
+    echo STATS | nc <pi> 5001              # lo mismo en una línea JSON
+    curl http://127.0.0.1:9101/health      # salud del Pi (health.py)
+
+Los "Error de conexión" de los clientes cuando la cola de listen() se
+llena no llegan al programa: el kernel los cuenta (ListenOverflows en
+/proc/net/netstat, de todo el Pi) y se exportan tal cual.
+"""
+import asyncio
+import json
+import time
+from bisect import bisect_left
+from collections import Counter
+
+from health import HEALTH_SHOW
+
+METRICS_HOST = "127.0.0.1"   # solo local: Prometheus/curl corren en el Pi
+METRICS_PORT = 9101          # 0 = sin HTTP (STATS sigue andando)
+RATE_S = 1.0                 # ventana de comandos por segundo
+
+ACK_BUCKETS_MS   = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+WRITE_BUCKETS_MS = (0.5, 1, 2, 5, 10, 20, 50, 100)
+
+NETSTAT = "/proc/net/netstat"
+
+# (campo de health.py, métrica, ayuda): última muestra del Pi
+HOST_GAUGES = (
+    ("cpu", "gateway_host_cpu_percent", "CPU ocupada de todo el Pi (%)"),
+    ("iowait", "gateway_host_iowait_percent", "CPU esperando disco (%)"),
+    ("gw_cpu", "gateway_process_cpu_percent", "CPU del gateway (% de un núcleo)"),
+    ("load1", "gateway_host_load1", "Carga promedio de 1 minuto"),
+    ("mem_avail_mb", "gateway_host_memory_available_megabytes", "Memoria disponible (MB)"),
+    ("swap_mb", "gateway_host_swap_used_megabytes", "Swap en uso (MB)"),
+    ("temp_c", "gateway_host_temperature_celsius", "Temperatura de la CPU"),
+    ("freq_mhz", "gateway_host_cpu_frequency_mhz", "Frecuencia actual de la CPU"),
+)
+
+class Histogram:
+    """Baldes fijos; observe() = un bisect y dos sumas."""
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)   # el último = +Inf
+        self.sum = 0.0
+
+    def observe(self, v):
+        self.counts[bisect_left(self.bounds, v)] += 1
+        self.sum += v
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def cumulative(self):
+        """[(le, cuántos <= le)], terminando en +Inf."""
+        out, acc = [], 0
+        for le, n in zip(self.bounds + (float("inf"),), self.counts):
+            acc += n
+            out.append((le, acc))
+        return out
+
+class ProtoStats:
+    __slots__ = ("commands", "connections", "active", "errors")
+
+    def __init__(self):
+        self.commands = 0
+        self.connections = 0
+        self.active = 0
+        self.errors = Counter()   # motivo -> conexiones cortadas
+
+def listen_overflows(path=NETSTAT):
+    """TcpExt ListenOverflows del kernel; None si no hay /proc (no Linux)."""
+    try:
+        with open(path) as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+    for head, values in zip(lines[::2], lines[1::2]):
+        if head.startswith("TcpExt:"):
+            row = dict(zip(head.split()[1:], values.split()[1:]))
+            return int(row.get("ListenOverflows", 0))
+    return None
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+
+def _num(v):
+    if v == float("inf"):
+        return "+Inf"
+    return repr(round(v, 3)) if isinstance(v, float) else str(v)
+
+class Metrics:
+    def __init__(self, reg, log=None):
+        self.reg = reg
+        self.log = log
+        self.udp = None        # SetpointProtocol (udp.py), lo pone gateway.py
+        self.health = None     # muestreo del Pi (health.py), ídem
+        self.protos = {}       # protocolo ("multi", "mux", ...) -> ProtoStats
+        self.rates = {}        # protocolo -> comandos por segundo
+        self.t0 = time.monotonic()
+        self._task = None
+
+    def proto(self, name):
+        return self.protos.setdefault(name, ProtoStats())
+
+    def _totals(self):
+        totals = {name: p.commands for name, p in self.protos.items()}
+        if self.udp is not None:
+            totals["udp"] = self.udp.accepted
+        return totals
+
+    async def _rate_loop(self):
+        last, t_last = self._totals(), time.monotonic()
+        while True:
+            await asyncio.sleep(RATE_S)
+            now, t = self._totals(), time.monotonic()
+            dt = t - t_last
+            self.rates = {name: (n - last.get(name, 0)) / dt for name, n in now.items()}
+            last, t_last = now, t
+
+    def start(self):
+        self._task = asyncio.create_task(self._rate_loop())
+        return self
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    # ---------- recolección (solo al pedirlas) ----------
+    def families(self):
+        """[(nombre, tipo, ayuda, [(etiquetas, valor o Histogram)])]"""
+        fams = []
+        def fam(name, kind, help_, samples):
+            if samples:
+                fams.append((name, kind, help_, samples))
+
+        fam("gateway_uptime_seconds", "gauge", "Segundos desde que arrancó el gateway",
+            [({}, time.monotonic() - self.t0)])
+        protos = sorted(self.protos.items())
+        fam("gateway_commands_total", "counter", "Líneas de comando recibidas",
+            [({"proto": n}, p.commands) for n, p in protos])
+        fam("gateway_commands_per_second", "gauge", f"Comandos por segundo (últimos {RATE_S:g} s)",
+            [({"proto": n}, r) for n, r in sorted(self.rates.items())])
+        fam("gateway_connections_total", "counter", "Conexiones de clientes aceptadas",
+            [({"proto": n}, p.connections) for n, p in protos])
+        fam("gateway_connections_active", "gauge", "Clientes conectados ahora",
+            [({"proto": n}, p.active) for n, p in protos])
+        fam("gateway_connection_errors_total", "counter",
+            "Conexiones cortadas por error (reset, lento, línea larga, inactivo)",
+            [({"proto": n, "kind": k}, v) for n, p in protos for k, v in sorted(p.errors.items())])
+        overflows = listen_overflows()
+        if overflows is not None:
+            fam("gateway_listen_overflows_total", "counter",
+                "Conexiones que el kernel rechazó con la cola de listen() llena (todo el host)",
+                [({}, overflows)])
+
+        links = sorted(self.reg.links.items())
+        def per_link(f):
+            return [({"link": n}, f(link)) for n, link in links]
+        fam("gateway_serial_bytes_written_total", "counter", "Bytes escritos al puerto serie",
+            per_link(lambda l: l.bytes_written))
+        fam("gateway_serial_commands_total", "counter", "Comandos encolados para la placa",
+            per_link(lambda l: l.sched.submitted))
+        fam("gateway_serial_coalesced_total", "counter",
+            "Comandos descartados por un valor más nuevo del mismo canal",
+            per_link(lambda l: l.sched.superseded))
+        fam("gateway_serial_flushed_total", "counter", "Comandos descartados por un STOP",
+            per_link(lambda l: l.sched.flushed))
+        fam("gateway_serial_ready_seconds", "gauge",
+            "Segundos desde abrir el puerto hasta el banner del sketch (o el plazo)",
+            [({"link": n}, link.ready_s) for n, link in links if link.ready_s is not None])
+        fam("gateway_serial_queue_depth", "gauge", "Comandos esperando el puerto serie",
+            per_link(lambda l: len(l.sched)))
+        fam("gateway_ack_outstanding", "gauge", "Comandos escritos esperando ACK",
+            per_link(lambda l: len(l.acks)))
+        fam("gateway_acks_total", "counter", "ACKs recibidos de la placa",
+            per_link(lambda l: l.acks.acked))
+        fam("gateway_acks_lost_total", "counter", "Comandos que nunca tuvieron ACK",
+            per_link(lambda l: l.acks.lost))
+        fam("gateway_acks_unmatched_total", "counter", "Respuestas que nadie esperaba",
+            per_link(lambda l: l.acks.unmatched))
+        fam("gateway_ack_latency_ms", "histogram", "Comando -> ACK del Arduino (ms)",
+            per_link(lambda l: l.acks.hist))
+        fam("gateway_serial_write_ms", "histogram", "Duración de cada escritura al puerto (ms)",
+            per_link(lambda l: l.write_ms))
+
+        if self.udp is not None:
+            fam("gateway_udp_setpoints_total", "counter", "Setpoints UDP por resultado",
+                [({"result": "accepted"}, self.udp.accepted),
+                 ({"result": "stale"}, self.udp.stale),
+                 ({"result": "bad"}, self.udp.bad)])
+        fair = self.reg.fair
+        if fair is not None:
+            fam("gateway_fair_deferred_total", "counter",
+                "Comandos de un cliente que pasó su parte del puerto (fundidos, salen después)",
+                [({"client": c}, v) for c, v in sorted(fair.deferred.items())])
+            fam("gateway_fair_busy_total", "counter", "Pedidos contestados ERR:BUSY",
+                [({"client": c}, v) for c, v in sorted(fair.busy.items())])
+            fam("gateway_fair_share", "gauge", "Comandos/s que le tocan a cada cliente activo",
+                [({"link": link.name, "client": c}, b.rate)
+                 for (link, c), b in sorted(fair.buckets.items(), key=lambda kv: (kv[0][0].name, kv[0][1]))])
+        guard = self.reg.guard
+        if guard is not None:
+            fam("gateway_limit_checks_total", "counter", "Poses chequeadas contra limits.py",
+                [({}, guard.checked)])
+            fam("gateway_limit_rejected_total", "counter", "Poses rechazadas por motivo",
+                [({"reason": r}, v) for r, v in sorted(guard.reasons.items())])
+        for name, loop in (("trajectory", self.reg.player), ("waveform", self.reg.waves)):
+            if loop is not None:
+                fam(f"gateway_{name}_ticks_total", "counter", f"Pasos de {name}",
+                    [({}, loop.ticks)])
+                fam(f"gateway_{name}_skipped_total", "counter", f"Pasos de {name} saltados",
+                    [({}, loop.skipped)])
+        if self.health is not None:
+            last = self.health.latest()
+            for field, name, help_ in HOST_GAUGES:
+                v = last.get(field)
+                if v is not None and v == v:   # NaN = no se pudo leer
+                    fam(name, "gauge", help_, [({}, v)])
+        if self.log is not None:
+            fam("gateway_log_records_total", "counter", "Registros de ringlog por destino",
+                [({"result": k}, v) for k, v in self.log.stats().items()])
+        return fams
+
+    def render(self):
+        """Texto de Prometheus (versión 0.0.4)."""
+        out = []
+        for name, kind, help_, samples in self.families():
+            out.append(f"# HELP {name} {help_}")
+            out.append(f"# TYPE {name} {kind}")
+            for labels, v in samples:
+                if isinstance(v, Histogram):
+                    for le, n in v.cumulative():
+                        out.append(f"{name}_bucket{_labels({**labels, 'le': _num(le)})} {n}")
+                    out.append(f"{name}_sum{_labels(labels)} {_num(v.sum)}")
+                    out.append(f"{name}_count{_labels(labels)} {v.count}")
+                else:
+                    out.append(f"{name}{_labels(labels)} {_num(v)}")
+        return "\n".join(out) + "\n"
+
+    def to_json(self):
+        """Lo mismo en una línea (comando STATS): "nombre{k=v}" -> valor."""
+        flat = {}
+        for name, _, _, samples in self.families():
+            for labels, v in samples:
+                key = name + ("{" + ",".join(f"{k}={x}" for k, x in labels.items()) + "}"
+                              if labels else "")
+                if isinstance(v, Histogram):
+                    flat[key] = {"count": v.count, "sum": round(v.sum, 3),
+                                 "buckets": {_num(le): n for le, n in v.cumulative()}}
+                else:
+                    flat[key] = round(v, 3) if isinstance(v, float) else v
+        return json.dumps(flat, separators=(",", ":"), ensure_ascii=False)
+
+# ---------- HTTP mínimo para Prometheus ----------
+async def serve_http(metrics, reader, writer):
+    try:
+        request = await asyncio.wait_for(reader.readline(), 5.0)
+        while (await asyncio.wait_for(reader.readline(), 5.0)) not in (b"\r\n", b"\n", b""):
+            pass   # cabeceras: no se usan
+        parts = request.decode("latin-1").split()
+        path, _, query = parts[1].partition("?") if len(parts) >= 2 else ("", "", "")
+        ctype = "text/plain; version=0.0.4; charset=utf-8"
+        if parts and parts[0] == "GET" and path in ("/", "/metrics"):
+            status, body = "200 OK", metrics.render()
+        elif parts and parts[0] == "GET" and path == "/health" and metrics.health is not None:
+            # /health?n=300 = últimas 300 muestras (health.py)
+            args = dict(kv.partition("=")[::2] for kv in query.split("&") if kv)
+            last = int(args["n"]) if args.get("n", "").isdigit() else HEALTH_SHOW
+            status, body = "200 OK", metrics.health.to_json(last) + "\n"
+            ctype = "application/json"
+        else:
+            status, body = "404 Not Found", "usar GET /metrics o /health\n"
+        data = body.encode("utf-8")
+        writer.write((f"HTTP/1.0 {status}\r\n"
+                      f"Content-Type: {ctype}\r\n"
+                      f"Content-Length: {len(data)}\r\n\r\n").encode("latin-1") + data)
+        await asyncio.wait_for(writer.drain(), 5.0)
+    except (asyncio.TimeoutError, ConnectionError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+async def start_metrics(metrics, host=METRICS_HOST, port=METRICS_PORT):
+    srv = await asyncio.start_server(lambda r, w: serve_http(metrics, r, w), host, port,
+                                     reuse_address=True)
+    print(f"Métricas en http://{host}:{port}/metrics")
+    return srv
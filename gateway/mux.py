@@ -0,0 +1,127 @@
+"""
+Multiplexor del puerto serie por socket Unix.
+
+El gateway es el único dueño de /dev/ttyACM*; la app Flask, scripts y los
+servidores TCP viejos le mandan sus comandos por aquí en vez de abrir el
+puerto. Una línea por comando:
+
+    SET <canal> <valor>            -> sin respuesta (gana el valor más nuevo)
+    REQ <tag> <canal> <valor>      -> "<tag> <respuesta>" cuando llegue
+                                      ("<tag> ERR:TIMEOUT" si no llega,
+                                      "<tag> ERR:LIMIT" si el brazo no puede,
+                                      "<tag> ERR:BUSY" si "mux" ya gastó su
+                                      parte del puerto, ver fairness.py;
+                                      "<tag> SENT" si el sketch no contesta
+                                      a ese canal, como el PWM de texto)
+    STATE                          -> tabla de estado en JSON (state.py)
+    STATS                          -> métricas del gateway en JSON (metrics.py)
+    HEALTH [n]                     -> salud del Pi + latencia, últimas n
+                                      muestras en JSON (health.py)
+    SUBSCRIBE                      -> desde ahí solo recibe cambios (JSON)
+    STOP <canal> [valor]           -> prioridad: vacía la cola de esa placa
+                                      y manda valor (sin valor: solo vaciar)
+    ESTOP                          -> paro de emergencia en todas las placas
+    WAVE <patrón...>               -> "OK" / "ERR:CMD"; patrón del LED PWM
+                                      (waveform.py), ej. "WAVE BREATHE 3000".
+                                      Un SET o REQ a led.pwm lo corta
+
+<canal> es un canal lógico de devices.py ("led.pwm", "arm.2", ...).
+SET, STOP y ESTOP nunca contestan, ni mal formados (se descartan): el
+cliente no lee después de ellos y un "ERR:CMD" suelto se tomaría como la
+respuesta de su próximo STATE o WAVE. Lo demás mal formado -> "ERR:CMD".
+Los REQ de un cliente pueden estar varios en vuelo; cada respuesta vuelve
+solo a ese cliente, con su tag.
+"""
+import asyncio
+import os
+import stat
+
+from metrics import ProtoStats
+from state import serve_subscriber
+
+MUX_SOCKET = "/tmp/arduino_mux.sock"
+WRITE_TIMEOUT = 2.0
+NO_REPLY = ("SET", "STOP", "ESTOP")   # sin respuesta, tampoco de error
+
+async def _reply(writer, lock, text):
+    async with lock:
+        writer.write((text + "\n").encode("utf-8"))
+        try:
+            await asyncio.wait_for(writer.drain(), WRITE_TIMEOUT)
+        except (asyncio.TimeoutError, ConnectionError):
+            writer.close()
+
+async def _request(reg, writer, lock, tag, logical, value):
+    resp = await reg.request(logical, value, client="mux")
+    await _reply(writer, lock, f"{tag} {resp or 'ERR:TIMEOUT'}")
+
+async def serve_mux(reg, reader, writer, metrics=None):
+    lock = asyncio.Lock()
+    tasks = set()
+    stats = metrics.proto("mux") if metrics is not None else ProtoStats()
+    stats.connections += 1
+    stats.active += 1
+    try:
+        while True:
+            raw = await reader.readline()
+            if not raw:
+                break
+            parts = raw.decode("utf-8", errors="ignore").split()
+            stats.commands += 1
+            try:
+                if len(parts) == 3 and parts[0] == "SET":
+                    if parts[1] == "led.pwm" and reg.waves is not None:
+                        reg.waves.cancel()
+                    reg.send(parts[1], int(parts[2]), "mux")
+                elif len(parts) in (2, 3) and parts[0] == "STOP":
+                    reg.stop(parts[1], int(parts[2]) if len(parts) == 3 else None)
+                elif len(parts) >= 2 and parts[0] == "WAVE":
+                    ok = reg.waves is not None and reg.waves.handle(parts[1:])
+                    await _reply(writer, lock, "OK" if ok else "ERR:CMD")
+                elif parts == ["ESTOP"]:
+                    reg.estop()
+                elif parts == ["SUBSCRIBE"]:
+                    await serve_subscriber(reg.state, reader, writer)
+                    break
+                elif parts == ["STATE"]:
+                    await _reply(writer, lock, reg.state.to_json())
+                elif parts == ["STATS"] and metrics is not None:
+                    await _reply(writer, lock, metrics.to_json())
+                elif parts[:1] == ["HEALTH"] and metrics is not None and metrics.health is not None:
+                    await _reply(writer, lock, metrics.health.command(parts[1:]))
+                elif len(parts) == 4 and parts[0] == "REQ":
+                    if parts[2] == "led.pwm" and reg.waves is not None:
+                        reg.waves.cancel()
+                    t = asyncio.create_task(
+                        _request(reg, writer, lock, parts[1], parts[2], int(parts[3])))
+                    tasks.add(t)
+                    t.add_done_callback(tasks.discard)
+                elif parts and parts[0] not in NO_REPLY:
+                    await _reply(writer, lock, "ERR:CMD")
+            except ValueError:
+                if parts[0] not in NO_REPLY:
+                    await _reply(writer, lock, "ERR:CMD")
+    except ConnectionError:
+        stats.errors["reset"] += 1
+    except ValueError:
+        stats.errors["no_newline"] += 1
+    finally:
+        stats.active -= 1
+        for t in tasks:
+            t.cancel()
+        writer.close()
+
+def unlink_stale(path):
+    # socket de una corrida anterior (nunca borrar otra cosa)
+    try:
+        if stat.S_ISSOCK(os.stat(path).st_mode):
+            os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+async def start_mux(reg, path=MUX_SOCKET, metrics=None):
+    unlink_stale(path)
+    srv = await asyncio.start_unix_server(lambda r, w: serve_mux(reg, r, w, metrics), path)
+    os.chmod(path, 0o666)   # la app Flask puede correr con otro usuario
+    print(f"Multiplexor serie escuchando en {path}")
+    return srv
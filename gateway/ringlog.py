@@ -0,0 +1,143 @@
+"""
+Log que no frena a quien atiende comandos.
+
+Un print() por comando escribe sincrónico en la terminal SSH o en
+journald: si esa salida va lenta, el servidor espera con ella. Acá quien
+loguea solo agrega una tupla (hora, nivel, tipo, campos) a un buffer
+circular; un hilo aparte les da formato y las escribe de a bloques.
+Si el buffer se llena se pisan las más viejas y se cuentan como
+perdidas: nunca se espera a la salida.
+
+    log = RingLog(level="INFO", sample={"rx": 10}).start()
+    log.info("rx", addr="10.0.0.5", sid=2, ang=135)   # 1 de cada 10
+    log.warn("bad", line="hola")
+    log.close()
+
+Salida, una línea por registro (clave=valor, fácil de filtrar con grep):
+    12:00:01.234 INFO rx addr=10.0.0.5 sid=2 ang=135
+`sample` = {tipo: N}: de ese tipo se guarda 1 de cada N (para eventos
+que llegan cientos de veces por segundo); los demás se cuentan en
+`sampled`. Lo que está por debajo de `level` ni se guarda.
+"""
+import itertools
+import sys
+import threading
+import time
+from collections import deque
+
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARN": 30, "ERROR": 40}
+NAMES = {v: k for k, v in LEVELS.items()}
+
+CAPACITY = 4096    # registros en el buffer antes de empezar a pisar
+FLUSH_S = 0.1      # cada cuánto escribe el hilo
+
+def parse_sample(text):
+    """'rx=10,cmd=100' -> {"rx": 10, "cmd": 100}"""
+    out = {}
+    for item in text.split(","):
+        if item.strip():
+            kind, _, n = item.strip().partition("=")
+            out[kind] = max(1, int(n or 1))
+    return out
+
+def _fmt_value(v):
+    s = str(v)
+    if not s or " " in s or "=" in s or '"' in s:
+        return '"' + s.replace('"', '\\"') + '"'
+    return s
+
+class RingLog:
+    def __init__(self, level="INFO", sample=None, capacity=CAPACITY, out=None,
+                 flush_s=FLUSH_S):
+        self.level = LEVELS[level] if isinstance(level, str) else level
+        self.sample = dict(sample or {})
+        self.capacity = capacity
+        self.out = out if out is not None else sys.stdout
+        self.flush_s = flush_s
+        self.buf = deque(maxlen=capacity)
+        self._seen = {}   # tipo -> contador, para el muestreo
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.logged = 0
+        self.sampled = 0
+        self.dropped = 0
+        self._dropped_reported = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="ringlog", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        """Escribe lo que queda y para el hilo."""
+        if self._thread is not None:
+            self._stop.set()
+            self._wake.set()
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        self._drain()
+
+    def log(self, level, kind, fields):
+        if level < self.level:
+            return
+        n = self.sample.get(kind)
+        if n is not None and next(self._seen.setdefault(kind, itertools.count())) % n:
+            self.sampled += 1
+            return
+        if len(self.buf) >= self.capacity:
+            self.dropped += 1   # el append pisa la más vieja
+        self.buf.append((time.time(), level, kind, fields))
+        self.logged += 1
+        if level >= LEVELS["ERROR"]:
+            self._wake.set()
+
+    def debug(self, kind, **fields):
+        self.log(10, kind, fields)
+
+    def info(self, kind, **fields):
+        self.log(20, kind, fields)
+
+    def warn(self, kind, **fields):
+        self.log(30, kind, fields)
+
+    def error(self, kind, **fields):
+        self.log(40, kind, fields)
+
+    def stats(self):
+        return {"logged": self.logged, "sampled": self.sampled, "dropped": self.dropped}
+
+    # ---------- hilo escritor ----------
+    def _format(self, rec):
+        t, level, kind, fields = rec
+        ms = int((t % 1) * 1000)
+        head = f"{time.strftime('%H:%M:%S', time.localtime(t))}.{ms:03d} {NAMES.get(level, level)} {kind}"
+        if not fields:
+            return head
+        return head + " " + " ".join(f"{k}={_fmt_value(v)}" for k, v in fields.items())
+
+    def _drain(self):
+        lines = []
+        while True:
+            try:
+                lines.append(self._format(self.buf.popleft()))
+            except IndexError:
+                break
+        lost = self.dropped - self._dropped_reported
+        if lost:
+            self._dropped_reported += lost
+            lines.append(self._format((time.time(), LEVELS["WARN"], "ringlog",
+                                       {"dropped": lost})))
+        if not lines:
+            return
+        try:
+            self.out.write("\n".join(lines) + "\n")
+            self.out.flush()
+        except (OSError, ValueError):
+            pass   # sin salida (terminal cerrada): no hay a quién avisar
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_s)
+            self._wake.clear()
+            self._drain()
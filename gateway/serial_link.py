@@ -0,0 +1,388 @@
+import asyncio
+import statistics
+import time
+from collections import deque
+from itertools import zip_longest
+from concurrent.futures import ThreadPoolExecutor
+
+import serial
+
+from baud import negotiate_baud
+from boot import READY_TIMEOUT, is_banner
+from coalesce import Coalescer
+from acks import AckTracker
+from frames import CODECS, CH_PING, CH_POSE, Decoder, Frame, encode_frame, text_acks
+from metrics import WRITE_BUCKETS_MS, Histogram
+import tracing
+
+MAX_WRITE = 64     # bytes normales por escritura (64 B = 67 ms a 9600)
+MAX_INFLIGHT = 4   # comandos escritos sin ACK que puede tener el Arduino
+INFLIGHT_TTL = 0.5 # seg: un ACK que no llegó deja de ocupar crédito
+CAPACITY_MIN_ITEMS = 20   # comandos escritos antes de confiar en el tamaño medido
+
+class SerialLink:
+    """
+    Dueño del puerto serie del Arduino.
+    - send() solo encola: nunca bloquea al loop de asyncio.
+    - Por canal (servo id, LED, PWM) solo queda el valor más nuevo
+      (ver Coalescer).
+    - send_pose() manda varios servos en una sola orden que el sketch
+      aplica junta (ver frames.py); también gana la más nueva.
+    - stop() va por el carril de prioridad: descarta lo normal pendiente de
+      esta placa y sale antes que nada. Para que eso acote la espera, lo
+      normal sale de a lo sumo max_write bytes y con no más de
+      max_inflight comandos escritos sin ACK: el resto espera en el
+      Coalescer (donde el stop lo puede descartar) y no en el buffer del
+      Arduino. Un stop espera a lo sumo esos comandos y un bloque.
+    - Una tarea escritora vacía la cola en un solo ser.write() (en un hilo)
+      y espera a que salga por el cable antes de tomar el siguiente bloque.
+    - Una tarea lectora separa respuestas de texto ("OK:LED_ON", "OK 2 135")
+      y ACKs binarios (ver frames.py) y las empareja con su comando
+      (ver acks.py): así se pueden tener varios comandos en vuelo.
+    - proto = "text" | "bin" | "auto" (auto prueba binario y si el sketch
+      no contesta se queda en texto).
+    - offers = velocidades a ofrecer al arrancar (ver baud.py); () = 9600 fijo.
+    Cada enlace tiene sus propios hilos de E/S: con varias placas (ver
+    devices.py) el tráfico de una nunca espera detrás de otra.
+    Con port=None funciona en seco (no abre nada), útil para probar sin Arduino.
+    Si ya se abrió el puerto (p. ej. al detectar la placa por su banner) se
+    pasa en `ser` para no volver a reiniciar el Arduino.
+    - Al abrir el puerto el UNO se reinicia: nada sale hasta el banner del
+      sketch (ver boot.py) o hasta ready_timeout. Lo que llega mientras
+      tanto espera en el Coalescer (gana el más nuevo) y sale de una vez.
+      ready_s = segundos que tardó en estar lista.
+    """
+    def __init__(self, port, baudrate=9600, timeout=0.2, proto="text", offers=(),
+                 ser=None, name=None, max_write=MAX_WRITE, max_inflight=MAX_INFLIGHT,
+                 ready_timeout=READY_TIMEOUT):
+        self.port = port
+        self.name = name or port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.proto = proto
+        self.offers = tuple(offers)
+        self.codec = CODECS["bin" if proto == "bin" else "text"]()
+        self.ser = ser
+        self.pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix=f"serial-{self.name}")
+        self.sched = Coalescer()
+        self.decoder = Decoder()
+        self.acks = AckTracker()
+        self.max_write = max_write
+        self.max_inflight = max_inflight
+        self._written = {}   # (canal, SEQ) escrito y esperando ACK -> time.monotonic()
+        self._acked = asyncio.Event()
+        self._pose = None    # (tag, valores) de la última pose encolada
+        self._traces = {}    # (canal, SEQ) -> tracing.Trace, hasta que termina
+        self._sent = {}      # (canal, SEQ) -> future de un request() sin respuesta del sketch
+        self.acks.on_done = self._on_done
+        self.service_ms = deque(maxlen=CAPACITY_MIN_ITEMS)   # escrito -> ACK, sin la cola
+        self.ready = asyncio.Event()
+        self.ready_timeout = ready_timeout
+        self.ready_s = None
+        self.banner = None   # línea de setup() del sketch, si la imprimió
+        self._t_open = None
+        self.tasks = []
+        self.seq = 0
+        self.bytes_written = 0
+        self.items_written = 0
+        self.write_ms = Histogram(WRITE_BUCKETS_MS)   # cada escritura + tiempo de línea
+
+    async def start(self):
+        if self.port is not None:
+            loop = asyncio.get_running_loop()
+            if self.ser is None:
+                self._t_open = time.monotonic()
+                self.ser = await loop.run_in_executor(
+                    self.pool, lambda: serial.Serial(self.port, self.baudrate, timeout=self.timeout))
+            else:
+                self.ready.set()   # ya se vio el banner al detectarla (devices.py)
+            print(f"Conectado a Arduino en {self.port} a {self.baudrate} baudios")
+            if self.offers:
+                lines = []
+                self.baudrate = await loop.run_in_executor(
+                    self.pool, lambda: negotiate_baud(self.ser, self.offers, lines=lines))
+                self.banner = next((l for _, l in lines if is_banner(l)), None)
+                if lines and not self.ready.is_set():
+                    # el banner (o cualquier respuesta) llegó durante el handshake
+                    self._set_ready(lines[0][0])
+        else:
+            print("[INFO] Sin puerto serie (modo en seco)")
+            self.ready.set()
+        self.tasks = [asyncio.create_task(self._writer())]
+        if self.ser is not None:
+            self.tasks.append(asyncio.create_task(self._reader()))
+            if not self.ready.is_set():
+                self.tasks.append(asyncio.create_task(self._ready_deadline()))
+            if self.proto == "auto":
+                await self._detect_proto()
+
+    def _set_ready(self, t=None):
+        """El sketch ya corre: se suelta lo que esperaba."""
+        if self.ready.is_set():
+            return
+        t = time.monotonic() if t is None else t
+        self.ready_s = t - self._t_open
+        print(f"[INFO] {self.name}: Arduino listo en {self.ready_s:.2f} s "
+              f"({len(self.sched)} comandos esperando)")
+        self.ready.set()
+
+    async def _ready_deadline(self):
+        try:
+            await asyncio.wait_for(self.ready.wait(), self.ready_timeout)
+        except asyncio.TimeoutError:
+            print(f"[WARN] {self.name}: sin banner en {self.ready_timeout:g} s, "
+                  "se empieza a mandar igual")
+            self._set_ready()
+
+    async def close(self):
+        for t in self.tasks:
+            t.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        if self.ser is not None:
+            self.ser.close()
+        self.pool.shutdown(wait=False)
+        print(f"Serial {self.name}: {self.sched.submitted} comandos, "
+              f"{self.sched.superseded} descartados por valor más nuevo, "
+              f"{self.sched.flushed} por stop, "
+              f"ACK: {self.acks.stats()}")
+
+    def _next_seq(self):
+        self.seq = (self.seq + 1) & 0xFF
+        return self.seq
+
+    def _submit(self, channel, data, seq, fut=None, coalesce=True, value=None, owner=None):
+        trace = tracing.current.get()
+        if trace is not None:
+            trace.mark("parse")
+            trace.part()
+            self._traces[(channel, seq)] = trace
+        if fut is not None and not (self.codec.binary or text_acks(channel)):
+            # el sketch no contesta este canal (PWM de texto): request()
+            # se confirma con "SENT" cuando el comando salió por el cable
+            self._sent[(channel, seq)] = fut
+        elif fut is not None or self.codec.binary or text_acks(channel):
+            self.acks.track(channel, seq, fut, value)
+        # un valor suelto posterior a una pose que espera tiene que salir después
+        to_end = coalesce and channel != CH_POSE and CH_POSE in self.sched.pending
+        replaced = self.sched.put(data, channel if coalesce else None, tag=(channel, seq),
+                                  to_end=to_end, owner=owner)
+        if replaced is not None:
+            # el valor anterior de este canal nunca va a salir: no esperar su ACK
+            self._trace_end(replaced, "coalesced")
+            self.acks.drop(*replaced)
+
+    def _trace_end(self, tag, out):
+        if self._traces:
+            trace = self._traces.pop(tag, None)
+            if trace is not None:
+                trace.end(out)
+
+    def _on_done(self, tag, acked):
+        if acked:
+            t = self._written.get(tag)
+            if t is not None:
+                self.service_ms.append((time.monotonic() - t) * 1000.0)
+        self._trace_end(tag, "ack" if acked else "lost")
+
+    def send(self, channel, value, owner=None):
+        """
+        Valor para un canal (sin esperar respuesta); gana el más nuevo.
+        owner = cliente que lo manda (turnos del Coalescer, ver fairness.py).
+        """
+        seq = self._next_seq()
+        self._submit(channel, self.codec.encode(channel, value, seq), seq, value=value,
+                     owner=owner)
+        return seq
+
+    def send_pose(self, values, owner=None):
+        """
+        values[i] = ángulo del servo i+1 (None = no se toca), en una orden.
+        Si todavía espera una pose anterior se funden: lo que esta no toca
+        conserva el valor de aquella. Los valores sueltos pendientes de los
+        servos que la pose sí trae quedan viejos y se descartan.
+        """
+        for i, v in enumerate(values):
+            if v is not None:
+                tag = self.sched.discard(i + 1)
+                if tag is not None:
+                    self._trace_end(tag, "coalesced")
+                    self.acks.drop(*tag)
+        waiting = self.sched.pending.get(CH_POSE)
+        if waiting is not None and self._pose is not None and waiting[1] == self._pose[0]:
+            values = [o if v is None else v for v, o in zip_longest(values, self._pose[1])]
+        values = tuple(values)
+        seq = self._next_seq()
+        self._pose = ((CH_POSE, seq), values)
+        self._submit(CH_POSE, self.codec.encode(CH_POSE, values, seq), seq, value=values,
+                     owner=owner)
+        return seq
+
+    def capacity(self):
+        """
+        Comandos por segundo que puede atender la placa, medidos: lo que
+        entra por el cable con el tamaño medio de los comandos escritos y,
+        si contesta, lo que permite el crédito (max_inflight por lo que
+        tarda el ACK desde que se escribió: la respuesta vuelve por el
+        mismo cable y el sketch tarda; la espera en la cola no cuenta).
+        """
+        if self.items_written >= CAPACITY_MIN_ITEMS:
+            per_cmd = self.bytes_written / self.items_written
+        else:
+            per_cmd = len(self.codec.encode(1, 90, 0))   # hasta medir: un "sid ang"
+        cap = self.baudrate / 10.0 / per_cmd
+        if len(self.service_ms) >= CAPACITY_MIN_ITEMS:
+            cap = min(cap, self.max_inflight * 1000.0 / max(1.0, statistics.median(self.service_ms)))
+        return cap
+
+    def send_raw(self, data: bytes):
+        self.sched.put(data)
+
+    def stop(self, channel=None, value=0, only=False):
+        """
+        Carril de prioridad (stop / paro de emergencia): descarta todo lo
+        normal que espera para esta placa y manda (channel, value) primero.
+        channel=None: solo descartar (los servos se quedan donde están).
+        only=True: solo se descarta lo pendiente de `channel` (watchdog).
+        """
+        if only and channel is not None:
+            tag = self.sched.discard(channel)
+            tags = [tag] if tag is not None else []
+        else:
+            tags = self.sched.flush()
+        for ch, seq in tags:
+            self._trace_end((ch, seq), "flushed")
+            self._resolve_sent((ch, seq), None)
+            self.acks.drop(ch, seq)
+        if channel is None:
+            return None
+        seq = self._next_seq()
+        if self.codec.binary or text_acks(channel):
+            self.acks.track(channel, seq, None, value)
+        self.sched.put_urgent(self.codec.encode(channel, value, seq), tag=(channel, seq))
+        self._acked.set()   # despertar al escritor si espera crédito
+        return seq
+
+    async def request(self, channel, value, timeout=1.0, owner=None):
+        """
+        Manda un valor y espera su respuesta (como tcp.py). None = timeout;
+        "SENT" = ya salió, si el sketch no contesta a ese canal.
+        No bloquea a otros: varios request() pueden estar en vuelo a la vez
+        y cada respuesta se empareja con el suyo (ver acks.py).
+        """
+        seq = self._next_seq()
+        fut = asyncio.get_running_loop().create_future()
+        # un request nunca se reemplaza por uno más nuevo: siempre tiene respuesta
+        self._submit(channel, self.codec.encode(channel, value, seq), seq, fut,
+                     coalesce=False, value=value, owner=owner)
+        if not self.ready.is_set():
+            timeout += self.ready_timeout   # el plazo corre desde que arranca la placa
+        try:
+            return await asyncio.wait_for(fut, timeout)
+        except asyncio.TimeoutError:
+            self._sent.pop((channel, seq), None)
+            self.acks.drop(channel, seq)
+            return None
+
+    def _resolve_sent(self, tag, text):
+        fut = self._sent.pop(tag, None)
+        if fut is not None and not fut.done():
+            fut.set_result(text)
+
+    async def _detect_proto(self, tries=6, wait=0.5):
+        # el UNO se reinicia al abrir el puerto: se espera el banner y, por
+        # si el sketch no tiene, se reintenta un rato más
+        await self.ready.wait()
+        for _ in range(tries):
+            seq = self._next_seq()
+            fut = asyncio.get_running_loop().create_future()
+            self._submit(CH_PING, encode_frame(CH_PING, 0, seq), seq, fut, coalesce=False)
+            try:
+                if await asyncio.wait_for(fut, wait) is not None:
+                    self.codec = CODECS["bin"]()
+                    print("[INFO] El sketch entiende tramas binarias")
+                    return
+            except asyncio.TimeoutError:
+                self.acks.drop(CH_PING, seq)
+        self.codec = CODECS["text"]()
+        print("[INFO] Sin respuesta binaria: protocolo de texto")
+
+    def _inflight(self):
+        """Comandos escritos que todavía esperan ACK (los viejos no cuentan)."""
+        now = time.monotonic()
+        for tag, t in list(self._written.items()):
+            if now - t > INFLIGHT_TTL or not self.acks.waiting(*tag):
+                del self._written[tag]
+        return len(self._written)
+
+    async def _wait_credit(self):
+        # lo urgente no espera crédito
+        while self._inflight() >= self.max_inflight and not self.sched.urgent:
+            self._acked.clear()
+            # asyncio.wait y no wait_for: en 3.11 wait_for puede tragarse el
+            # cancel() de close() si el evento llega justo, y el escritor no para
+            waiter = asyncio.ensure_future(self._acked.wait())
+            try:
+                await asyncio.wait((waiter,), timeout=0.05)
+            finally:
+                waiter.cancel()
+
+    async def _writer(self):
+        loop = asyncio.get_running_loop()
+        await self.ready.wait()   # mientras arranca la placa todo espera en el Coalescer
+        while True:
+            await self._wait_credit()
+            data, tags = await self.sched.take(
+                self.max_write, max(1, self.max_inflight - len(self._written)))
+            now = time.monotonic()
+            for tag in tags:
+                if tag is not None and self.acks.waiting(*tag):
+                    self._written[tag] = now
+            traced = [(tag, self._traces[tag]) for tag in tags
+                      if tag in self._traces] if self._traces else ()
+            for _, trace in traced:
+                trace.mark("write")
+            if self.ser is not None:
+                t0 = time.monotonic()
+                await loop.run_in_executor(self.pool, self._write_and_drain, data)
+                self.write_ms.observe((time.monotonic() - t0) * 1000.0)
+            self.bytes_written += len(data)
+            self.items_written += len(tags)
+            if self._sent:
+                for tag in tags:
+                    self._resolve_sent(tag, "SENT")
+            for tag, trace in traced:
+                trace.mark("wire")
+                if not self.acks.waiting(*tag):
+                    self._trace_end(tag, "sent")   # el sketch no contesta a este canal
+
+    def _write_and_drain(self, data):
+        # flush() espera a que el buffer del SO salga por el cable; con
+        # USB-serie eso vuelve antes de tiempo, así que además se espera el
+        # tiempo de línea (10 bits/byte). Mientras tanto los valores nuevos
+        # se juntan en el Coalescer y no en el buffer del SO.
+        t0 = time.monotonic()
+        self.ser.write(data)
+        self.ser.flush()
+        wire = len(data) * 10.0 / self.baudrate
+        rest = wire - (time.monotonic() - t0)
+        if rest > 0:
+            time.sleep(rest)
+
+    def _read_chunk(self):
+        return self.ser.read(self.ser.in_waiting or 1)
+
+    async def _reader(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            raw = await loop.run_in_executor(self.pool, self._read_chunk)
+            if not raw:
+                continue
+            for item in self.decoder.feed(raw):
+                if isinstance(item, Frame):
+                    self.acks.on_frame(item)
+                elif not self.ready.is_set() and is_banner(item):
+                    self.banner = item
+                    self._set_ready()
+                else:
+                    self.acks.on_text(item)
+            self._acked.set()
@@ -0,0 +1,182 @@
+"""
+Tabla de estado de los actuadores: lo último que se mandó y lo último que
+el Arduino confirmó, por canal lógico ("arm.2", "led.pwm", ...).
+
+    {"arm.1": {"cmd": 120, "t_cmd": 1760000000.1,
+               "ack": 120, "t_ack": 1760000000.2}, ...}
+
+Se contesta desde memoria (comando STATE del gateway y del mux): nunca
+toca el puerto serie. Se guarda en disco (JSON) como mucho cada
+STATE_SAVE_S para que un gateway reiniciado conteste al instante; lo que
+viene del disco lleva "restored": true hasta que llegue un comando nuevo
+(ojo: al abrir el puerto el UNO se reinicia y los servos vuelven a su
+posición de setup()).
+
+SUBSCRIBE (gateway y mux) deja la conexión en modo push: primero todo el
+estado y luego solo lo que cambia, una línea JSON por envío:
+    {"arm.1":{"cmd":120,"ack":null}}
+Cada suscriptor tiene su propia cola "gana el último valor" por canal: uno
+lento recibe menos líneas (con lo más nuevo), nunca una fila de viejos.
+"""
+import asyncio
+import json
+import os
+import time
+
+STATE_SAVE_S = 1.0
+SUB_WRITE_TIMEOUT = 10.0   # seg que se espera a un suscriptor que no lee
+
+def _compact(e):
+    return {"cmd": e.get("cmd"), "ack": e.get("ack")}
+
+class Subscriber:
+    """Cola por suscriptor: por canal solo queda el cambio más nuevo (como Coalescer)."""
+    def __init__(self):
+        self.pending = {}
+        self.event = asyncio.Event()
+        self.closed = False
+        self.superseded = 0
+
+    def put(self, logical, delta):
+        if logical in self.pending:
+            self.superseded += 1
+        self.pending[logical] = delta
+        self.event.set()
+
+    def close(self):
+        self.closed = True
+        self.event.set()
+
+    async def take(self):
+        while not self.pending and not self.closed:
+            self.event.clear()
+            await self.event.wait()
+        delta, self.pending = self.pending, {}
+        return delta
+
+class StateTable:
+    def __init__(self, path=None):
+        self.path = path
+        self.channels = {}
+        self.dirty = False
+        self.subscribers = set()
+
+    def commanded(self, logical, value):
+        e = self.channels.setdefault(logical, {"ack": None, "t_ack": None})
+        e["cmd"] = value
+        e["t_cmd"] = time.time()
+        e.pop("restored", None)
+        self.dirty = True
+        self._publish(logical, e)
+
+    def acked(self, logical, value):
+        e = self.channels.setdefault(logical, {"cmd": None, "t_cmd": None})
+        e["ack"] = value
+        e["t_ack"] = time.time()
+        self.dirty = True
+        self._publish(logical, e)
+
+    def _publish(self, logical, e):
+        if self.subscribers:
+            delta = _compact(e)
+            for sub in self.subscribers:
+                sub.put(logical, delta)
+
+    def subscribe(self):
+        sub = Subscriber()
+        for logical, e in self.channels.items():
+            sub.put(logical, _compact(e))
+        self.subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        self.subscribers.discard(sub)
+
+    def get(self, logical, default=None):
+        """Último valor conocido: el confirmado, o si no el mandado."""
+        e = self.channels.get(logical)
+        if e is None:
+            return default
+        return e["ack"] if e["ack"] is not None else e["cmd"]
+
+    def target(self, logical, default=None):
+        """Adónde va el canal: lo último mandado, o si no el confirmado."""
+        e = self.channels.get(logical)
+        if e is None:
+            return default
+        return e["cmd"] if e["cmd"] is not None else e["ack"]
+
+    def snapshot(self):
+        return {k: dict(v) for k, v in self.channels.items()}
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), separators=(",", ":"), sort_keys=True)
+
+    def load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"[WARN] No pude leer el estado de {self.path}: {e}")
+            return
+        for logical, e in data.items():
+            e["restored"] = True
+            self.channels[logical] = e
+        print(f"[INFO] Estado restaurado de {self.path}: {len(data)} canales")
+
+    def save(self, data=None):
+        """Escritura atómica (archivo temporal + rename)."""
+        if not self.path:
+            return
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(data if data is not None else self.to_json())
+        os.replace(tmp, self.path)
+
+    async def autosave(self, interval=STATE_SAVE_S):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            if not self.dirty:
+                continue
+            self.dirty = False
+            # se serializa en el loop (la tabla no cambia a medias) y se
+            # escribe en un hilo para no frenar a los clientes
+            try:
+                await loop.run_in_executor(None, self.save, self.to_json())
+            except OSError as e:
+                print(f"[WARN] No pude guardar el estado en {self.path}: {e}")
+
+async def serve_subscriber(state, reader, writer, write_timeout=SUB_WRITE_TIMEOUT):
+    """Sesión SUBSCRIBE: manda deltas hasta que el cliente cierre."""
+    sub = state.subscribe()
+    # con un buffer chico drain() frena pronto y los cambios se juntan en
+    # `sub` (solo el más nuevo por canal) en vez de en el socket
+    writer.transport.set_write_buffer_limits(high=4096)
+
+    async def watch_eof():
+        # el suscriptor ya no manda nada: solo interesa saber cuándo se va
+        try:
+            while await reader.read(1024):
+                pass
+        except ConnectionError:
+            pass
+        sub.close()
+
+    watcher = asyncio.create_task(watch_eof())
+    try:
+        while True:
+            delta = await sub.take()
+            if sub.closed:
+                break
+            writer.write((json.dumps(delta, separators=(",", ":")) + "\n").encode("utf-8"))
+            await asyncio.wait_for(writer.drain(), write_timeout)
+    except (asyncio.TimeoutError, ConnectionError):
+        print("[state] suscriptor que no lee, se cierra")
+    finally:
+        watcher.cancel()
+        state.unsubscribe(sub)
@@ -0,0 +1,39 @@
+"""
+Respuestas del multiplexor: un SET/STOP mal formado no contesta (el
+cliente no lo lee y se mezclaría con la respuesta del próximo STATE).
+
+    python3 -m pytest -q test_mux.py
+"""
+import asyncio
+import json
+import os
+import tempfile
+
+from devices import Registry
+from mux import start_mux
+from serial_link import SerialLink
+
+async def _lines(sent, n):
+    """Manda `sent` al mux (Arduino en seco) y devuelve las primeras n respuestas."""
+    reg = Registry()
+    reg.add("default", SerialLink(None))
+    await reg.start()
+    path = os.path.join(tempfile.mkdtemp(), "mux.sock")
+    srv = await start_mux(reg, path)
+    try:
+        reader, writer = await asyncio.open_unix_connection(path)
+        writer.write(sent.encode("utf-8"))
+        out = [(await asyncio.wait_for(reader.readline(), 2.0)).decode().strip() for _ in range(n)]
+        writer.close()
+        return out
+    finally:
+        srv.close()
+        await reg.close()
+        os.unlink(path)
+
+def test_set_mal_formado_no_contesta():
+    out = asyncio.run(_lines("SET led.pwm abc\nSET led.pwm\nSTOP\nSTOP motor.0 x\nSTATE\n", 1))
+    assert isinstance(json.loads(out[0]), dict)   # lo primero que vuelve es el STATE
+
+def test_comando_desconocido_da_err():
+    assert asyncio.run(_lines("FOO 1\nWAVE\nSTATE\n", 2)) == ["ERR:CMD", "ERR:CMD"]
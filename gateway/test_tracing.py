@@ -0,0 +1,57 @@
+"""
+split_line() y un prefijo de traza roto contra el gateway (Arduino simulado).
+
+    python3 -m pytest -q test_tracing.py
+"""
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from fake_arduino import FakeArduino
+from tracing import split_line
+
+def test_split_line_completa():
+    head, cmd = split_line("@7 1000000 - 3000000 P 90 45")
+    assert head == ("7", [1.0, None, 3.0])
+    assert cmd == "P 90 45"
+
+def test_split_line_sin_prefijo():
+    assert split_line("2 90") == (None, "2 90")
+
+def test_split_line_prefijo_corto_se_descarta():
+    assert split_line("@1 2 90") == (None, "")
+    assert split_line("@") == (None, "")
+
+def test_gateway_no_manda_prefijo_roto():
+    dev = FakeArduino("servo3", binary=False).start()
+    port = 5989
+    args = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "gateway.py"),
+            "--serial", dev.port, "--offer-baud", "", "--mux", "", "--unix", "",
+            "--udp-port", "0", "--metrics-port", "0", "--state-file", "", "--health-s", "0",
+            "--deadman", "", "--multi-port", str(port)]
+    for name in ("led", "pwm", "servo", "motor"):
+        args += [f"--{name}-port", "0"]
+    proc = subprocess.Popen(args, stdout=subprocess.DEVNULL)
+    try:
+        t_end = time.monotonic() + 10.0
+        while True:
+            try:
+                s = socket.create_connection(("127.0.0.1", port), timeout=2)
+                break
+            except OSError:
+                if time.monotonic() > t_end:
+                    raise
+                time.sleep(0.1)
+        with s:
+            s.sendall(b"@1 2 90\nSTATE\n")
+            state = json.loads(s.makefile("r").readline())
+        time.sleep(0.3)
+        assert "arm.2" not in state
+        assert not any(ch == 2 for ch, _ in dev.applied)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=5)
+        dev.stop()
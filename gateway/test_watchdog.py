@@ -0,0 +1,51 @@
+"""
+Hombre muerto con dos clientes en la misma placa (Arduino simulado): solo
+vuelve a su valor seguro el canal del que dejó de latir; lo del otro sigue.
+
+    python3 -m pytest -q test_watchdog.py
+"""
+import asyncio
+
+from devices import Registry
+from fairness import FairShare
+from fake_arduino import FakeArduino
+from serial_link import SerialLink
+from trajectory import TrajectoryPlayer
+from watchdog import Watchdog
+
+async def _two_clients():
+    dev = FakeArduino("servo3", binary=False).start()
+    link = SerialLink(dev.port, 9600)
+    reg = Registry()
+    reg.add("arm", link)
+    # "otro" con una parte mínima: lo suyo queda guardado varios segundos
+    reg.fair = FairShare({"silencioso": 1000, "otro": 1})
+    reg.stop_hooks.append(reg.fair.on_stop)
+    reg.player = TrajectoryPlayer(reg)
+    reg.stop_hooks.append(reg.player.on_stop)
+    await reg.start()
+    await link.ready.wait()
+    watchdog = Watchdog(reg, {"arm.1": (0.2, 90)})
+    watchdog.start()
+    try:
+        silent = watchdog.session(["arm.1"])
+        silent.touch()
+        reg.send("arm.1", 120, "silencioso")
+        for v in range(10, 20):
+            reg.send("arm.2", v, "otro")
+        reg.player.load("NEW", [3], [(5000, [45])], "otro")   # trayectoria del otro
+        await asyncio.sleep(0.6)   # vence el timeout de arm.1
+        held = reg.fair.held.get((link, "otro"), {})
+        return dev.applied, held, len(reg.player.tracks[3]), watchdog.trips
+    finally:
+        watchdog.stop()
+        await reg.close()
+        dev.stop()
+
+def test_solo_el_canal_del_que_calla():
+    applied, held, track3, trips = asyncio.run(_two_clients())
+    arm1 = [v for ch, v in applied if ch == 1]
+    assert trips == 1
+    assert arm1[-1] == 90            # valor seguro del que dejó de latir
+    assert held == {"arm.2": {"arm.2": 19}}   # lo guardado del otro sigue esperando
+    assert track3                    # su trayectoria no se cortó
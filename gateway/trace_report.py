@@ -0,0 +1,108 @@
+"""
+Dónde se va el tiempo de los comandos trazados (ver tracing.py).
+
+    python3 trace_report.py gateway_trace.log
+    python3 trace_report.py gateway_trace.log --slow 20 --client "multi 10.0.0.5"
+
+Por tramo (debounce del slider, conexión, red, parseo, cola del puerto
+serie, transmisión serie, firmware + respuesta) imprime n, p50, p95,
+p99 y máximo en ms, cuántos comandos terminaron de cada forma (ack,
+coalesced, ...) y la línea de tiempo de los más lentos.
+La red mezcla dos relojes (PC y Pi): sin NTP puede salir negativa.
+"""
+import argparse
+import shlex
+from collections import Counter
+
+from tracing import STAGES
+
+# (nombre, desde, hasta, letra en la línea de tiempo)
+SPANS = (
+    ("debounce",    "ev",    "disp",  "d"),
+    ("conexión",    "disp",  "send",  "c"),
+    ("red",         "send",  "recv",  "n"),
+    ("parseo",      "recv",  "parse", "p"),
+    ("cola serie",  "parse", "write", "q"),
+    ("tx serie",    "write", "wire",  "t"),
+    ("firmware+ACK", "wire", "ack",   "a"),
+)
+BAR = 60   # ancho de la línea de tiempo
+
+def parse_file(path):
+    """Registros "trace" del archivo -> [dict con los tiempos en ms]."""
+    out = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if " trace " not in line:
+                continue
+            try:
+                tokens = shlex.split(line)
+            except ValueError:
+                continue   # línea cortada (el gateway se cayó escribiendo)
+            rec = dict(t.split("=", 1) for t in tokens[3:] if "=" in t)
+            t = {"recv": 0.0}
+            for stage in STAGES:
+                if stage in rec and stage != "recv":
+                    t[stage] = float(rec[stage])
+            out.append({"id": rec.get("id"), "client": rec.get("client", ""),
+                        "cmd": rec.get("cmd", ""), "out": rec.get("out", "?"),
+                        "at": rec.get("recv", ""), "t": t})
+    return out
+
+def pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(p / 100.0 * len(xs)))]
+
+def total(t):
+    return max(t.values()) - min(t.values())
+
+def timeline(rec, width=BAR):
+    t = rec["t"]
+    t0, span = min(t.values()), total(t) or 1.0
+    bar = [" "] * width
+    for _, a, b, ch in SPANS:
+        if a in t and b in t and t[b] > t[a]:
+            i = min(width - 1, int((t[a] - t0) / span * width))
+            j = max(i + 1, int((t[b] - t0) / span * width))
+            for k in range(i, min(j, width)):
+                bar[k] = ch
+    parts = [f"{name} {t[b] - t[a]:.1f}" for name, a, b, _ in SPANS if a in t and b in t]
+    return "|" + "".join(bar) + "|", " · ".join(parts)
+
+def report(recs, slow=10):
+    print(f"{len(recs)} comandos trazados")
+    print("resultado: " + ", ".join(f"{k}={v}" for k, v in Counter(r["out"] for r in recs).most_common()))
+    print(f"\n{'tramo':14} {'n':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}  (ms)")
+    rows = [(name, [r["t"][b] - r["t"][a] for r in recs if a in r["t"] and b in r["t"]])
+            for name, a, b, _ in SPANS]
+    rows.append(("total", [total(r["t"]) for r in recs]))
+    for name, xs in rows:
+        if xs:
+            print(f"{name:14} {len(xs):6} {pct(xs, 50):9.2f} {pct(xs, 95):9.2f} "
+                  f"{pct(xs, 99):9.2f} {max(xs):9.2f}")
+    if slow:
+        print(f"\nLos {min(slow, len(recs))} más lentos "
+              "(d=debounce c=conexión n=red p=parseo q=cola t=tx a=firmware+ACK):")
+        for r in sorted(recs, key=lambda r: total(r["t"]), reverse=True)[:slow]:
+            bar, parts = timeline(r)
+            print(f"\n  id={r['id']} {r['client']} \"{r['cmd']}\" {r['out']} "
+                  f"total {total(r['t']):.1f} ms (recv {r['at']})")
+            print(f"  {bar}")
+            print(f"  {parts}")
+
+def main():
+    ap = argparse.ArgumentParser(description="Latencia por tramo de los comandos trazados")
+    ap.add_argument("file", help="archivo de --trace del gateway")
+    ap.add_argument("--slow", type=int, default=10, help="cuántos de los más lentos mostrar")
+    ap.add_argument("--client", help="solo los de este cliente, ej. 'multi 10.0.0.5'")
+    args = ap.parse_args()
+    recs = parse_file(args.file)
+    if args.client:
+        recs = [r for r in recs if r["client"] == args.client]
+    if not recs:
+        print("Sin registros 'trace' (¿el gateway corrió con --trace y el cliente manda '@id'?)")
+        return
+    report(recs, args.slow)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Traza de punta a punta de un comando: del slider al ACK del Arduino.
+
+Un cliente que quiere trazar antepone a la línea su id y tres marcas de
+time.time() en µs (o "-"): movimiento del slider, fin del debounce y
+justo antes de sendall (después de conectar si hacía falta):
+
+    @7 1760000001003000 1760000001223000 1760000001223400 P 90 45 10
+
+El gateway le suma las suyas — llegada (recv), parseo = entra a la cola
+del puerto serie (parse), sale de la cola (write), terminó de salir por
+el cable (wire), ACK — y cuando el comando termina escribe un registro
+"trace" con ringlog.py (sin frenar al loop) al archivo de --trace:
+
+    12:00:01.234 INFO trace id=7 client="multi 10.0.0.5" cmd="P 90 45 10" out=ack recv=1760000001.2271 ev=-224.1 disp=-4.1 send=-3.7 parse=0.05 write=0.31 wire=12.4 ack=44.9
+
+Tiempos en ms relativos a la llegada. ev/disp/send son del reloj de la
+PC: el tramo de red (send -> recv) solo vale si los dos relojes están
+sincronizados (NTP). out = ack | sent (el sketch no contesta) |
+coalesced (lo pisó un valor más nuevo antes de salir) | flushed (STOP) |
+lost (sin ACK) | held (el cliente pasó su parte del puerto, sale más
+tarde fundido con lo que siga, ver fairness.py) | none (no llegó al
+puerto serie: límites, STATE...).
+Análisis: trace_report.py.
+"""
+import time
+from contextvars import ContextVar
+
+from ringlog import RingLog
+
+# traza del comando que está atendiendo esta tarea (None = sin trazar)
+current = ContextVar("trace", default=None)
+
+CLIENT_STAMPS = ("ev", "disp", "send")
+STAGES = CLIENT_STAMPS + ("recv", "parse", "write", "wire", "ack")
+
+def split_line(line):
+    """
+    '@7 t1 t2 t3 P 90' -> (("7", [t1, t2, t3]), "P 90"); sin '@' -> (None, line).
+    '@' con menos de 4 campos -> (None, ""): la línea se descarta entera (lo
+    que sobra del prefijo nunca debe llegar al Arduino como comando).
+    """
+    if not line.startswith("@"):
+        return None, line
+    parts = line[1:].split()
+    if len(parts) < 4:
+        return None, ""
+    stamps = []
+    for v in parts[1:4]:
+        try:
+            stamps.append(int(v) / 1e6)
+        except ValueError:
+            stamps.append(None)   # "-" = el cliente no lo midió
+    return (parts[0], stamps), " ".join(parts[4:])
+
+class Trace:
+    __slots__ = ("tracer", "id", "client", "cmd", "t", "open", "out", "written")
+
+    def __init__(self, tracer, tid, client, cmd, stamps, recv):
+        self.tracer = tracer
+        self.id = tid
+        self.client = client
+        self.cmd = cmd
+        self.t = {k: v for k, v in zip(CLIENT_STAMPS, stamps) if v is not None}
+        self.t["recv"] = recv
+        self.open = 0          # partes en el puerto serie (una pose puede ir a varias placas)
+        self.out = None
+        self.written = False
+
+    def mark(self, stage):
+        """Primera vez que el comando llega a `stage` (con varias partes, la primera)."""
+        if stage not in self.t:
+            self.t[stage] = time.time()
+
+    def part(self):
+        self.open += 1
+
+    def end(self, out):
+        """Terminó una parte; con la última se escribe el registro."""
+        self.open -= 1
+        if out == "ack":
+            self.t["ack"] = time.time()   # la última parte en confirmarse
+        if self.out in (None, "ack", "sent"):
+            self.out = out
+        if self.open <= 0:
+            self.tracer.write(self)
+
+    def idle(self):
+        """El cliente ya se atendió: si nada llegó al puerto serie, se cierra."""
+        if self.open <= 0 and not self.written:
+            self.out = self.out or "none"
+            self.tracer.write(self)
+
+class Tracer:
+    def __init__(self, path):
+        self.path = path
+        self.f = open(path, "a", encoding="utf-8")
+        self.log = RingLog("INFO", out=self.f)
+        self.traced = 0
+
+    def start(self):
+        self.log.start()
+        print(f"[trace] comandos con '@id' -> {self.path}")
+        return self
+
+    def close(self):
+        self.log.close()
+        self.f.close()
+
+    def begin(self, head, cmd, client, recv):
+        tid, stamps = head
+        return Trace(self, tid, client, cmd, stamps, recv)
+
+    def write(self, tr):
+        if tr.written:
+            return
+        tr.written = True
+        self.traced += 1
+        recv = tr.t["recv"]
+        fields = {"id": tr.id, "client": tr.client, "cmd": tr.cmd, "out": tr.out,
+                  "recv": f"{recv:.6f}"}
+        for stage in STAGES:
+            if stage != "recv" and stage in tr.t:
+                fields[stage] = round((tr.t[stage] - recv) * 1000.0, 2)
+        self.log.info("trace", **fields)
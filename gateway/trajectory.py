@@ -0,0 +1,182 @@
+"""
+Trayectorias de servos reproducidas en el Pi: el cliente manda la curva
+entera una vez y el gateway la recorre a ritmo fijo, así el jitter del
+Wi-Fi ya no se ve como tirones en el brazo.
+
+Protocolo (puerto multi, una línea cada uno, sin respuesta):
+    TRAJ NEW <sids> <t> <ang...> <t> <ang...> ...   reemplaza lo que haya
+    TRAJ ADD <sids> <t> <ang...> ...                se encola al final
+    TRAJ CANCEL [<sids>]                            corta (quedan donde están)
+  - <sids>: servos separados por coma, ej. "1,2,3"
+  - cada nudo: t en ms y un ángulo por servo, en el orden de <sids>
+  - NEW: t relativo a ahora; ADD: relativo al último nudo encolado
+  ej. TRAJ NEW 1,3 0 90 90 500 120 45 1000 150 30
+Si el servo tiene un ángulo conocido (state.py) se agrega un nudo en t=0
+con ese ángulo: el movimiento arranca desde donde está. Entre nudos se
+interpola en línea recta; una línea de 256 bytes entra ~12 nudos de 3
+servos, para más se sigue con ADD.
+
+Un "sid ang" suelto, STOP o ESTOP cancelan la trayectoria de ese servo.
+Si una muestra cae en una pose prohibida (limits.py) la trayectoria de
+esos servos se corta ahí; el rechazo se le cuenta al cliente que la mandó.
+
+Cada servo guarda sus nudos en dos array (t, ángulo): sin un objeto por
+nudo. Se recorren a TRAJ_HZ con el reloj de paso fijo de clock.py; lo que
+cambia en un mismo tick sale como una sola pose (ver frames.py).
+"""
+from array import array
+
+from clock import FixedRateLoop
+
+TRAJ_HZ = 50          # muestras por segundo (lo que refresca un servo de hobby)
+MAX_KNOTS = 4096      # por servo
+SIDS = range(1, 4)    # servos del brazo con trayectoria
+
+class Track:
+    """Nudos de un servo: t absoluto (reloj del loop, seg) y ángulo."""
+    __slots__ = ("t", "a", "i")
+
+    def __init__(self):
+        self.t = array("d")
+        self.a = array("f")
+        self.i = 0   # nudo actual (lo anterior ya pasó)
+
+    def __len__(self):
+        return len(self.t) - self.i
+
+    def clear(self):
+        del self.t[:]
+        del self.a[:]
+        self.i = 0
+
+    def end(self):
+        return self.t[-1] if len(self) else None
+
+    def append(self, t, a):
+        self.t.append(t)
+        self.a.append(a)
+
+    def sample(self, now):
+        """Ángulo en `now`; None si todavía no empieza o ya terminó."""
+        t, a = self.t, self.a
+        n = len(t)
+        if self.i >= n or now < t[self.i]:
+            return None
+        while self.i + 1 < n and t[self.i + 1] <= now:
+            self.i += 1
+        if self.i + 1 >= n:
+            value = a[-1]
+            self.clear()   # último nudo: se manda una vez y termina
+            return value
+        t0, t1 = t[self.i], t[self.i + 1]
+        value = a[self.i] + (a[self.i + 1] - a[self.i]) * (now - t0) / (t1 - t0)
+        if self.i > 1024:
+            # compactar de vez en cuando para que el array no crezca
+            del t[:self.i]
+            del a[:self.i]
+            self.i = 0
+        return value
+
+class TrajectoryPlayer(FixedRateLoop):
+    def __init__(self, reg, hz=TRAJ_HZ):
+        super().__init__(hz)
+        self.reg = reg
+        self.tracks = {sid: Track() for sid in SIDS}
+        self.last_sent = {}
+        self.owner = {}       # sid -> cliente que mandó su trayectoria
+
+    def cancel(self, sids=None):
+        for sid in (SIDS if sids is None else sids):
+            if sid in self.tracks:
+                self.tracks[sid].clear()
+
+    def on_stop(self, link, logical=None):
+        """
+        Registry.stop/estop: cortar las trayectorias que van por ese enlace
+        (con `logical`, solo la de ese servo).
+        """
+        for sid in SIDS:
+            if logical is not None and logical != f"arm.{sid}":
+                continue
+            r = self.reg.routes.get(f"arm.{sid}")
+            if link is None or (r is not None and r[0] is link):
+                self.tracks[sid].clear()
+
+    def load(self, mode, sids, knots, client=None):
+        """knots = [(t_ms, [ang por sid]), ...] ya validados."""
+        now = self.now()
+        for k, sid in enumerate(sids):
+            self.owner[sid] = client
+            tr = self.tracks[sid]
+            if mode == "NEW":
+                tr.clear()
+            base = tr.end() if len(tr) else None
+            if base is None:
+                base = now
+                cur = self.reg.state.get(f"arm.{sid}")
+                if cur is not None and knots[0][0] > 0:
+                    tr.append(now, float(cur))
+            if len(tr) + len(knots) > MAX_KNOTS:
+                print(f"[traj] servo {sid}: más de {MAX_KNOTS} nudos, se ignora")
+                continue
+            for t_ms, angs in knots:
+                tr.append(base + t_ms / 1000.0, float(max(0, min(180, angs[k]))))
+        self.wake.set()
+
+    def handle(self, parts, client=None):
+        """Línea TRAJ ya separada en palabras. Devuelve False si no es válida."""
+        if len(parts) < 2:
+            return False
+        mode = parts[1].upper()
+        try:
+            sids = [int(x) for x in parts[2].split(",")] if len(parts) > 2 else None
+        except ValueError:
+            return False
+        if sids is not None and any(sid not in self.tracks for sid in sids):
+            return False
+        if mode == "CANCEL":
+            self.cancel(sids)
+            return True
+        if mode not in ("NEW", "ADD") or not sids:
+            return False
+        stride = 1 + len(sids)
+        try:
+            vals = [float(x) for x in parts[3:]]
+        except ValueError:
+            return False
+        if not vals or len(vals) % stride:
+            return False
+        knots = [(vals[i], vals[i + 1:i + stride]) for i in range(0, len(vals), stride)]
+        if any(b[0] < a[0] for a, b in zip(knots, knots[1:])) or knots[0][0] < 0:
+            return False
+        self.load(mode, sids, knots, client)
+        return True
+
+    def active(self):
+        return any(len(tr) for tr in self.tracks.values())
+
+    def idle(self):
+        self.last_sent.clear()
+
+    def tick(self, now):
+        changed = {}
+        for sid, tr in self.tracks.items():
+            if not len(tr):
+                continue
+            value = tr.sample(now)
+            if value is None:
+                continue
+            ang = int(round(value))
+            if self.last_sent.get(sid) != ang:
+                self.last_sent[sid] = ang
+                changed[f"arm.{sid}"] = ang
+        if not changed:
+            return
+        sids = [int(logical[4:]) for logical in changed]
+        client = self.owner.get(sids[0])
+        if len(changed) > 1:
+            ok = self.reg.pose(changed, client)   # los servos de este tick se mueven juntos
+        else:
+            ok = self.reg.send(*next(iter(changed.items())), client)
+        if not ok:
+            self.cancel(sids)   # pose prohibida: no seguir por ese camino
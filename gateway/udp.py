@@ -0,0 +1,71 @@
+"""
+Setpoints de servo por UDP, para arrastres continuos del slider.
+
+Un datagrama = "sesión seq sid ang [sid ang ...]"  (texto, como TCP)
+  - sesión: número al azar que elige el cliente al arrancar
+  - seq   : contador del cliente (32 bits, da la vuelta)
+Solo importa el ángulo más nuevo: un datagrama con seq igual o más viejo
+que el último aceptado para ese (IP, sesión, servo) se descarta. Lo que
+pasa va al Registry como cualquier "sid ang" (y ahí gana el más nuevo);
+si son varios servos, como una sola pose (se mueven juntos).
+Lo que tiene que llegar sí o sí (el ángulo final, STOP) sigue por TCP.
+"""
+import asyncio
+from collections import OrderedDict
+
+UDP_PORT = 5001        # mismo número que el TCP multi (son espacios distintos)
+MAX_SENDERS = 256      # (IP, sesión, servo) recordados; los más viejos se olvidan
+
+def newer(a, b):
+    """¿seq a es posterior a b? Aritmética de números de serie (RFC 1982)."""
+    return 0 < ((a - b) & 0xFFFFFFFF) < 0x80000000
+
+class SetpointProtocol(asyncio.DatagramProtocol):
+    def __init__(self, reg, max_senders=MAX_SENDERS):
+        self.reg = reg
+        self.max_senders = max_senders
+        self.last = OrderedDict()   # (ip, sesión, sid) -> último seq aceptado
+        self.accepted = 0
+        self.stale = 0
+        self.bad = 0
+
+    def datagram_received(self, data, addr):
+        parts = data.split()
+        if len(parts) < 4 or len(parts) % 2:
+            self.bad += 1
+            return
+        try:
+            sess, seq = int(parts[0]), int(parts[1])
+            pairs = [(int(parts[i]), int(parts[i + 1])) for i in range(2, len(parts), 2)]
+        except ValueError:
+            self.bad += 1
+            return
+        fresh = {}
+        for sid, ang in pairs:
+            if not 1 <= sid <= 15:
+                self.bad += 1
+                continue
+            key = (addr[0], sess, sid)
+            last = self.last.get(key)
+            if last is not None and not newer(seq, last):
+                self.stale += 1
+                continue
+            self.last[key] = seq
+            self.last.move_to_end(key)
+            if len(self.last) > self.max_senders:
+                self.last.popitem(last=False)
+            self.accepted += 1
+            fresh[f"arm.{sid}"] = max(0, min(180, ang))
+        client = f"udp {addr[0]}"
+        if len(fresh) > 1:
+            self.reg.pose(fresh, client)   # varios servos del mismo datagrama: una pose
+        else:
+            for logical, ang in fresh.items():
+                self.reg.send(logical, ang, client)
+
+async def start_udp(reg, host, port=UDP_PORT):
+    loop = asyncio.get_running_loop()
+    transport, proto = await loop.create_datagram_endpoint(
+        lambda: SetpointProtocol(reg), local_addr=(host, port))
+    print(f"Setpoints UDP escuchando en {host}:{port}...")
+    return transport, proto
@@ -0,0 +1,157 @@
+"""
+Hombre muerto: si un cliente que controla un canal deja de hablar, el
+gateway lleva ese canal a su valor seguro (motor 0, LED apagado).
+
+Es opcional y lo pide el cliente: la línea "HB" (sin respuesta) arma el
+watchdog de su sesión, y desde ahí cualquier línea (HB o comando) cuenta
+como latido. Si pasa el timeout de un canal sin latidos, o la conexión se
+cae, se manda el valor seguro por el carril de prioridad (Registry.stop).
+
+Los timeouts son por canal lógico (DEADMAN en gateway.py):
+    {"motor.0": (0.2, 0), "led.pwm": (1.0, 0), ...}   # canal -> (seg, valor seguro)
+
+Los vencimientos van en una rueda de timers (TimerWheel): agregar y
+disparar cuestan O(1) y un latido solo actualiza un número, así que el
+costo por tick no crece con la cantidad de sesiones.
+"""
+import asyncio
+import time
+
+WHEEL_TICK = 0.01    # seg: resolución (el stop sale a lo sumo un tick tarde)
+WHEEL_SLOTS = 512    # 512 x 10 ms = 5.12 s por vuelta; más largo usa `rounds`
+
+class Timer:
+    __slots__ = ("deadline", "callback", "rounds", "active")
+
+    def __init__(self, deadline, callback):
+        self.deadline = deadline
+        self.callback = callback
+        self.rounds = 0
+        self.active = True
+
+    def cancel(self):
+        self.active = False
+
+class TimerWheel:
+    """
+    Rueda de timers con hash: slot = tick del vencimiento % WHEEL_SLOTS.
+    callback(timer) se llama en el loop de asyncio; puede volver a
+    agregar el timer con otro deadline (así se re-arma sin buscarlo).
+    """
+    def __init__(self, tick=WHEEL_TICK, slots=WHEEL_SLOTS):
+        self.tick = tick
+        self.slots = [[] for _ in range(slots)]
+        self.current = int(time.monotonic() / tick)
+        self.task = None
+
+    def add(self, timer):
+        t = max(int(timer.deadline / self.tick), self.current + 1)
+        timer.rounds = (t - self.current - 1) // len(self.slots)
+        self.slots[t % len(self.slots)].append(timer)
+        return timer
+
+    def schedule(self, deadline, callback):
+        return self.add(Timer(deadline, callback))
+
+    def _advance(self, until):
+        while self.current < until:
+            self.current += 1
+            slot = self.slots[self.current % len(self.slots)]
+            if not slot:
+                continue
+            due = []
+            keep = []
+            for timer in slot:
+                if not timer.active:
+                    continue
+                if timer.rounds > 0:
+                    timer.rounds -= 1
+                    keep.append(timer)
+                else:
+                    due.append(timer)
+            slot[:] = keep
+            for timer in due:
+                timer.callback(timer)
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.tick)
+            self._advance(int(time.monotonic() / self.tick))
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+
+class Session:
+    """Sesión con watchdog armado: latidos y los canales que cuida."""
+    def __init__(self, watchdog, channels):
+        self.watchdog = watchdog
+        self.channels = channels
+        self.last_seen = time.monotonic()
+        self.timers = []
+        self.fired = set()
+        for logical in channels:
+            timeout, _ = watchdog.deadman[logical]
+            self.timers.append(watchdog.wheel.schedule(
+                self.last_seen + timeout,
+                lambda timer, lg=logical: self._check(timer, lg)))
+
+    def touch(self):
+        self.last_seen = time.monotonic()
+        self.fired.clear()
+
+    def _check(self, timer, logical):
+        timeout, _ = self.watchdog.deadman[logical]
+        deadline = self.last_seen + timeout
+        if time.monotonic() < deadline:
+            timer.deadline = deadline   # hubo latidos: re-armar
+        else:
+            self._fire(logical)
+            timer.deadline = time.monotonic() + timeout
+        self.watchdog.wheel.add(timer)
+
+    def _fire(self, logical):
+        if logical in self.fired:
+            return   # ya se mandó el valor seguro y no volvió a hablar
+        self.fired.add(logical)
+        self.watchdog.trip(logical)
+
+    def close(self):
+        """La conexión se cortó: valor seguro ya, sin esperar el timeout."""
+        for timer in self.timers:
+            timer.cancel()
+        for logical in self.channels:
+            self._fire(logical)
+
+class Watchdog:
+    def __init__(self, reg, deadman, tick=WHEEL_TICK):
+        self.reg = reg
+        self.deadman = dict(deadman)
+        self.wheel = TimerWheel(tick)
+        self.sessions = set()
+        self.trips = 0
+
+    def start(self):
+        self.wheel.start()
+
+    def stop(self):
+        self.wheel.stop()
+
+    def session(self, channels):
+        """Arma el watchdog para los canales (con timeout) que maneja un protocolo."""
+        s = Session(self, [lg for lg in channels if lg in self.deadman])
+        self.sessions.add(s)
+        return s
+
+    def release(self, session):
+        session.close()
+        self.sessions.discard(session)
+
+    def trip(self, logical):
+        _, safe = self.deadman[logical]
+        self.trips += 1
+        print(f"[watchdog] sin latidos: {logical} -> {safe}")
+        self.reg.stop(logical, safe, only=True)   # no toca a otros clientes de la placa
@@ -0,0 +1,132 @@
+"""
+Patrones del LED PWM generados en el Pi: el cliente manda una línea y el
+gateway va calculando el brillo a WAVE_HZ, sin una orden por paso desde
+la red.
+
+Protocolo (puerto pwm, o "WAVE <...>" por el multiplexor; sin respuesta):
+    FADE <a> <ms>                  rampa lineal hasta a (0-255)
+    GFADE <a> <ms> [gamma]         rampa pareja a la vista (gamma 2.2)
+    BREATHE <ms> [lo hi]           respiración senoidal, período ms
+    BLINK <ms> [lo hi [duty]]      parpadeo, período ms, duty 0-1 (0.5)
+    CANCEL                         corta (el LED queda donde está)
+Las rampas arrancan desde el último valor conocido (state.py) y terminan
+mandando el valor final. BREATHE y BLINK siguen hasta que algo los corte:
+un valor suelto en el puerto pwm, un SET led.pwm por el multiplexor, otro
+patrón, STOP o ESTOP.
+
+Solo se manda cuando cambia el entero: una rampa lenta no llena el serie
+con valores repetidos.
+"""
+import math
+
+from clock import FixedRateLoop
+
+WAVE_HZ = 50            # pasos por segundo (un fade a 50 Hz ya se ve continuo)
+GAMMA = 2.2
+CHANNEL = "led.pwm"
+
+def _fade(v0, v1, dur, gamma=None):
+    """f(t) -> (valor, terminó) de una rampa de dur segundos."""
+    if gamma is not None:
+        # interpolar en brillo percibido y volver a PWM
+        p0, p1 = (v0 / 255.0) ** (1 / gamma), (v1 / 255.0) ** (1 / gamma)
+    def f(t):
+        if t >= dur:
+            return v1, True
+        x = t / dur
+        if gamma is None:
+            return v0 + (v1 - v0) * x, False
+        return 255.0 * (p0 + (p1 - p0) * x) ** gamma, False
+    return f
+
+def _breathe(period, lo, hi):
+    def f(t):
+        x = 0.5 - 0.5 * math.cos(2 * math.pi * t / period)   # arranca en lo
+        return lo + (hi - lo) * x, False
+    return f
+
+def _blink(period, lo, hi, duty):
+    def f(t):
+        return (hi if (t % period) < duty * period else lo), False
+    return f
+
+class WaveformEngine(FixedRateLoop):
+    def __init__(self, reg, hz=WAVE_HZ, channel=CHANNEL):
+        super().__init__(hz)
+        self.reg = reg
+        self.channel = channel
+        self.wave = None      # f(t) del patrón activo
+        self.t0 = 0.0
+        self.last_sent = None
+
+    def active(self):
+        return self.wave is not None
+
+    def cancel(self):
+        self.wave = None
+
+    def on_stop(self, link, logical=None):
+        """Registry.stop/estop: cortar el patrón si va por ese enlace (y ese canal)."""
+        if logical is not None and logical != self.channel:
+            return
+        r = self.reg.routes.get(self.channel)
+        if link is None or (r is not None and r[0] is link):
+            self.wave = None
+
+    def play(self, wave):
+        self.wave = wave
+        self.t0 = self.now()
+        self.last_sent = None
+        self.wake.set()
+
+    def handle(self, parts):
+        """Línea de patrón ya separada en palabras. Devuelve False si no es válida."""
+        if not parts:
+            return False
+        name = parts[0].upper()
+        if name == "CANCEL" and len(parts) == 1:
+            self.cancel()
+            return True
+        try:
+            args = [float(x) for x in parts[1:]]
+        except ValueError:
+            return False
+        if not args or args[0] < 0 or not all(math.isfinite(a) for a in args):
+            return False
+        secs = args[0] / 1000.0
+        level = lambda v: max(0.0, min(255.0, v))
+        cur = self.reg.state.get(self.channel)
+        cur = 0 if cur is None else cur
+        if name == "FADE" and len(args) == 2:
+            to, secs = level(args[0]), args[1] / 1000.0
+            wave = _fade(float(cur), to, max(secs, 0.0))
+        elif name == "GFADE" and len(args) in (2, 3):
+            gamma = args[2] if len(args) == 3 else GAMMA
+            if gamma <= 0:
+                return False
+            to, secs = level(args[0]), args[1] / 1000.0
+            wave = _fade(float(cur), to, max(secs, 0.0), gamma)
+        elif name in ("BREATHE", "BLINK") and secs > 0:
+            lo, hi = (level(args[1]), level(args[2])) if len(args) >= 3 else (0.0, 255.0)
+            if name == "BREATHE" and len(args) in (1, 3):
+                wave = _breathe(secs, lo, hi)
+            elif name == "BLINK" and len(args) in (1, 3, 4):
+                duty = args[3] if len(args) == 4 else 0.5
+                if not 0 <= duty <= 1:
+                    return False
+                wave = _blink(secs, lo, hi, duty)
+            else:
+                return False
+        else:
+            return False
+        self.play(wave)
+        return True
+
+    def tick(self, now):
+        value, done = self.wave(now - self.t0)
+        v = int(round(value))
+        if v != self.last_sent:
+            self.last_sent = v
+            self.reg.send(self.channel, v)
+        if done:
+            self.wave = None
@@ -1,24 +1,50 @@
 from flask import Flask, render_template, request, redirect, url_for, session, jsonify
 from werkzeug.security import check_password_hash
+import json
+import os
 import socket
+import time
 
 APP_USER = "diana"
 APP_PW_HASH = "PEGA_AQUI_TU_HASH_COMPLETO"
 SECRET_KEY = "cambia_esto_por_algo_largo_y_unico"
 
 TCP_HOST = "127.0.0.1"
-TCP_PORT = 5001
+TCP_PORT = 5002   # el LED en tcp.py y en gateway/gateway.py (5001 es el brazo)
+# Si el servidor corre en este mismo Pi (tcp.py o gateway/gateway.py) también
+# escucha aquí: se usa solo, sin pasar por la pila TCP.
+UNIX_SOCKET = f"/tmp/arduino_tcp_{TCP_PORT}.sock"
 
 app = Flask(__name__)
 app.secret_key = SECRET_KEY
 
+# Lo último que esta app mandó, por si el servidor no entiende STATE (tcp.py)
+state = {}
+
 def is_logged_in():
     return session.get("logged_in") is True
 
+def connect():
+    if os.path.exists(UNIX_SOCKET):
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        s.settimeout(3)
+        try:
+            s.connect(UNIX_SOCKET)
+            return s
+        except OSError:
+            s.close()   # quedó el archivo de un servidor que ya no está
+    return socket.create_connection((TCP_HOST, TCP_PORT), timeout=3)
+
 def send_cmd(cmd: str) -> str:
-    with socket.create_connection((TCP_HOST, TCP_PORT), timeout=3) as s:
+    with connect() as s:
         s.sendall((cmd + "\n").encode("utf-8"))
-        return s.recv(1024).decode("utf-8", errors="ignore").strip()
+        buf = b""
+        while not buf.endswith(b"\n"):
+            chunk = s.recv(4096)
+            if not chunk:
+                break
+            buf += chunk
+        return buf.decode("utf-8", errors="ignore").strip()
 
 @app.route("/login", methods=["GET", "POST"])
 def login():
@@ -48,18 +74,39 @@ def set_led():
         return jsonify({"ok": False, "error": "No autorizado"}), 401
 
     data = request.get_json(silent=True) or {}
-    state = str(data.get("state", "")).strip()
+    wanted = str(data.get("state", "")).strip()
 
-    if state in ("1", "on", "ON", "true", "TRUE"):
+    if wanted in ("1", "on", "ON", "true", "TRUE"):
         cmd = "LED_ON"
-    elif state in ("0", "off", "OFF", "false", "FALSE"):
+    elif wanted in ("0", "off", "OFF", "false", "FALSE"):
         cmd = "LED_OFF"
     else:
         return jsonify({"ok": False, "error": "Usa state=1 o state=0"}), 400
 
-    resp = send_cmd(cmd)
+    try:
+        resp = send_cmd(cmd)
+    except OSError as ex:   # socket.timeout es OSError: el servidor no contestó
+        return jsonify({"ok": False, "cmd": cmd, "error": f"Sin servidor LED: {ex}"}), 502
+    e = {"cmd": 1 if cmd == "LED_ON" else 0, "t_cmd": time.time()}
+    if resp.startswith("OK"):
+        e.update(ack=e["cmd"], t_ack=e["t_cmd"])
+    state["led.onoff"] = e
     return jsonify({"ok": resp.startswith("OK"), "cmd": cmd, "resp": resp})
 
+@app.get("/state")
+def get_state():
+    """Estado desde memoria: el del gateway (comando STATE) o el de esta app."""
+    if not is_logged_in():
+        return jsonify({"ok": False, "error": "No autorizado"}), 401
+
+    try:
+        resp = send_cmd("STATE")
+    except OSError:
+        resp = ""
+    if resp.startswith("{"):
+        return jsonify({"ok": True, "source": "gateway", "state": json.loads(resp)})
+    return jsonify({"ok": True, "source": "app", "state": state})
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=True)
 
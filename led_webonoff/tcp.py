@@ -1,51 +1,92 @@
+import os
+import selectors
 import socket
+import stat
+import sys
+import time
 import serial
 
+# espera del arranque del Arduino (gateway/boot.py), junto a este script o
+# en ../gateway; copiado solo sin boot.py: la espera fija de 2 s de antes
+_here = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [_here, os.path.join(_here, "..", "gateway")]
+try:
+    from boot import wait_ready  # noqa: E402
+except ImportError:
+    def wait_ready(ser, timeout=2.0):
+        time.sleep(timeout)
+        return None
+
 # --- CONFIGURACIÓN ---
 SERIAL_PORT = "/dev/ttyACM0"
 BAUDRATE    = 9600
 
 HOST = "0.0.0.0"
-PORT = 5001
+PORT = 5002   # el mismo que TCP_PORT en app.py (5001 es el del brazo)
+# Mismo protocolo por socket Unix para la app Flask del mismo Pi
+# (mismo nombre que usa gateway/gateway.py para su puerto). "" = no.
+UNIX_SOCKET = f"/tmp/arduino_tcp_{PORT}.sock"
 # ----------------------
 
 VALID_CMDS = {"LED_ON", "LED_OFF"}
 
+def handle(conn, ser):
+    data = conn.recv(1024)
+    if not data:
+        return
+
+    cmd = data.decode("utf-8", errors="ignore").strip().upper()
+
+    if cmd not in VALID_CMDS:
+        conn.sendall(b"ERR:CMD\n")
+        return
+
+    # IMPORTANTE: Arduino lee hasta '\n'
+    ser.write((cmd + "\n").encode("utf-8"))
+    ser.flush()
+
+    # Arduino responde: OK:LED_ON / OK:LED_OFF / ERR:CMD
+    resp = ser.readline().decode("utf-8", errors="ignore").strip()
+    if not resp:
+        resp = "ERR:TIMEOUT"
+
+    conn.sendall((resp + "\n").encode("utf-8"))
+
+def listen_unix(path):
+    try:
+        if stat.S_ISSOCK(os.stat(path).st_mode):
+            os.unlink(path)   # socket de una corrida anterior
+    except FileNotFoundError:
+        pass
+    s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    s.bind(path)
+    os.chmod(path, 0o666)   # la app Flask puede correr con otro usuario
+    s.listen(1)
+    return s
+
 def main():
     ser = serial.Serial(SERIAL_PORT, BAUDRATE, timeout=1)
     print(f"Conectado a Arduino en {SERIAL_PORT} a {BAUDRATE} baudios")
-    print(f"Servidor LED escuchando en {HOST}:{PORT}...")
+    # el UNO se reinicia al abrir el puerto: el primer LED_ON se perdería
+    wait_ready(ser)
 
+    sel = selectors.DefaultSelector()
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
         s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         s.bind((HOST, PORT))
         s.listen(1)
+        sel.register(s, selectors.EVENT_READ)
+        print(f"Servidor LED escuchando en {HOST}:{PORT}...")
+        if UNIX_SOCKET:
+            sel.register(listen_unix(UNIX_SOCKET), selectors.EVENT_READ)
+            print(f"Servidor LED escuchando en {UNIX_SOCKET}")
 
         while True:
-            conn, addr = s.accept()
-            with conn:
-                print(f"Conexión desde {addr}")
-
-                data = conn.recv(1024)
-                if not data:
-                    continue
-
-                cmd = data.decode("utf-8", errors="ignore").strip().upper()
-
-                if cmd not in VALID_CMDS:
-                    conn.sendall(b"ERR:CMD\n")
-                    continue
-
-                # IMPORTANTE: Arduino lee hasta '\n'
-                ser.write((cmd + "\n").encode("utf-8"))
-                ser.flush()
-
-                # Arduino responde: OK:LED_ON / OK:LED_OFF / ERR:CMD
-                resp = ser.readline().decode("utf-8", errors="ignore").strip()
-                if not resp:
-                    resp = "ERR:TIMEOUT"
-
-                conn.sendall((resp + "\n").encode("utf-8"))
+            for key, _ in sel.select():
+                conn, addr = key.fileobj.accept()
+                with conn:
+                    print(f"Conexión desde {addr or 'socket Unix'}")
+                    handle(conn, ser)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,71 @@
+"""
+/set_led y /state con el cliente de prueba de Flask, sin servidor ni Arduino
+(send_cmd reemplazado).
+
+    python3 -m pytest -q test_app.py
+"""
+import socket
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+import app as webapp
+
+PASSWORD = "prueba"
+
+@pytest.fixture
+def client(monkeypatch):
+    """
+    client(replies) -> (cliente con sesión iniciada, comandos mandados);
+    send_cmd contesta de `replies` (cmd -> resp o excepción). monkeypatch
+    deja send_cmd, APP_PW_HASH y state como estaban al terminar cada test.
+    """
+    monkeypatch.setattr(webapp, "APP_PW_HASH", generate_password_hash(PASSWORD))
+    monkeypatch.setattr(webapp, "state", {})
+
+    def make(replies):
+        sent = []
+        def send_cmd(cmd):
+            sent.append(cmd)
+            resp = replies.get(cmd, "")
+            if isinstance(resp, Exception):
+                raise resp
+            return resp
+        monkeypatch.setattr(webapp, "send_cmd", send_cmd)
+        c = webapp.app.test_client()
+        c.post("/login", data={"username": webapp.APP_USER, "password": PASSWORD})
+        return c, sent
+    return make
+
+def test_set_led_on_guarda_estado(client):
+    c, sent = client({"LED_ON": "OK LED ON"})
+    r = c.post("/set_led", json={"state": "1"})
+    assert r.status_code == 200
+    assert r.get_json() == {"ok": True, "cmd": "LED_ON", "resp": "OK LED ON"}
+    assert sent == ["LED_ON"]
+    assert webapp.state["led.onoff"]["cmd"] == 1
+    assert webapp.state["led.onoff"]["ack"] == 1
+
+def test_state_sin_gateway_usa_lo_de_la_app(client):
+    c, _ = client({"LED_OFF": "OK LED OFF", "STATE": "ERR"})
+    c.post("/set_led", json={"state": "off"})
+    body = c.get("/state").get_json()
+    assert body["source"] == "app"
+    assert body["state"]["led.onoff"]["cmd"] == 0
+
+def test_set_led_valor_invalido(client):
+    c, sent = client({})
+    r = c.post("/set_led", json={"state": "quizás"})
+    assert r.status_code == 400
+    assert sent == []
+
+def test_set_led_sin_sesion():
+    c = webapp.app.test_client()
+    assert c.post("/set_led", json={"state": "1"}).status_code == 401
+
+def test_set_led_sin_servidor_da_502(client):
+    c, _ = client({"LED_ON": socket.timeout("timed out")})
+    r = c.post("/set_led", json={"state": "1"})
+    assert r.status_code == 502
+    assert r.get_json()["ok"] is False
+    assert "led.onoff" not in webapp.state
@@ -5,11 +5,27 @@
 #mkdir -p ~/web_pwm_arduino/static/css
 #cd ~/web_pwm_arduino
 #nano app.py (Paso 1)
+#cp <repo>/gateway/ringlog.py <repo>/gateway/boot.py ~/web_pwm_arduino/   (log sin bloqueo, arranque)
+#cp <repo>/slider_led/web_slider_led/wsock.py ~/web_pwm_arduino/   (WebSocket del slider)
 
-from flask import Flask, render_template, request, redirect, url_for, session, jsonify
+from flask import Flask, Response, render_template, request, redirect, url_for, session, jsonify
 from werkzeug.security import check_password_hash
+import json
+import os
+import socket
+import sys
+import threading
+import time
 import serial
 
+# log sin bloqueo y arranque del Arduino (gateway/ringlog.py, boot.py):
+# junto a app.py o en el repo
+_here = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [_here, os.path.join(_here, "..", "..", "gateway")]
+from boot import wait_ready  # noqa: E402
+from ringlog import RingLog  # noqa: E402
+import wsock  # noqa: E402
+
 # -----------------------------
 # LOGIN CONFIG
 # -----------------------------
@@ -24,10 +40,74 @@ SERIAL_PORT = "/dev/ttyACM0"
 BAUDRATE = 9600
 USE_SERIAL = True  # pon False si quieres correr sin Arduino conectado
 
+# Si el gateway (gateway/gateway.py) está corriendo, él es el dueño del
+# puerto serie y aquí se le habla por su socket Unix. Así esta app y el
+# slider de escritorio controlan el mismo LED al mismo tiempo.
+MUX_SOCKET = "/tmp/arduino_mux.sock"
+MUX_CHANNEL = "led.pwm"
+
+# cada movimiento del slider es un registro "pwm"; se guarda 1 de cada
+# LOG_SAMPLE_PWM ("DEBUG" = todos)
+LOG_LEVEL = "INFO"
+LOG_SAMPLE_PWM = 10
+
+# WebSocket del slider (/ws_pwm): un mensaje por movimiento ("128"); sale
+# hacia el Arduino de a uno, y mientras ese espera su confirmación los que
+# llegan se pisan (gana el último)
+WS_ACK_TIMEOUT = 1.0   # seg esperando al gateway por cada valor
+
 app = Flask(__name__)
+log = RingLog(LOG_LEVEL, {"pwm": LOG_SAMPLE_PWM} if LOG_LEVEL != "DEBUG" else None)
 app.secret_key = SECRET_KEY
 
 ser = None
+ser_lock = threading.Lock()   # escriben los pedidos HTTP y los WebSocket (PwmStream)
+mux = None
+mux_lock = threading.Lock()
+
+# Lo último que esta app mandó (cuando no hay gateway que lleve la cuenta)
+state = {}
+
+def _mux_sendall(line: str) -> bool:
+    global mux
+    for _ in range(2):
+        try:
+            if mux is None:
+                mux = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                mux.settimeout(1)
+                mux.connect(MUX_SOCKET)
+            mux.sendall((line + "\n").encode("utf-8"))
+            return True
+        except OSError:
+            # el gateway se reinició: reconectar una vez
+            if mux is not None:
+                mux.close()
+            mux = None
+    return False
+
+def mux_send(line: str) -> bool:
+    """Manda una línea al multiplexor del gateway. False si no está."""
+    with mux_lock:
+        return _mux_sendall(line)
+
+def mux_query(line: str):
+    """Manda una línea y devuelve la respuesta (una línea); None si falla."""
+    global mux
+    with mux_lock:
+        if not _mux_sendall(line):
+            return None
+        buf = b""
+        try:
+            while not buf.endswith(b"\n"):
+                chunk = mux.recv(4096)
+                if not chunk:
+                    raise OSError("gateway cerrado")
+                buf += chunk
+        except OSError:
+            mux.close()
+            mux = None
+            return None
+        return buf.decode("utf-8", errors="ignore").strip()
 
 def open_serial():
     global ser
@@ -35,24 +115,118 @@ def open_serial():
         ser = None
         print("[INFO] USE_SERIAL=False (no se abrirá puerto serial)")
         return
+    if os.path.exists(MUX_SOCKET):
+        ser = None
+        print(f"[INFO] Gateway detectado ({MUX_SOCKET}): no se abre {SERIAL_PORT}")
+        return
     try:
         ser = serial.Serial(SERIAL_PORT, BAUDRATE, timeout=1)
         print(f"Conectado a Arduino en {SERIAL_PORT} a {BAUDRATE} baudios")
+        wait_ready(ser)   # el UNO se reinicia al abrir: el primer valor se perdería
     except Exception as e:
         ser = None
         print(f"[WARN] No pude abrir {SERIAL_PORT} @ {BAUDRATE}: {e}")
         print("[TIP] Revisa puertos con: ls /dev/ttyACM* /dev/ttyUSB*")
 
 def send_to_arduino(valor: int):
-    # EXACTAMENTE igual que tu server_pwm.py
+    # EXACTAMENTE igual que tu server_pwm.py, pero por el gateway si está
     global ser
+    state[MUX_CHANNEL] = {"cmd": valor, "t_cmd": time.time()}
     if ser is None:
+        if USE_SERIAL:
+            mux_send(f"SET {MUX_CHANNEL} {valor}")
         return
-    ser.write(f"{valor}\n".encode("utf-8"))
+    with ser_lock:   # una línea entera por vez, sin mezclar bytes en el cable
+        ser.write(f"{valor}\n".encode("utf-8"))
 
 def is_logged_in():
     return session.get("logged_in") is True
 
+class PwmStream:
+    """
+    Valores de un WebSocket hacia el Arduino, al ritmo del puerto serie:
+    de a uno, el siguiente recién cuando el anterior se confirmó. Lo que
+    llega mientras tanto se funde (gana el último). Cada valor confirmado
+    vuelve al navegador: {"ack": 128, "ms": 4.2, "resp": "SENT"}.
+      - con gateway: "REQ" por su propio socket del mux; resp = respuesta
+        del Arduino (sketch binario) o "SENT" (el de texto no contesta)
+      - sin gateway: se escribe y se espera el tiempo de línea; resp = "SENT"
+    """
+    def __init__(self, ws):
+        self.ws = ws
+        self.cond = threading.Condition()
+        self.value = None
+        self.t_value = 0.0
+        self.closed = False
+        self.received = 0
+        self.coalesced = 0
+        self.mux = None
+        self.rmux = None
+        self.seq = 0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def put(self, value):
+        with self.cond:
+            self.received += 1
+            if self.value is not None:
+                self.coalesced += 1
+            else:
+                self.t_value = time.monotonic()
+            self.value = value
+            self.cond.notify()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify()
+        self.thread.join(timeout=WS_ACK_TIMEOUT + 1.0)
+        if self.mux is not None:
+            self.mux.close()
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while self.value is None and not self.closed:
+                    self.cond.wait()
+                if self.closed:
+                    return
+                value, t0, self.value = self.value, self.t_value, None
+            log.info("pwm", value=value, via="ws")
+            resp = self._deliver(value)
+            try:
+                self.ws.send(json.dumps({"ack": value, "ms": round((time.monotonic() - t0) * 1000.0, 1),
+                                         "resp": resp}, separators=(",", ":")))
+            except OSError:
+                return
+
+    def _deliver(self, value):
+        if ser is not None or not USE_SERIAL:
+            send_to_arduino(value)
+            if ser is not None:
+                ser.flush()
+                time.sleep(len(f"{value}\n") * 10.0 / BAUDRATE)   # tiempo de línea
+            return "SENT"
+        self.seq += 1
+        try:
+            if self.mux is None:
+                self.mux = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                self.mux.settimeout(WS_ACK_TIMEOUT + 1.0)   # el gateway ya corta a los 1 s
+                self.mux.connect(MUX_SOCKET)
+                self.rmux = self.mux.makefile("r", encoding="utf-8")
+            self.mux.sendall(f"REQ {self.seq} {MUX_CHANNEL} {value}\n".encode("utf-8"))
+            while True:
+                tag, _, resp = self.rmux.readline().strip().partition(" ")
+                if not tag:
+                    raise OSError("gateway cerrado")
+                if tag == str(self.seq):   # una respuesta tardía de antes no cuenta
+                    return resp
+        except OSError:
+            if self.mux is not None:
+                self.mux.close()
+            self.mux = None
+            return "ERR:GATEWAY"
+
 @app.route("/login", methods=["GET", "POST"])
 def login():
     if request.method == "POST":
@@ -89,14 +263,111 @@ def set_pwm():
         return jsonify({"ok": False, "error": "Valor inválido"}), 400
 
     valor = max(0, min(255, valor))  # igual que tu original
-    print(f"Enviando al Arduino: {valor}")
+    log.info("pwm", value=valor)
     send_to_arduino(valor)
 
     return jsonify({"ok": True, "value": valor})
 
+@app.route("/ws_pwm", websocket=True)
+def ws_pwm():
+    """
+    WebSocket del slider: el navegador manda "0".."255" por cada movimiento
+    sobre una sola conexión (ya logueada: la cookie de sesión viaja en el
+    handshake) y recibe {"ack": ...} con lo que el Arduino recibió.
+    """
+    if not is_logged_in():
+        return jsonify({"ok": False, "error": "No autorizado"}), 401
+    # la cookie viaja también desde páginas de otros sitios: solo la nuestra
+    origin = request.headers.get("Origin", "")
+    if origin and origin.split("://", 1)[-1] != request.host:
+        return jsonify({"ok": False, "error": "Origen no permitido"}), 403
+    sock = request.environ.get("werkzeug.socket")
+    key = request.headers.get("Sec-WebSocket-Key")
+    if sock is None or not key:
+        return jsonify({"ok": False, "error": "Servidor sin WebSocket"}), 501
+
+    ws = wsock.accept(sock, key)
+    stream = PwmStream(ws)
+    try:
+        while (msg := ws.recv()) is not None:
+            try:
+                valor = max(0, min(255, int(msg.strip())))
+            except ValueError:
+                ws.send(json.dumps({"error": "Valor inválido"}))
+                continue
+            stream.put(valor)
+    finally:
+        stream.close()
+        ws.close()
+        log.info("ws_close", received=stream.received, coalesced=stream.coalesced)
+        # la conexión ya no es HTTP: que Werkzeug no escriba una respuesta
+        ws.shutdown()
+    return Response(status=204)
+
+@app.route("/wave", methods=["POST"])
+def wave():
+    """
+    Patrón generado en el Pi por el gateway, ej. {"pattern": "BREATHE 3000"}
+    o {"pattern": "GFADE 255 1500"} (ver gateway/waveform.py). Se corta
+    con cualquier /set_pwm.
+    """
+    if not is_logged_in():
+        return jsonify({"ok": False, "error": "No autorizado"}), 401
+    if ser is not None or not os.path.exists(MUX_SOCKET):
+        return jsonify({"ok": False, "error": "Sin gateway"}), 503
+
+    data = request.get_json(silent=True) or {}
+    pattern = " ".join(str(data.get("pattern", "")).split())
+    if not pattern:
+        return jsonify({"ok": False, "error": "Patrón inválido"}), 400
+    resp = mux_query("WAVE " + pattern)
+    if resp is None:
+        return jsonify({"ok": False, "error": "Sin gateway"}), 503
+    if resp != "OK":
+        return jsonify({"ok": False, "error": "Patrón inválido"}), 400
+    return jsonify({"ok": True, "pattern": pattern})
+
+@app.route("/state")
+def get_state():
+    """Estado del LED desde memoria (del gateway si está), sin tocar el serial."""
+    if not is_logged_in():
+        return jsonify({"ok": False, "error": "No autorizado"}), 401
+
+    if ser is None and USE_SERIAL:
+        resp = mux_query("STATE")
+        if resp and resp.startswith("{"):
+            return jsonify({"ok": True, "source": "gateway", "state": json.loads(resp)})
+    return jsonify({"ok": True, "source": "app", "state": state})
+
+@app.route("/events")
+def events():
+    """
+    Server-Sent Events: cada cambio de estado del gateway (de esta página,
+    de otra o del slider de escritorio) llega al navegador al momento.
+    """
+    if not is_logged_in():
+        return jsonify({"ok": False, "error": "No autorizado"}), 401
+    if ser is not None or not os.path.exists(MUX_SOCKET):
+        return jsonify({"ok": False, "error": "Sin gateway"}), 503
+
+    def stream():
+        # una conexión propia por navegador: queda en modo SUBSCRIBE
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            s.connect(MUX_SOCKET)
+            s.sendall(b"SUBSCRIBE\n")
+            for line in s.makefile("r", encoding="utf-8"):
+                yield f"data: {line.strip()}\n\n"
+
+    return Response(stream(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache"})
+
 if __name__ == "__main__":
+    log.start()
     open_serial()
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    try:
+        app.run(host="0.0.0.0", port=5000, debug=True)
+    finally:
+        log.close()
 
 
 #nano templates/login.html (Paso 2)
@@ -0,0 +1,225 @@
+"""
+Slider del navegador: POST por evento contra WebSocket, de punta a punta
+(Arduino simulado en un pty, app.py en un servidor de Werkzeug local).
+
+    python3 bench_ws.py                 # 60 eventos/s durante 4 s, serie directo
+    python3 bench_ws.py --gateway       # la app habla con gateway.py por su mux
+    python3 bench_ws.py --hz 120 --seconds 2 --rtt 40
+
+Se arrastra el slider de 0 en adelante (un valor distinto por evento) y se
+mide cuándo aplica cada valor el Arduino:
+  - "POST 120 ms": la página de antes, fetch() tras 120 ms sin movimiento
+  - "POST/evento": un fetch() por evento, hasta 6 en paralelo (navegador)
+  - "WebSocket":   /ws_pwm, un mensaje por evento
+act/s = valores distintos que llegaron al LED por segundo de arrastre;
+final = desde el último evento hasta que el LED quedó en ese valor.
+--rtt simula la red entre el navegador y el Pi (Wi-Fi): la mitad antes de
+que cada POST o mensaje llegue, y un POST ocupa su conexión hasta que
+vuelve la respuesta.
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import queue
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import generate_password_hash
+from werkzeug.serving import make_server
+
+import app as webapp   # agrega gateway/ al path
+from fake_arduino import FakeArduino
+from frames import CH_PWM
+import wsock
+
+PASSWORD = "bench"
+BROWSER_CONNS = 6   # conexiones por host de un navegador
+RTT_MS = 20.0       # ida y vuelta navegador <-> Pi por Wi-Fi
+MUX = "/tmp/bench_ws_mux.sock"
+
+def pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(p / 100.0 * len(xs)))]
+
+def login(port):
+    c = http.client.HTTPConnection("127.0.0.1", port)
+    c.request("POST", "/login", f"username={webapp.APP_USER}&password={PASSWORD}",
+              {"Content-Type": "application/x-www-form-urlencoded"})
+    r = c.getresponse()
+    r.read()
+    cookie = r.getheader("Set-Cookie", "").split(";")[0]
+    if not cookie:
+        sys.exit("no se pudo iniciar sesión")
+    return cookie
+
+class Poster:
+    """fetch("/set_pwm") con conexiones keep-alive, una por hilo."""
+    def __init__(self, port, cookie, rtt):
+        self.port = port
+        self.cookie = cookie
+        self.half = rtt / 2000.0
+        self.local = threading.local()
+
+    def post(self, v):
+        c = getattr(self.local, "conn", None)
+        if c is None:
+            c = self.local.conn = http.client.HTTPConnection("127.0.0.1", self.port)
+        time.sleep(self.half)   # ida
+        try:
+            c.request("POST", "/set_pwm", f'{{"value": {v}}}',
+                      {"Content-Type": "application/json", "Cookie": self.cookie})
+            c.getresponse().read()
+        except (OSError, http.client.HTTPException):
+            self.local.conn = None
+        time.sleep(self.half)   # vuelta: la conexión sigue ocupada
+
+def ws_sender(ws, rtt):
+    """ws.send() con la demora de ida de la red, en orden (un solo socket)."""
+    q = queue.Queue()
+    def run():
+        while (item := q.get()) is not None:
+            due, v = item
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            ws.send(str(v))
+    t = threading.Thread(target=run, daemon=True)
+    t.start()
+    return (lambda v: q.put((time.monotonic() + rtt / 2000.0, v))), (lambda: (q.put(None), t.join()))
+
+def drag(hz, seconds, send):
+    """Llama send(v) a `hz` por segundo; devuelve {valor: t del evento}."""
+    events = {}
+    t0 = time.monotonic()
+    for i in range(int(hz * seconds)):
+        delay = t0 + i / hz - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        events[i] = time.monotonic()
+        send(i)
+    return events
+
+def run_mode(name, dev, port, cookie, hz, seconds, rtt):
+    start = len(dev.applied)
+    if name == "POST 120 ms":
+        poster = Poster(port, cookie, rtt)
+        timer = [None]
+        def send(v):
+            if timer[0] is not None:
+                timer[0].cancel()
+            timer[0] = threading.Timer(0.12, poster.post, (v,))
+            timer[0].start()
+        events = drag(hz, seconds, send)
+    elif name == "POST/evento":
+        poster = Poster(port, cookie, rtt)
+        with ThreadPoolExecutor(BROWSER_CONNS) as pool:
+            events = drag(hz, seconds, lambda v: pool.submit(poster.post, v))
+    else:
+        ws = wsock.connect("127.0.0.1", port, "/ws_pwm", {"Cookie": cookie})
+        acks = []
+        reader = threading.Thread(target=lambda: [acks.append(m) for m in iter(ws.recv, None)],
+                                  daemon=True)
+        reader.start()
+        send, stop = ws_sender(ws, rtt)
+        events = drag(hz, seconds, send)
+        stop()
+    last_v, last_t = max(events), max(events.values())
+    time.sleep(1.5)   # que termine de salir lo pendiente
+    if name == "WebSocket":
+        ws.close()
+        reader.join(timeout=2.0)
+
+    applied = [(v, t) for (ch, v), t in zip(dev.applied[start:], dev.applied_t[start:])
+               if ch == CH_PWM and v in events and t >= events[v]]
+    lat = [(t - events[v]) * 1000.0 for v, t in applied]
+    final = next((t for v, t in reversed(applied) if v == last_v), None)
+    ok = bool(applied) and applied[-1][0] == last_v
+    span = (final if final is not None else last_t) - min(events.values())
+    return {
+        "events": len(events),
+        "arrived": len({v for v, _ in applied}),
+        "rate": len({v for v, _ in applied}) / span,
+        "p50": statistics.median(lat) if lat else None,
+        "p95": pct(lat, 95) if lat else None,
+        "final": (final - last_t) * 1000.0 if final is not None else None,
+        "ok": ok,
+    }
+
+def start_gateway(dev):
+    gw = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "gateway", "gateway.py")
+    args = [sys.executable, gw, "--serial", dev.port, "--offer-baud", "", "--mux", MUX,
+            "--unix", "", "--udp-port", "0", "--metrics-port", "0", "--state-file", "",
+            "--health-s", "0", "--deadman", ""]
+    for name in ("led", "pwm", "servo", "multi", "motor"):
+        args += [f"--{name}-port", "0"]
+    proc = subprocess.Popen(args, stdout=subprocess.DEVNULL)
+    # el pty ya imprimió el banner antes de que el gateway lo abriera:
+    # se espera a que termine de arrancar (ready_s en STATS, ver boot.py)
+    t_end = time.monotonic() + 10.0
+    while time.monotonic() < t_end:
+        time.sleep(0.1)
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+                s.connect(MUX)
+                s.sendall(b"STATS\n")
+                stats = json.loads(s.makefile("r").readline())
+        except (OSError, ValueError):
+            continue
+        if any(k.startswith("gateway_serial_ready_seconds") for k in stats):
+            break
+    return proc
+
+def main(args):
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    dev = FakeArduino("pwm", baudrate=webapp.BAUDRATE, binary=False).start()
+    proc = None
+    if args.gateway:
+        proc = start_gateway(dev)
+        webapp.MUX_SOCKET = MUX
+    else:
+        webapp.MUX_SOCKET = "/nonexistent/bench_ws.sock"
+        webapp.SERIAL_PORT = dev.port
+    webapp.APP_PW_HASH = generate_password_hash(PASSWORD)
+    webapp.open_serial()
+    srv = make_server("127.0.0.1", 0, webapp.app, threaded=True)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    cookie = login(srv.server_port)
+
+    how = "gateway (mux)" if args.gateway else "serie directo"
+    print(f"\nSlider a {args.hz:g} eventos/s durante {args.seconds:g} s, red {args.rtt:g} ms, "
+          f"{webapp.BAUDRATE} baudios, {how}")
+    rows = []
+    for name in ("POST 120 ms", "POST/evento", "WebSocket"):
+        rows.append((name, run_mode(name, dev, srv.server_port, cookie, args.hz, args.seconds,
+                                    args.rtt)))
+    print(f"\n{'modo':12} {'eventos':>8} {'llegaron':>9} {'act/s':>7} {'p50 ms':>8} "
+          f"{'p95 ms':>8} {'final ms':>9} {'final ok':>9}")
+    fmt = lambda v: f"{v:.1f}" if v is not None else "-"
+    for name, r in rows:
+        print(f"{name:12} {r['events']:8d} {r['arrived']:9d} {r['rate']:7.1f} {fmt(r['p50']):>8} "
+              f"{fmt(r['p95']):>8} {fmt(r['final']):>9} {'sí' if r['ok'] else 'NO':>9}")
+
+    srv.shutdown()
+    if proc is not None:
+        proc.terminate()
+        proc.wait(timeout=5)
+    dev.stop()
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--hz", type=float, default=60.0, help="eventos input del slider por segundo")
+    ap.add_argument("--seconds", type=float, default=4.0)
+    ap.add_argument("--rtt", type=float, default=RTT_MS, help="ms ida y vuelta de la red simulada")
+    ap.add_argument("--gateway", action="store_true",
+                    help="arrancar gateway.py y que la app le hable por el mux")
+    args = ap.parse_args()
+    if args.hz * args.seconds > 256:
+        sys.exit("hz * seconds <= 256: cada evento necesita un valor distinto (0..255)")
+    main(args)
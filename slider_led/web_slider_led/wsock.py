@@ -0,0 +1,147 @@
+"""
+WebSocket mínimo (RFC 6455) para el servidor de desarrollo de Flask.
+
+Sin dependencias: app.run() (Werkzeug) deja el socket de la conexión en
+request.environ["werkzeug.socket"]; se contesta el handshake a mano y desde
+ahí la conexión habla tramas. Solo lo que usa el slider: mensajes de texto
+chicos, ping/pong y close. Con gunicorn u otro servidor WSGI no hay
+"werkzeug.socket" y la página sigue con POST.
+
+    ws = accept(sock, request.headers["Sec-WebSocket-Key"])
+    while (msg := ws.recv()) is not None:
+        ws.send("...")
+
+connect() es el lado cliente (para bench_ws.py).
+"""
+import base64
+import hashlib
+import os
+import socket
+import struct
+import threading
+
+GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+MAX_MESSAGE = 1024   # un valor del slider son 1-3 bytes
+
+OP_CONT, OP_TEXT, OP_BINARY = 0x0, 0x1, 0x2
+OP_CLOSE, OP_PING, OP_PONG = 0x8, 0x9, 0xA
+
+def accept_key(key):
+    return base64.b64encode(hashlib.sha1((key + GUID).encode("ascii")).digest()).decode("ascii")
+
+class WebSocket:
+    def __init__(self, sock, client=False):
+        self.sock = sock
+        self.rfile = sock.makefile("rb")
+        self.client = client          # el cliente enmascara lo que manda
+        self.lock = threading.Lock()  # send() desde varios hilos
+        self.closed = False
+
+    def _read(self, n):
+        data = self.rfile.read(n)
+        if len(data) < n:
+            raise ConnectionError("WebSocket cerrado")
+        return data
+
+    def _frame(self):
+        b0, b1 = self._read(2)
+        n = b1 & 0x7F
+        if n == 126:
+            n = struct.unpack("!H", self._read(2))[0]
+        elif n == 127:
+            n = struct.unpack("!Q", self._read(8))[0]
+        if n > MAX_MESSAGE:
+            raise ValueError("mensaje demasiado largo")
+        mask = self._read(4) if b1 & 0x80 else None
+        data = self._read(n)
+        if mask is not None:
+            data = bytes(b ^ mask[i % 4] for i, b in enumerate(data))
+        return b0 & 0x80, b0 & 0x0F, data
+
+    def send(self, text, opcode=OP_TEXT):
+        data = text.encode("utf-8") if isinstance(text, str) else text
+        n = len(data)
+        if n < 126:
+            head = struct.pack("!BB", 0x80 | opcode, n)
+        elif n < 1 << 16:
+            head = struct.pack("!BBH", 0x80 | opcode, 126, n)
+        else:
+            head = struct.pack("!BBQ", 0x80 | opcode, 127, n)
+        if self.client:
+            mask = os.urandom(4)
+            head = bytes([head[0], head[1] | 0x80]) + head[2:] + mask
+            data = bytes(b ^ mask[i % 4] for i, b in enumerate(data))
+        with self.lock:
+            if self.closed and opcode != OP_CLOSE:
+                raise ConnectionError("WebSocket cerrado")
+            self.sock.sendall(head + data)
+
+    def recv(self):
+        """Próximo mensaje de texto; None cuando el otro lado cierra."""
+        parts = []
+        try:
+            while True:
+                fin, op, data = self._frame()
+                if op == OP_PING:
+                    self.send(data, OP_PONG)
+                elif op == OP_PONG:
+                    pass
+                elif op == OP_CLOSE:
+                    self.close()
+                    return None
+                else:
+                    parts.append(data)
+                    if sum(map(len, parts)) > MAX_MESSAGE:
+                        raise ValueError("mensaje demasiado largo")
+                    if fin:
+                        return b"".join(parts).decode("utf-8", errors="ignore")
+        except ValueError:
+            self.close(1009)
+            return None
+        except (ConnectionError, OSError):
+            self.closed = True
+            return None
+
+    def close(self, code=1000):
+        if self.closed:
+            return
+        try:
+            self.send(struct.pack("!H", code), OP_CLOSE)
+        except OSError:
+            pass
+        self.closed = True
+
+    def shutdown(self):
+        """Corta el socket (el servidor HTTP ya no puede escribir en él)."""
+        self.closed = True
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+def accept(sock, key):
+    """Contesta el handshake (101) sobre el socket de la petición."""
+    sock.sendall(("HTTP/1.1 101 Switching Protocols\r\n"
+                  "Upgrade: websocket\r\n"
+                  "Connection: Upgrade\r\n"
+                  f"Sec-WebSocket-Accept: {accept_key(key)}\r\n\r\n").encode("latin-1"))
+    return WebSocket(sock)
+
+def connect(host, port, path, headers=None, timeout=5.0):
+    """Cliente: abre la conexión y hace el handshake. ConnectionError si no es 101."""
+    sock = socket.create_connection((host, port), timeout)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    key = base64.b64encode(os.urandom(16)).decode("ascii")
+    lines = [f"GET {path} HTTP/1.1", f"Host: {host}:{port}", "Upgrade: websocket",
+             "Connection: Upgrade", f"Sec-WebSocket-Key: {key}", "Sec-WebSocket-Version: 13"]
+    lines += [f"{k}: {v}" for k, v in (headers or {}).items()]
+    sock.sendall(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+    ws = WebSocket(sock, client=True)
+    status = ws.rfile.readline().decode("latin-1")
+    while ws.rfile.readline() not in (b"\r\n", b"\n", b""):
+        pass
+    if " 101 " not in status:
+        sock.close()
+        raise ConnectionError(f"sin WebSocket: {status.strip()}")
+    sock.settimeout(None)
+    return ws
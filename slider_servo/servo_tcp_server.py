@@ -1,6 +1,20 @@
+import os
 import socket
+import sys
+import time
 import serial
 
+# espera del arranque del Arduino (gateway/boot.py), junto a este script o
+# en ../gateway; copiado solo sin boot.py: la espera fija de 2 s de antes
+_here = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [_here, os.path.join(_here, "..", "gateway")]
+try:
+    from boot import wait_ready  # noqa: E402
+except ImportError:
+    def wait_ready(ser, timeout=2.0):
+        time.sleep(timeout)
+        return None
+
 # --- CONFIGURACIÓN ---
 SERIAL_PORT = "/dev/ttyACM0"   # puerto del Arduino en la Raspberry
 BAUDRATE    = 9600
@@ -13,6 +27,8 @@ def main():
     # Abrir puerto serie con el Arduino
     ser = serial.Serial(SERIAL_PORT, BAUDRATE, timeout=1)
     print(f"Conectado a Arduino en {SERIAL_PORT} a {BAUDRATE} baudios")
+    # el UNO se reinicia al abrir el puerto: lo que llega antes se pierde
+    wait_ready(ser)
 
     # Crear socket servidor TCP
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
@@ -1,20 +1,212 @@
+import os
 import socket
+import sys
+import threading
+import time
+from collections import OrderedDict
 import serial
 
+# el log sin bloqueo y la espera del banner son los del gateway
+# (gateway/ringlog.py, gateway/boot.py), junto a este script o en ../gateway
+_here = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [_here, os.path.join(_here, "..", "gateway")]
+try:
+    from boot import wait_ready  # noqa: E402
+except ImportError:   # copiado solo sin boot.py: la espera fija de antes
+    def wait_ready(ser, timeout=2.0):
+        time.sleep(timeout)
+        return None
+try:
+    from ringlog import RingLog  # noqa: E402
+except ImportError:
+    class RingLog:
+        """Copiado solo sin ringlog.py: print directo, como antes (bloquea)."""
+        def __init__(self, level="INFO", sample=None):
+            pass
+
+        def start(self):
+            pass
+
+        def close(self):
+            pass
+
+        def info(self, kind, **fields):
+            print(kind, *(f"{k}={v!r}" for k, v in fields.items()))
+
+        warn = info
+
 # --- CONFIGURACIÓN ---
 SERIAL_PORT = "/dev/ttyACM0"
 BAUDRATE    = 9600
 
 HOST = "0.0.0.0"
 PORT = 5001
+UDP_PORT = 5001   # setpoints "sesión seq sid ang" (ver setpoint_udp.py); 0 = no
+UDP_SENDERS = 256   # (IP, sesión, servo) recordados para descartar los atrasados
+
+SESSION_IDLE_TIMEOUT = 60.0   # seg sin datos antes de cerrar una sesión abierta
+MAX_LINE = 256                # una línea "sid ang" nunca es tan larga
+
+# cada comando recibido es un registro "rx"; con un arrastre llegan cientos
+# por segundo, así que se guarda 1 de cada LOG_SAMPLE_RX ("DEBUG" = todos)
+LOG_LEVEL = "INFO"
+LOG_SAMPLE_RX = 10
 # ----------------------
 
+log = RingLog(LOG_LEVEL, {"rx": LOG_SAMPLE_RX} if LOG_LEVEL != "DEBUG" else None)
+
 def clamp(x, lo=0, hi=180):
     return max(lo, min(hi, x))
 
+class LineParser:
+    """
+    Parser incremental: junta los bytes de cada recv() y devuelve solo las
+    líneas completas. Lo que queda sin '\\n' se guarda para el siguiente recv().
+    """
+    def __init__(self, max_line=MAX_LINE):
+        self.buf = b""
+        self.max_line = max_line
+
+    def feed(self, data: bytes):
+        self.buf += data
+        *lines, self.buf = self.buf.split(b"\n")
+        if len(self.buf) > self.max_line:
+            # basura sin salto de línea: se descarta para no crecer sin límite
+            self.buf = b""
+        return [l.decode("utf-8", errors="ignore").strip() for l in lines]
+
+    def flush(self):
+        # al cerrar la conexión, lo último puede venir sin '\n'
+        rest, self.buf = self.buf, b""
+        rest = rest.decode("utf-8", errors="ignore").strip()
+        return [rest] if rest else []
+
+def parse_line(line):
+    """Convierte "sid ang" (o "sid,ang") en (sid, ang). Devuelve None si no es válida."""
+    parts = line.replace(",", " ").split()
+    if len(parts) != 2:
+        log.warn("bad", why="línea no válida", line=line)
+        return None
+    try:
+        sid = int(parts[0])
+        ang = int(parts[1])
+    except ValueError:
+        log.warn("bad", why="datos no válidos", line=line)
+        return None
+    return sid, clamp(ang, 0, 180)
+
+def parse_pose(line):
+    """
+    "P a1 a2 a3" (todos los servos juntos, "-" = no se toca) -> la línea
+    limpia para el Arduino (ver slider_servo3_ino). None si no es válida.
+    """
+    parts = line.split()[1:]
+    if not parts:
+        return None
+    out = []
+    for v in parts:
+        if v == "-":
+            out.append(v)
+            continue
+        try:
+            out.append(str(clamp(int(v))))
+        except ValueError:
+            log.warn("bad", why="pose no válida", line=line)
+            return None
+    return "P " + " ".join(out)
+
+def handle_client(conn, addr, ser, ser_lock):
+    """
+    Una sesión por conexión. Sirve igual para:
+      - clientes viejos: mandan un lote y cierran (recv devuelve b"")
+      - clientes de sesión: dejan el socket abierto y mandan miles de líneas
+    Cada línea completa se manda al Arduino en cuanto llega.
+    """
+    parser = LineParser()
+    n = 0
+    with conn:
+        conn.settimeout(SESSION_IDLE_TIMEOUT)
+        while True:
+            try:
+                data = conn.recv(4096)
+            except socket.timeout:
+                break
+            except OSError:
+                break
+            if not data:
+                lines = parser.flush()
+            else:
+                lines = parser.feed(data)
+
+            for line in lines:
+                if not line:
+                    continue
+                if line.upper() == "HB":
+                    continue   # latido para el gateway (watchdog.py); acá no hay hombre muerto
+                if line[:2].upper() == "P ":
+                    pose = parse_pose(line)
+                    if pose is not None:
+                        # una sola línea: el Arduino mueve todos juntos
+                        with ser_lock:
+                            ser.write(f"{pose}\n".encode("utf-8"))
+                        n += 1
+                        log.info("rx", addr=addr[0], pose=pose[2:])
+                    continue
+                cmd = parse_line(line)
+                if cmd is None:
+                    continue
+                sid, ang = cmd
+                # Mandar al Arduino en el MISMO formato: "sid ang\n"
+                with ser_lock:
+                    ser.write(f"{sid} {ang}\n".encode("utf-8"))
+                n += 1
+                log.info("rx", addr=addr[0], servo=sid, ang=ang)
+
+            if not data:
+                break
+    if n > 1:
+        log.info("session", addr=addr[0], port=addr[1], commands=n)
+
+def newer(a, b):
+    """¿seq a es posterior a b? (contador de 32 bits que da la vuelta)"""
+    return 0 < ((a - b) & 0xFFFFFFFF) < 0x80000000
+
+def serve_udp(ser, ser_lock):
+    """
+    Setpoints de arrastre: se descarta todo datagrama más viejo que el
+    último aceptado de ese (IP, sesión, servo). Sin respuesta.
+    """
+    last = OrderedDict()   # (IP, sesión, servo) -> último seq; el más viejo se olvida
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        s.bind((HOST, UDP_PORT))
+        print(f"Setpoints UDP escuchando en {HOST}:{UDP_PORT}...")
+        while True:
+            data, addr = s.recvfrom(512)
+            parts = data.decode("utf-8", errors="ignore").split()
+            try:
+                sess, seq = int(parts[0]), int(parts[1])
+                pairs = [(int(parts[i]), int(parts[i + 1])) for i in range(2, len(parts) - 1, 2)]
+            except (ValueError, IndexError):
+                continue
+            for sid, ang in pairs:
+                key = (addr[0], sess, sid)
+                if key in last and not newer(seq, last[key]):
+                    continue   # llegó tarde: ya hay uno más nuevo
+                last[key] = seq
+                last.move_to_end(key)
+                if len(last) > UDP_SENDERS:
+                    last.popitem(last=False)
+                with ser_lock:
+                    ser.write(f"{sid} {clamp(ang)}\n".encode("utf-8"))
+
 def main():
+    log.start()
     ser = serial.Serial(SERIAL_PORT, BAUDRATE, timeout=1)
+    ser_lock = threading.Lock()
     print(f"Conectado a Arduino en {SERIAL_PORT} a {BAUDRATE} baudios")
+    wait_ready(ser)   # el UNO se reinicia al abrir: no atender hasta el banner
+    if UDP_PORT:
+        threading.Thread(target=serve_udp, args=(ser, ser_lock), daemon=True).start()
 
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
         s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
@@ -24,46 +216,13 @@ def main():
 
         while True:
             conn, addr = s.accept()
-            with conn:
-                conn.settimeout(1.5)
-                # leer TODO lo que llegue en esa conexión (tu cliente manda y cierra)
-                chunks = []
-                while True:
-                    try:
-                        data = conn.recv(4096)
-                    except socket.timeout:
-                        break
-                    if not data:
-                        break
-                    chunks.append(data)
-
-                if not chunks:
-                    continue
-
-                texto = b"".join(chunks).decode("utf-8", errors="ignore")
-                # procesar línea por línea: "sid ang"
-                for line in texto.splitlines():
-                    line = line.strip()
-                    if not line:
-                        continue
-
-                    parts = line.split()
-                    if len(parts) != 2:
-                        print(f"Línea no válida: {line!r}")
-                        continue
-
-                    try:
-                        sid = int(parts[0])
-                        ang = int(parts[1])
-                    except ValueError:
-                        print(f"Datos no válidos: {line!r}")
-                        continue
-
-                    ang = clamp(ang, 0, 180)
-
-                    # Mandar al Arduino en el MISMO formato: "sid ang\n"
-                    ser.write(f"{sid} {ang}\n".encode("utf-8"))
-                    print(f"RX {addr}: servo={sid} ang={ang}")
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            # un hilo por conexión: una sesión abierta ya no bloquea a las demás
+            threading.Thread(target=handle_client, args=(conn, addr, ser, ser_lock),
+                             daemon=True).start()
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        log.close()   # lo que quedó en el buffer
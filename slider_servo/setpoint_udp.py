@@ -0,0 +1,31 @@
+"""
+Emisor de setpoints UDP para los sliders (ver gateway/udp.py).
+
+    udp = SetpointSender()
+    udp.send("192.168.0.101", 5001, [(1, 120), (3, 45)])
+
+Cada datagrama lleva "sesión seq sid ang ..."; el servidor descarta los
+que llegan tarde (más viejos que el último aceptado). No hay conexión ni
+respuesta: si uno se pierde, el siguiente movimiento lo reemplaza. El
+valor final de un arrastre se sigue mandando por TCP.
+"""
+import random
+import socket
+
+class SetpointSender:
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.session = random.getrandbits(31)   # otra corrida = otra sesión
+        self.seq = 0
+
+    def send(self, ip, port, pairs) -> bool:
+        self.seq = (self.seq + 1) & 0xFFFFFFFF
+        body = " ".join(f"{sid} {ang}" for sid, ang in pairs)
+        try:
+            self.sock.sendto(f"{self.session} {self.seq} {body}\n".encode("utf-8"), (ip, port))
+            return True
+        except OSError:
+            return False
+
+    def close(self):
+        self.sock.close()
@@ -3,14 +3,57 @@
 Servo miServo;
 const int pinServo = 9;
 
+// ---- Negociación de velocidad (ver gateway/baud.py) ----
+// "BAUD 115200" -> "OK BAUD 115200", cambia de velocidad y espera "PING"
+// 1 s; si no llega (enlace malo) vuelve a BAUD_INICIAL.
+const long BAUD_INICIAL = 9600;
+
+void negociarBaud(String cmd) {
+  cmd.trim();
+  long rate = cmd.substring(5).toInt();
+  if (rate != 57600 && rate != 115200 && rate != 250000) {
+    Serial.println("ERR BAUD");
+    return;
+  }
+  Serial.print("OK BAUD ");
+  Serial.println(rate);
+  Serial.flush();
+  Serial.end();
+  Serial.begin(rate);
+
+  String ping = "";
+  unsigned long t0 = millis();
+  while (millis() - t0 < 1000) {
+    if (Serial.available() == 0) continue;
+    char c = Serial.read();
+    if (c == '\n') {
+      ping.trim();
+      if (ping == "PING") {
+        Serial.print("PONG ");
+        Serial.println(rate);
+        return;
+      }
+      ping = "";
+    } else if (ping.length() < 16) {
+      ping += c;
+    }
+  }
+  Serial.end();
+  Serial.begin(BAUD_INICIAL);
+}
+
 void setup() {
-  Serial.begin(9600);
+  Serial.begin(BAUD_INICIAL);
   miServo.attach(pinServo);
   miServo.write(90);
 }
 
 void loop() {
   if (Serial.available() > 0) {
+    if (Serial.peek() == 'B') {            // "BAUD 115200"
+      negociarBaud(Serial.readStringUntil('\n'));
+      return;
+    }
     int ang = Serial.parseInt();
     while (Serial.available() > 0) Serial.read(); // limpia \n
 
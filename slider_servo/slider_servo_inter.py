@@ -3,6 +3,8 @@ import tkinter as tk
 from tkinter import messagebox
 import math
 
+from setpoint_udp import SetpointSender
+
 COLOR_FONDO       = "#0b1220"
 COLOR_PANEL       = "#121a2b"
 COLOR_BORDE       = "#23304f"
@@ -36,6 +38,20 @@ def send_tcp(sid: int, ang: int) -> bool:
     except OSError:
         return False
 
+# Mientras se arrastra, cada movimiento sale al momento por UDP (solo
+# importa el más nuevo); al soltar, el ángulo final va por TCP (tiene que llegar).
+udp = SetpointSender()
+
+def send_udp(sid: int, ang: int) -> bool:
+    ip = entry_ip.get().strip()
+    try:
+        port = int(entry_port.get().strip())
+    except ValueError:
+        return False   # el aviso lo da send_tcp al soltar
+    if not ip:
+        return False
+    return udp.send(ip, port, [(sid, ang)])
+
 def draw_gauge(canvas: tk.Canvas, ang: int, title: str):
     canvas.delete("all")
     cx, cy = 110, 110
@@ -89,8 +105,9 @@ class ServoWidget:
 
         self.lbl.config(text=f"Servo {self.sid}: {ang}°")
         draw_gauge(self.canvas, ang, f"Servo {self.sid}")
+        send_udp(self.sid, ang)
 
-        # debounce para no saturar red
+        # debounce: el valor final por TCP
         if self.after_id is not None:
             root.after_cancel(self.after_id)
         self.after_id = root.after(120, lambda: self._send(ang))
@@ -1,8 +1,12 @@
+import json
 import socket
+import threading
 import tkinter as tk
 from tkinter import messagebox
 import math
 import os
+import queue
+import time
 
 import cv2
 from PIL import Image, ImageTk
@@ -41,6 +45,15 @@ VID_ELB_1  = os.path.join(VIDEO_DIR, "mno3.mp4")    # Servo codo (vista 1)
 VID_ELB_2  = os.path.join(VIDEO_DIR, "mno33.mp4")   # Servo codo (vista 2)
 
 CONNECTED = False
+GATEWAY = False        # el servidor es gateway/gateway.py (contestó STATE)
+# Latido "HB" por la sesión abierta, con cualquier servidor (el vds lo
+# ignora). Hombre muerto del gateway (gateway/watchdog.py): solo vuelve a
+# su valor seguro lo que tenga timeout en DEADMAN, y el brazo no tiene por
+# defecto (no hay un ángulo seguro para todos). Para el brazo hay que
+# arrancar el gateway con, por ejemplo, --deadman arm.1=0.5:90,arm.3=0.5:90
+HEARTBEAT_MS = 100
+TRACE = True           # con el gateway, cada pose va con "@id" y marcas de tiempo
+                       # (gateway/tracing.py; se registra si corre con --trace)
 
 # ------------------ TCP ------------------
 def set_status(text, color):
@@ -72,7 +85,7 @@ def get_ip_port():
     return ip, port
 
 def connect_now():
-    global CONNECTED
+    global CONNECTED, GATEWAY
     ip, port = get_ip_port()
     if ip is None:
         return
@@ -81,8 +94,13 @@ def connect_now():
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
             s.settimeout(1.5)
             s.connect((ip, port))
+            remote = fetch_state(s)
         CONNECTED = True
+        GATEWAY = remote is not None
         set_status("Estado: Conectado", BTN_OK)
+        if GATEWAY:
+            app.load_state(remote)
+            start_subscription(ip, port)
     except OSError as e:
         CONNECTED = False
         set_status("Estado: No se pudo conectar", BTN_BAD)
@@ -90,18 +108,158 @@ def connect_now():
 
     update_buttons()
 
+def fetch_state(s, timeout=0.5):
+    """
+    Pide "STATE" al gateway (gateway/gateway.py): dónde quedó cada servo.
+    servo_tcp_server_vds.py no contesta: None y se queda en 90°.
+    """
+    s.settimeout(timeout)
+    buf = b""
+    try:
+        s.sendall(b"STATE\n")
+        while not buf.endswith(b"\n"):
+            chunk = s.recv(4096)
+            if not chunk:
+                break
+            buf += chunk
+        return json.loads(buf.decode("utf-8", errors="ignore"))
+    except (OSError, ValueError):
+        return None
+
+def heartbeat():
+    # solo por la sesión ya abierta: el gateway arma el watchdog con el
+    # primer HB y si la PC se cuelga o se cae el Wi-Fi deja de recibirlos.
+    # No depende de GATEWAY: si STATE no contestó a tiempo igual se protege
+    if CONNECTED and SESSION_SOCK is not None:
+        try:
+            SESSION_SOCK.sendall(b"HB\n")
+        except OSError:
+            close_session()
+    root.after(HEARTBEAT_MS, heartbeat)
+
+# Suscripción al gateway: cambios hechos por otros (navegador, otra PC)
+SUB_SOCK = None
+# el hilo de la suscripción no toca tkinter (no es thread-safe): deja los
+# cambios acá y el hilo principal los aplica cada SUB_POLL_MS
+SUB_QUEUE = queue.Queue()
+SUB_POLL_MS = 50
+
+def start_subscription(ip, port):
+    global SUB_SOCK
+    stop_subscription()
+    try:
+        s = socket.create_connection((ip, port), timeout=1.5)
+        s.sendall(b"SUBSCRIBE\n")
+    except OSError:
+        return
+    s.settimeout(None)
+    SUB_SOCK = s
+    threading.Thread(target=_subscription_loop, args=(s,), daemon=True).start()
+
+def _subscription_loop(s):
+    try:
+        for line in s.makefile("r", encoding="utf-8"):
+            try:
+                delta = json.loads(line)
+            except ValueError:
+                continue
+            SUB_QUEUE.put(delta)
+    except OSError:
+        pass
+
+def drain_subscription():
+    # hilo principal (root.after): aplica lo que dejó _subscription_loop
+    try:
+        while True:
+            app.apply_remote(SUB_QUEUE.get_nowait())
+    except queue.Empty:
+        pass
+    root.after(SUB_POLL_MS, drain_subscription)
+
+def stop_subscription():
+    global SUB_SOCK
+    if SUB_SOCK is not None:
+        try:
+            SUB_SOCK.shutdown(socket.SHUT_RDWR)
+            SUB_SOCK.close()
+        except OSError:
+            pass
+    SUB_SOCK = None
+
 def disconnect_now():
     global CONNECTED
     CONNECTED = False
+    close_session()
+    stop_subscription()
     set_status("Estado: Desconectado (no se envía)", COLOR_TEXTO_SUAVE)
     update_buttons()
 
-def send_tcp_batch(cmds) -> bool:
+# Sesión TCP persistente: el servidor (servo_tcp_server_vds.py) procesa cada
+# línea en cuanto llega, así que no hace falta abrir/cerrar por cada envío.
+SESSION_SOCK = None
+SESSION_ADDR = None
+SESSION_TIMEOUT = 0.7   # seg para conectar y para cada envío
+
+def close_session():
+    global SESSION_SOCK, SESSION_ADDR
+    if SESSION_SOCK is not None:
+        try:
+            SESSION_SOCK.close()
+        except OSError:
+            pass
+    SESSION_SOCK = None
+    SESSION_ADDR = None
+
+def _peer_closed(s):
     """
-    Abre UNA sola conexión y manda todas las líneas:
-      cmds = [(sid, ang), (sid, ang), ...]
-    Esto evita el 'Error de conexión' por saturación de conexiones.
+    ¿El servidor ya cerró la sesión? (servo_tcp_server_vds.py la cierra tras
+    SESSION_IDLE_TIMEOUT). Un sendall() en ese socket igual "sale" y el
+    comando se pierde, así que se mira antes sin bloquear. Lo que el
+    servidor contestó mientras tanto nadie lo lee: se descarta.
     """
+    s.setblocking(False)
+    try:
+        while True:
+            if not s.recv(4096):
+                return True   # EOF: el otro lado cerró
+    except BlockingIOError:
+        return False          # abierta, sin nada pendiente
+    except OSError:
+        return True
+    finally:
+        s.settimeout(SESSION_TIMEOUT)
+
+def get_session(ip, port):
+    global SESSION_SOCK, SESSION_ADDR
+    if SESSION_SOCK is not None and SESSION_ADDR == (ip, port):
+        if not _peer_closed(SESSION_SOCK):
+            return SESSION_SOCK
+    close_session()
+    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    s.settimeout(SESSION_TIMEOUT)
+    try:
+        s.connect((ip, port))
+    except OSError:
+        s.close()
+        raise
+    s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    SESSION_SOCK = s
+    SESSION_ADDR = (ip, port)
+    return s
+
+TRACE_SEQ = 0
+
+def _us(t):
+    return "-" if t is None else str(int(t * 1e6))
+
+def _send_session(payload: bytes, trace=None) -> bool:
+    """
+    Manda los bytes por la sesión abierta. Si la sesión se cayó (server
+    reiniciado o sesión inactiva cerrada), reconecta una vez y reintenta.
+    trace = (t_evento, t_despacho): la primera línea va como comando
+    trazado "@id ev disp send ..." (solo al gateway, ver gateway/tracing.py).
+    """
+    global TRACE_SEQ
     if not CONNECTED:
         return False
 
@@ -109,15 +267,29 @@ def send_tcp_batch(cmds) -> bool:
     if ip is None:
         return False
 
-    try:
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.settimeout(0.7)
-            s.connect((ip, port))
-            payload = "".join(f"{sid} {ang}\n" for sid, ang in cmds).encode("utf-8")
-            s.sendall(payload)
-        return True
-    except OSError:
-        return False
+    for _ in range(2):
+        try:
+            s = get_session(ip, port)
+            data = payload
+            if trace is not None and TRACE and GATEWAY:
+                TRACE_SEQ += 1
+                head = f"@{TRACE_SEQ} {_us(trace[0])} {_us(trace[1])} {_us(time.time())} "
+                data = head.encode("utf-8") + payload
+            s.sendall(data)
+            return True
+        except OSError:
+            close_session()
+    return False
+
+def send_tcp_pose(angles, trace=None) -> bool:
+    """
+    Todos los servos en una sola línea "P a1 a2 a3" (ver gateway/frames.py):
+    el Arduino los mueve juntos en vez de uno detrás de otro.
+      angles = {sid: ang, ...}; los que falten van como "-" (no se tocan)
+    """
+    n = max(angles)
+    line = "P " + " ".join(str(angles[i]) if i in angles else "-" for i in range(1, n + 1))
+    return _send_session((line + "\n").encode("utf-8"), trace)
 
 # ------------------ VIDEO PREVIEW ------------------
 class VideoPreview:
@@ -366,6 +538,7 @@ class App:
         self.g  = tk.IntVar(value=90)  # Gripper (Servo 2)
 
         self._send_after = None
+        self._t_event = None    # cuándo se movió el slider (para la traza)
         self._last_sent = None  # evita re-enviar lo mismo
 
         root.configure(bg=COLOR_FONDO)
@@ -580,6 +753,40 @@ class App:
         self._apply_all(previews=True, send=True)
         set_status("Reset: 90° (Base/Codo/Gripper)", BTN_OK)
 
+    def load_state(self, remote):
+        """Arranca los sliders donde quedó el brazo (ver fetch_state)."""
+        current = []
+        for sid, var in ((1, self.t1), (3, self.t2), (2, self.g)):
+            e = remote.get(f"arm.{sid}") or {}
+            ang = e.get("ack") if e.get("ack") is not None else e.get("cmd")
+            if ang is None:
+                return
+            var.set(int(ang))
+            current.append(int(ang))
+        for var, lbl in getattr(self, "_value_labels", []):
+            lbl.config(text=str(int(var.get())))
+        self._last_sent = tuple(current)
+        self._apply_all(previews=True, send=False)
+        set_status("Estado: Conectado (posición del gateway)", BTN_OK)
+
+    def apply_remote(self, delta):
+        """Delta de SUBSCRIBE: mueve los sliders si otro controlador cambió algo."""
+        if self._send_after is not None:
+            return   # el usuario está moviendo un slider: manda él
+        changed = False
+        for sid, var in ((1, self.t1), (3, self.t2), (2, self.g)):
+            e = delta.get(f"arm.{sid}")
+            if e is None or e.get("cmd") is None or int(var.get()) == int(e["cmd"]):
+                continue
+            var.set(int(e["cmd"]))
+            changed = True
+        if not changed:
+            return
+        for var, lbl in getattr(self, "_value_labels", []):
+            lbl.config(text=str(int(var.get())))
+        self._last_sent = (int(self.t1.get()), int(self.t2.get()), int(self.g.get()))
+        self._apply_all(previews=True, send=False)
+
     def _on_any_change(self):
         # clamp del gripper para que nunca se salga de 65..125
         if int(self.g.get()) < GRIP_MIN:
@@ -592,6 +799,8 @@ class App:
 
         self._apply_all(previews=True, send=False)
 
+        if self._t_event is None:
+            self._t_event = time.time()   # primer movimiento sin mandar (traza)
         if self._send_after is not None:
             self.root.after_cancel(self._send_after)
         # un poco más lento = más estable
@@ -618,6 +827,8 @@ class App:
     def _send_all(self):
         global CONNECTED
         self._send_after = None
+        trace = (self._t_event, time.time())
+        self._t_event = None
 
         if not CONNECTED:
             set_status("Estado: Desconectado (no se envía)", COLOR_TEXTO_SUAVE)
@@ -631,7 +842,7 @@ class App:
         if self._last_sent == current:
             return
 
-        ok = send_tcp_batch([(1, t1), (3, t2), (2, g)])
+        ok = send_tcp_pose({1: t1, 3: t2, 2: g}, trace)
 
         if ok:
             self._last_sent = current
@@ -646,6 +857,8 @@ class App:
 root = tk.Tk()
 app = App(root)
 update_buttons()
+root.after(HEARTBEAT_MS, heartbeat)
+root.after(SUB_POLL_MS, drain_subscription)
 root.mainloop()
 
 #mkdir ~/slider_servo